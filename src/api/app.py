@@ -1,28 +1,137 @@
 import os
 import sys
-import joblib
-import re
-from flask import Flask, request, jsonify
+import copy
+import json
+import hashlib
+import hmac
+import time
+import threading
+from collections import Counter
+from flask import Flask, request, jsonify, g
 
-# Ensure we can import from src if needed, though we will likely just duplicate clean_text for simplicity regarding paths
+# Ensure we can import from src regardless of the working directory
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
 
+from src.data.normalize import clean_text, TextNormalizer
+from src.models.predict_model import predict_with_confidence, rank_probabilities
+from src.models.compiled_scorer import CompiledScorer
+from src.models.bundle import BUNDLE_NAME, load_bundle, load_legacy_artifacts
+from src.api.cache import PredictionCache
+from src.api.dedup import DuplicateIndex
+from src.api.drift import DriftMonitor
+from src.api.feedback import FeedbackLog, FeedbackLearner
+from src.features.drift import load_baseline
+from src.api.reloader import ModelReloader, ArtifactWatcher
+from src.api.metrics import MetricsRegistry, SlowRequestProfiler, CONFIDENCE_BUCKETS
+
 app = Flask(__name__)
 
-model = None
-vectorizer = None
-label_encoder = None
+class ServingState:
+    """Everything one prediction needs, built once and never mutated.
 
-def clean_text(text):
-    if not isinstance(text, str):
-        return ""
-    text = text.lower()
-    text = re.sub(r'[^a-z0-9\s.,!?]', '', text)
-    text = re.sub(r'\s+', ' ', text).strip()
-    return text
+    Requests read the module-level ``state`` reference once and use that
+    object throughout, so a reload that swaps the reference can never hand
+    a request a half-updated model/vectorizer/label encoder trio.
+    """
 
-def load_artifacts():
-    global model, vectorizer, label_encoder
+    def __init__(self, bundle, scorer=None, model_version=None):
+        self.bundle = bundle
+        self.model = bundle.model
+        self.vectorizer = bundle.vectorizer
+        self.label_encoder = bundle.label_encoder
+        self.priority_model = bundle.priority_model
+        self.priority_encoder = bundle.priority_encoder
+        self.normalizer = bundle.normalizer or TextNormalizer()
+        self.scorer = scorer
+        self.model_version = model_version or bundle.version
+        # Loaded artifacts' version; feedback updates publish "<base_version>+fb<n>" on top of it
+        self.base_version = self.model_version
+        # Reference statistics for the drift monitor; None when the artifacts predate them
+        self.drift_baseline = None
+        self.confidence_baseline = bundle.header.get("confidence_distribution")
+        # Startup bookkeeping for /health; a pid differing from the worker's means it was inherited via fork
+        self.load_seconds = bundle.load_seconds
+        self.warmup_seconds = None
+        self.loaded_pid = os.getpid()
+
+state = None
+_swap_lock = threading.Lock()
+
+# "sklearn" serves the joblib pipeline; "compiled" serves models/compiled_scorer.npz
+SERVING_MODE = os.environ.get("TRIAGE_SERVING_MODE", "sklearn")
+
+# Representative tickets scored before a state is published, so lazy initialization happens up front
+WARMUP_TICKETS = [
+    ("Reset password", "I forgot my password and the reset link is not arriving."),
+    ("URGENT: API timeout", "The API is timing out after 30 seconds. Is there a service degradation?"),
+    ("Charged twice", "I noticed I was charged twice for this month's subscription."),
+    ("Add dark mode", "It would be great to have a dark mode for better night time viewing.")
+]
+WARMUP_ROUNDS = int(os.environ.get("TRIAGE_WARMUP_ROUNDS", "3"))
+
+# Upper bound on tickets accepted by /predict/batch in a single request
+MAX_BATCH_SIZE = int(os.environ.get("TRIAGE_MAX_BATCH_SIZE", "1000"))
+NDJSON_CONTENT_TYPES = ("application/x-ndjson", "application/jsonl", "application/json-lines")
+
+# Repeated tickets skip vectorization and scoring; TRIAGE_CACHE_SIZE=0 disables the cache
+prediction_cache = PredictionCache(
+    max_size=int(os.environ.get("TRIAGE_CACHE_SIZE", "10000")),
+    ttl_seconds=float(os.environ.get("TRIAGE_CACHE_TTL", "3600"))
+)
+
+# Near-duplicates of recently scored tickets reuse their prediction; TRIAGE_DEDUP_SIZE=0 disables the index
+duplicate_index = DuplicateIndex(
+    max_size=int(os.environ.get("TRIAGE_DEDUP_SIZE", "10000")),
+    threshold=float(os.environ.get("TRIAGE_DEDUP_THRESHOLD", "0.8"))
+)
+
+# Scored tickets are summarized off the request path and compared to the build_features baseline
+drift_monitor = DriftMonitor(
+    window_size=int(os.environ.get("TRIAGE_DRIFT_WINDOW", "1000")),
+    enabled=os.environ.get("TRIAGE_DRIFT", "1") != "0"
+)
+
+# Agent corrections go to a log every worker tails; each applies them to its own copy of the classifier
+feedback_learner = FeedbackLearner(
+    FeedbackLog(os.environ.get("TRIAGE_FEEDBACK_LOG", os.path.join("data", "feedback", "feedback.jsonl"))),
+    lambda current, model, applied: publish_feedback_model(current, model, applied),
+    interval=float(os.environ.get("TRIAGE_FEEDBACK_INTERVAL", "10")),
+    batch_size=int(os.environ.get("TRIAGE_FEEDBACK_BATCH_SIZE", "64")),
+    learning_rate=float(os.environ.get("TRIAGE_FEEDBACK_LR", "0.5"))
+)
+
+# Per-stage latency histograms and prediction counters, exposed on /metrics
+metrics = MetricsRegistry()
+metrics.describe("triage_requests_total", "HTTP requests by endpoint and status code.")
+metrics.describe("triage_request_duration_seconds", "End-to-end request handling time.")
+metrics.describe("triage_stage_duration_seconds", "Time spent in each prediction stage (per call, not per ticket).")
+metrics.describe("triage_predictions_total", "Predictions served by predicted category.")
+metrics.describe("triage_prediction_confidence", "Confidence of the predicted category.")
+metrics.describe("triage_priority_predictions_total", "Predictions served by predicted priority.")
+metrics.describe("triage_feedback_total", "Agent corrections received, by whether the prediction was wrong.")
+metrics.describe("triage_duplicates_total", "Tickets answered from the duplicate index, by match kind.")
+
+# Opt-in: profile TRIAGE_PROFILE_SAMPLE_RATE of requests, keep those slower than TRIAGE_PROFILE_SLOW_MS
+profiler = SlowRequestProfiler(
+    threshold_ms=float(os.environ.get("TRIAGE_PROFILE_SLOW_MS", "0")),
+    sample_rate=float(os.environ.get("TRIAGE_PROFILE_SAMPLE_RATE", "0.01")),
+    output_dir=os.environ.get("TRIAGE_PROFILE_DIR", os.path.join("reports", "profiles"))
+)
+
+def artifact_version(paths):
+    # Content digest of artifacts served outside the bundle (e.g. the compiled scorer)
+    digest = hashlib.sha1()
+    for path in paths:
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+    return digest.hexdigest()[:12]
+
+def find_models_dir():
+    models_dir = os.environ.get("TRIAGE_MODELS_DIR")
+    if models_dir:
+        return models_dir
+    
     models_dir = "models"
     
     # Check if we are running from src/api or root
@@ -31,58 +140,638 @@ def load_artifacts():
         models_dir = os.path.join("..", "..", "models")
         if not os.path.exists(models_dir):
              models_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'models'))
+    return models_dir
+
+def artifact_paths(models_dir=None):
+    # Files whose change means a new model has been published
+    models_dir = models_dir or find_models_dir()
+    names = [BUNDLE_NAME, "best_model_tuned.joblib", "tfidf_vectorizer.joblib", "label_encoder.joblib"]
+    if SERVING_MODE == "compiled":
+        names.append("compiled_scorer.npz")
+    return [os.path.join(models_dir, name) for name in names]
 
+def build_state(models_dir=None):
+    """Load artifacts into a new ServingState without touching the live one."""
+    models_dir = models_dir or find_models_dir()
+    start = time.perf_counter()
+    
+    # Prefer the single-file bundle; fall back to the separate joblib files.
+    # A saved normalizer raises on unpickling if it was built by a different cleaning version.
+    bundle_path = os.path.join(models_dir, BUNDLE_NAME)
     print(f"Loading artifacts from {models_dir}...")
-    try:
-        model = joblib.load(os.path.join(models_dir, "best_model_tuned.joblib"))
-        vectorizer = joblib.load(os.path.join(models_dir, "tfidf_vectorizer.joblib"))
-        label_encoder = joblib.load(os.path.join(models_dir, "label_encoder.joblib"))
-        print("Artifacts loaded successfully.")
-    except Exception as e:
-        print(f"Error loading artifacts: {e}")
-        sys.exit(1)
+    if os.path.exists(bundle_path):
+        bundle = load_bundle(bundle_path)
+    else:
+        bundle = load_legacy_artifacts(models_dir)
+    
+    scorer = None
+    model_version = bundle.version
+    if SERVING_MODE == "compiled":
+        scorer_path = os.path.join(models_dir, "compiled_scorer.npz")
+        scorer = CompiledScorer.load(scorer_path)
+        model_version = f"{model_version}-{artifact_version([scorer_path])}"
+        print("Serving with compiled scorer.")
+    
+    new_state = ServingState(bundle, scorer=scorer, model_version=model_version)
+    new_state.drift_baseline = load_baseline(models_dir, bundle.vectorizer)
+    new_state.load_seconds = time.perf_counter() - start
+    print(f"Artifacts loaded successfully (model version {model_version}, "
+          f"{new_state.load_seconds * 1000:.1f} ms).")
+    return new_state
+
+def validate_state(candidate):
+    """Smoke-predict with a candidate state; raises if it cannot serve."""
+    text = candidate.normalizer.ticket_text("Reset password", "I forgot my password and the reset link is not arriving.")
+    result = classify_texts([text], current=candidate)[0]
+    classes = set(str(cls) for cls in candidate.label_encoder.classes_)
+    if result["predicted_category"] not in classes or not 0.0 <= result["confidence"] <= 1.0:
+        raise ValueError(f"Smoke prediction returned an invalid result: {result}")
+    if candidate.priority_encoder is not None and "predicted_priority" in result:
+        if result["predicted_priority"] not in set(str(p) for p in candidate.priority_encoder.classes_):
+            raise ValueError(f"Smoke prediction returned an invalid priority: {result}")
+
+def warm_up(candidate, rounds=None):
+    """Score the warmup tickets singly and as a batch, recording how long it took on the state."""
+    rounds = WARMUP_ROUNDS if rounds is None else rounds
+    texts = [candidate.normalizer.ticket_text(subject, description) for subject, description in WARMUP_TICKETS]
+    start = time.perf_counter()
+    for _ in range(rounds):
+        classify_texts(texts[:1], current=candidate)
+        classify_texts(texts, top_k=2, current=candidate)
+    candidate.warmup_seconds = time.perf_counter() - start
+    return candidate.warmup_seconds
+
+def prepare_state(candidate):
+    # Smoke-test, then warm, before anything can serve from the candidate
+    validate_state(candidate)
+    warm_up(candidate)
+
+def swap_state(new_state):
+    # A single reference assignment publishes the new model atomically
+    global state
+    with _swap_lock:
+        state = new_state
+
+def feedback_state(current, model, applied):
+    """current with its classifier replaced by a feedback-updated copy; everything else is shared."""
+    new_state = copy.copy(current)
+    new_state.model = model
+    new_state.model_version = f"{current.base_version}+fb{applied}"
+    if current.scorer is not None:
+        new_state.scorer = current.scorer.with_weights(model.coef_, model.intercept_)
+    return new_state
+
+def publish_feedback_model(current, model, applied):
+    # Same smoke test as a reload, then swap, unless a reload replaced current in the meantime
+    global state
+    candidate = feedback_state(current, model, applied)
+    validate_state(candidate)
+    with _swap_lock:
+        if state is not current:
+            raise RuntimeError("the serving model changed during the update")
+        state = candidate
+    print(f"Published feedback-updated model {candidate.model_version}")
+
+def load_artifacts():
+    new_state = build_state()
+    prepare_state(new_state)
+    swap_state(new_state)
+
+def create_app():
+    """WSGI factory that loads and warms the model before returning the app.
+
+    With gunicorn's preload_app (src/api/gunicorn_conf.py) this runs once in
+    the master, and every forked worker starts with the warm state already in
+    memory: the memory-mapped bundle pages are shared rather than re-read.
+    """
+    if state is None:
+        load_artifacts()
+    return app
+
+reloader = ModelReloader(build_state, prepare_state, swap_state)
+
+def health_status():
+    """(body, status code) for /health: 503 until a model is loaded, then its load and warmup timings."""
+    current = state
+    body = {
+        "status": "healthy" if current is not None else "loading",
+        "service": "ticket-triage-api",
+        "ready": current is not None
+    }
+    if current is None:
+        return body, 503
+    body.update({
+        "model_version": current.model_version,
+        "serving_mode": SERVING_MODE,
+        "load_ms": current.load_seconds * 1000 if current.load_seconds is not None else None,
+        "warmup_ms": current.warmup_seconds * 1000 if current.warmup_seconds is not None else None,
+        "pid": os.getpid(),
+        "preloaded": current.loaded_pid != os.getpid()
+    })
+    return body, 200
 
 @app.route('/health', methods=['GET'])
 def health_check():
-    return jsonify({"status": "healthy", "service": "ticket-triage-api"}), 200
+    body, status = health_status()
+    return jsonify(body), status
+
+def parse_ticket(data, current=None):
+    """Validate a ticket payload and return (ticket_id, full_text, error)."""
+    if not isinstance(data, dict):
+        return "unknown", None, "Ticket must be a JSON object"
 
-@app.route('/predict', methods=['POST'])
-def predict():
-    if not request.is_json:
-        return jsonify({"error": "Request must be JSON"}), 400
-    
-    data = request.get_json()
     subject = data.get("subject", "")
     description = data.get("description", "")
     ticket_id = data.get("ticket_id", "unknown")
-    
+
     if not subject and not description:
-        return jsonify({"error": "Missing subject or description"}), 400
+        return ticket_id, None, "Missing subject or description"
+
+    full_text = (current or state).normalizer.ticket_text(subject, description)
+    return ticket_id, full_text, None
+
+def parse_top_k(value):
+    """Return (top_k, error); None means no top-k ranking was requested."""
+    if value is None:
+        return None, None
+    if not isinstance(value, int) or isinstance(value, bool) or value < 1:
+        return None, "top_k must be a positive integer"
+    return value, None
+
+def query_top_k(value):
+    """A ?top_k= query value as an int; anything else is passed through for parse_top_k to reject."""
+    if value is None:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        return value
+
+def vectorize_texts(texts, current=None):
+    """The serving feature matrix for cleaned texts, in either serving mode."""
+    current = current or state
+    with metrics.stage("vectorize"):
+        if current.scorer is not None:
+            return current.scorer.transform(texts)
+        return current.vectorizer.transform(texts)
+
+def serving_features(texts, current):
+    """The matrix shared by scoring and the drift monitor.
+
+    Compiled mode can score texts without one, so there it is only built when
+    the drift monitor will reuse it.
+    """
+    if current.scorer is not None and not drift_monitor.enabled:
+        return None
+    return vectorize_texts(texts, current)
+
+def classify_texts(texts, top_k=None, current=None, features=None):
+    """Score cleaned texts in one vectorized pass, returning one result dict per text.
+
+    features, if given, is vectorize_texts(texts) already computed by the caller.
+    """
+    current = current or state
+    label_encoder = current.label_encoder
+    priority_labels = None
+    if current.scorer is not None:
+        # Compiled mode scores the given rows, or tokenizes and scores directly, bypassing sklearn
+        with metrics.stage("score"):
+            if current.priority_encoder is not None and "priority" in current.scorer.heads:
+                probs, head_probs = current.scorer.predict_proba_with_heads(texts, ["priority"], features)
+                priority_labels, priority_confidences, _, _ = rank_probabilities(
+                    head_probs["priority"], current.scorer.heads["priority"]["classes"])
+            else:
+                probs = current.scorer.predict_proba(texts, features)
+            labels, confidences, top_labels, top_confidences = rank_probabilities(probs, current.scorer.classes_, top_k)
+    else:
+        # Vectorize all texts into a single sparse matrix, shared by the category and priority models
+        if features is None:
+            features = vectorize_texts(texts, current)
+
+        # Label, confidence and top-k all come from one probability computation
+        with metrics.stage("score"):
+            labels, confidences, top_labels, top_confidences = predict_with_confidence(current.model, features, top_k)
+            if current.priority_model is not None:
+                priority_labels, priority_confidences, _, _ = predict_with_confidence(current.priority_model, features)
+
+    with metrics.stage("decode"):
+        categories = label_encoder.inverse_transform(labels)
+        if priority_labels is not None:
+            priorities = current.priority_encoder.inverse_transform(priority_labels)
+
+        results = []
+        for i, category in enumerate(categories):
+            result = {
+                "predicted_category": str(category),
+                "confidence": float(confidences[i])
+            }
+            if priority_labels is not None:
+                result["predicted_priority"] = str(priorities[i])
+                result["priority_confidence"] = float(priority_confidences[i])
+            if top_labels is not None:
+                result["top_categories"] = [
+                    {"category": str(cat), "confidence": float(conf)}
+                    for cat, conf in zip(label_encoder.inverse_transform(top_labels[i]), top_confidences[i])
+                ]
+            results.append(result)
+    return results
+
+def record_predictions(results):
+    """Count served predictions (cache hits included) by category and confidence."""
+    for category, count in Counter(result["predicted_category"] for result in results).items():
+        metrics.inc("triage_predictions_total", (("category", category),), count)
+    metrics.observe_many("triage_prediction_confidence", [result["confidence"] for result in results],
+                         buckets=CONFIDENCE_BUCKETS)
+    priorities = Counter(result["predicted_priority"] for result in results if "predicted_priority" in result)
+    for priority, count in priorities.items():
+        metrics.inc("triage_priority_predictions_total", (("priority", priority),), count)
+
+def classify_texts_cached(texts, top_k=None, current=None, ticket_ids=None):
+    """classify_texts behind the prediction cache and, given ticket_ids, the duplicate index.
+
+    Only texts that are neither cached nor near-duplicates of a recently scored
+    ticket are scored, and copies within the same batch are scored once. A
+    duplicate gets the earlier ticket's prediction plus duplicate_of with that
+    ticket's id. Every served result goes to the drift monitor, along with the
+    features of the texts that were vectorized.
+    """
+    current = current or state
+    dedup = ticket_ids is not None and duplicate_index.enabled
+    if not prediction_cache.enabled and not dedup:
+        features = serving_features(texts, current)
+        results = classify_texts(texts, top_k=top_k, current=current, features=features)
+        drift_monitor.observe(texts, features, results, current)
+        record_predictions(results)
+        return results
+    
+    keys = [PredictionCache.make_key(text, current.model_version, top_k) for text in texts]
+    results = [prediction_cache.get(key) for key in keys] if prediction_cache.enabled else [None] * len(texts)
+    duplicate_of = [None] * len(texts)
+    if dedup:
+        # Exact repeats are found by key, before anything is vectorized
+        for i, key in enumerate(keys):
+            entry = duplicate_index.get_exact(key, current.model_version)
+            if entry is not None and entry.ticket_id != ticket_ids[i]:
+                results[i] = results[i] or entry.result
+                duplicate_of[i] = entry.ticket_id
+                metrics.inc("triage_duplicates_total", (("match", "exact"),))
     
-    # Preprocess
-    full_text = clean_text(subject) + " " + clean_text(description)
+    # Exact copies within the batch follow their first occurrence instead of being scored again
+    first = {}
+    followers = {}
+    for i, result in enumerate(results):
+        if result is None:
+            leader = first.setdefault(keys[i], i)
+            if leader != i:
+                followers[i] = leader
+    misses = list(first.values())
+    features = None
     
-    # Vectorize
-    vectorized_text = vectorizer.transform([full_text])
+    if misses and dedup:
+        features = vectorize_texts([texts[i] for i in misses], current)
+        with metrics.stage("dedup"):
+            matches = duplicate_index.lookup(features, current.model_version, top_k, [ticket_ids[i] for i in misses])
+            unmatched = [row for row, (entry, _) in enumerate(matches) if entry is None]
+            leaders = duplicate_index.group(features, unmatched, [matches[row][1] for row in unmatched])
+        for i, (entry, _) in zip(misses, matches):
+            if entry is not None:
+                results[i] = entry.result
+                duplicate_of[i] = entry.ticket_id
+                metrics.inc("triage_duplicates_total", (("match", "near"),))
+        scored_rows = [row for row in unmatched if leaders[row] == row]
+        if scored_rows:
+            scored = classify_texts([texts[misses[row]] for row in scored_rows], top_k=top_k, current=current,
+                                    features=features[scored_rows])
+            for row, result in zip(scored_rows, scored):
+                i = misses[row]
+                results[i] = result
+                prediction_cache.put(keys[i], result)
+                if ticket_ids[i] not in (None, "unknown"):
+                    duplicate_index.add(ticket_ids[i], keys[i], features, row, matches[row][1], result,
+                                        current.model_version, top_k)
+        for row in unmatched:
+            if leaders[row] != row:
+                followers[misses[row]] = misses[leaders[row]]
+    elif misses:
+        features = serving_features([texts[i] for i in misses], current)
+        scored = classify_texts([texts[i] for i in misses], top_k=top_k, current=current, features=features)
+        for i, result in zip(misses, scored):
+            prediction_cache.put(keys[i], result)
+            results[i] = result
+    
+    for i, leader in followers.items():
+        # An exact copy of a near-duplicate follows that ticket's own leader
+        while leader in followers:
+            leader = followers[leader]
+        results[i] = results[leader]
+        if not dedup:
+            continue
+        # Point at the leader's original if it had one, otherwise at the leader itself
+        original = duplicate_of[leader] or ticket_ids[leader]
+        if original not in (None, "unknown") and original != ticket_ids[i]:
+            duplicate_of[i] = original
+            metrics.inc("triage_duplicates_total", (("match", "exact" if keys[i] == keys[leader] else "near"),))
+    # Repeats and duplicate storms shift the served mix too, so the monitor sees every result
+    drift_monitor.observe([texts[i] for i in misses], features, results, current)
+    record_predictions(results)
+    return [dict(result, duplicate_of=original) if original is not None else result
+            for result, original in zip(results, duplicate_of)]
+
+def parse_batch_body(body, mimetype):
+    """Return (items, error) from a JSON array or NDJSON body; undecodable lines become {"_error": ...}."""
+    if mimetype in NDJSON_CONTENT_TYPES:
+        items = []
+        for line in body.splitlines():
+            if not line.strip():
+                continue
+            try:
+                items.append(json.loads(line))
+            except ValueError as e:
+                items.append({"_error": f"Invalid JSON line: {e}"})
+        return items, None
+
+    if mimetype != "application/json" and not mimetype.endswith("+json"):
+        return None, "Request must be a JSON array or NDJSON"
+
+    try:
+        data = json.loads(body)
+    except ValueError:
+        data = None
+    if isinstance(data, dict):
+        data = data.get("tickets")
+    if not isinstance(data, list):
+        return None, "Request body must be a list of tickets or {\"tickets\": [...]}"
+    return data, None
+
+def score_batch_items(items, top_k=None, current=None):
+    """Validate, clean and score decoded batch items; returns the /predict/batch response body."""
+    current = current or state
+    results = [None] * len(items)
+    valid_positions = []
+    valid_texts = []
+    valid_ids = []
     
-    # Predict
-    prediction_idx = model.predict(vectorized_text)[0]
-    predicted_category = label_encoder.inverse_transform([prediction_idx])[0]
+    # Validate and clean every ticket, recording errors per position
+    with metrics.stage("clean"):
+        for i, item in enumerate(items):
+            if isinstance(item, dict) and "_error" in item:
+                results[i] = {"index": i, "ticket_id": "unknown", "error": item["_error"]}
+                continue
+            ticket_id, full_text, item_error = parse_ticket(item, current)
+            if item_error:
+                results[i] = {"index": i, "ticket_id": ticket_id, "error": item_error}
+                continue
+            results[i] = {"index": i, "ticket_id": ticket_id}
+            valid_positions.append(i)
+            valid_texts.append(full_text)
+            valid_ids.append(ticket_id)
     
-    # Confidence (if supported by model)
-    confidence = "N/A"
-    if hasattr(model, "predict_proba"):
-        probs = model.predict_proba(vectorized_text)
-        confidence = float(probs[0][prediction_idx])
+    # Score all valid tickets in a single sparse-matrix pass
+    if valid_texts:
+        for i, result in zip(valid_positions, classify_texts_cached(valid_texts, top_k=top_k, current=current,
+                                                                    ticket_ids=valid_ids)):
+            results[i].update(result)
     
-    response = {
-        "ticket_id": ticket_id,
-        "predicted_category": predicted_category,
-        "confidence": confidence
+    return {
+        "count": len(results),
+        "errors": len(results) - len(valid_texts),
+        "results": results
     }
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+    g.profiler = profiler.start() if request.endpoint != "metrics_endpoint" else None
+
+@app.after_request
+def record_request(response):
+    start = g.get("request_start")
+    if start is not None:
+        elapsed = time.perf_counter() - start
+        endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+        metrics.observe("triage_request_duration_seconds", elapsed, (("endpoint", endpoint),))
+        metrics.inc("triage_requests_total", (("endpoint", endpoint), ("status", str(response.status_code))))
+    return response
+
+@app.teardown_request
+def finish_profile(exc=None):
+    sampled = g.pop("profiler", None)
+    if sampled is not None:
+        elapsed_ms = (time.perf_counter() - g.request_start) * 1000
+        path = profiler.finish(sampled, elapsed_ms, name=request.endpoint or "request")
+        if path:
+            print(f"Slow request ({elapsed_ms:.1f} ms) profiled to {path}")
+
+def metrics_text():
+    """Registry contents plus cache and model gauges, in the Prometheus text format."""
+    cache = prediction_cache.stats()
+    drift = drift_monitor.report()
+    current = state
+    extra = [
+        ("triage_cache_hits_total", "counter", "Prediction cache hits.", [((), cache["hits"])]),
+        ("triage_cache_misses_total", "counter", "Prediction cache misses.", [((), cache["misses"])]),
+        ("triage_cache_size", "gauge", "Entries in the prediction cache.", [((), cache["size"])]),
+        ("triage_duplicate_index_size", "gauge", "Tickets held in the duplicate index.", [((), duplicate_index.stats()["size"])]),
+        ("triage_drift_signal", "gauge", "Last closed drift window: PSI or rate per signal.",
+         [((("signal", name),), signal["value"]) for name, signal in drift["signals"].items()]),
+        ("triage_drift_alert", "gauge", "1 if the signal exceeded its threshold in the last closed window.",
+         [((("signal", name),), int(signal["alert"])) for name, signal in drift["signals"].items()]),
+        ("triage_drift_dropped_total", "counter", "Scored batches the drift monitor dropped because it was behind.",
+         [((), drift["dropped"])]),
+        ("triage_model_info", "gauge", "Model version currently serving.",
+         [((("version", current.model_version if current else "none"), ("mode", SERVING_MODE)), 1)])
+    ]
+    return metrics.render(extra)
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    return metrics_text(), 200, {"Content-Type": "text/plain; version=0.0.4; charset=utf-8"}
+
+@app.route('/cache/stats', methods=['GET'])
+def cache_stats():
+    stats = prediction_cache.stats()
+    stats["model_version"] = state.model_version if state else None
+    return jsonify(stats), 200
+
+@app.route('/duplicates/stats', methods=['GET'])
+def duplicate_stats():
+    return jsonify(duplicate_index.stats()), 200
+
+def drift_status():
+    """Drift monitor report plus the serving state's baseline, shared by the Flask and ASGI apps."""
+    report = drift_monitor.report()
+    current = state
+    report["baseline"] = current.drift_baseline if current else None
+    return report
+
+@app.route('/drift', methods=['GET'])
+def drift_report():
+    return jsonify(drift_status()), 200
+
+LOOPBACK_ADDRESSES = ("127.0.0.1", "::1")
+
+def admin_authorized():
+    # With TRIAGE_ADMIN_TOKEN set, callers need it; without one, only local callers may reload
+    token = os.environ.get("TRIAGE_ADMIN_TOKEN")
+    if not token:
+        return request.remote_addr in LOOPBACK_ADDRESSES
+    return hmac.compare_digest(request.headers.get("X-Admin-Token", ""), token)
+
+@app.route('/admin/reload', methods=['GET', 'POST'])
+def admin_reload():
+    if not admin_authorized():
+        return jsonify({"error": "Unauthorized"}), 401
+    
+    if request.method == 'POST':
+        wait = request.args.get("wait", "false").lower() in ("1", "true", "yes")
+        started = reloader.reload(wait=wait, reason="admin")
+        status = reloader.status()
+        status["started"] = started
+        status["model_version"] = state.model_version if state else None
+        if wait and status["state"] == "failed":
+            return jsonify(status), 500
+        return jsonify(status), 200 if wait else 202
+    
+    status = reloader.status()
+    status["model_version"] = state.model_version if state else None
+    return jsonify(status), 200
+
+@app.route('/predict', methods=['POST'])
+def predict():
+    if not request.is_json:
+        return jsonify({"error": "Request must be JSON"}), 400
+    
+    # Pin one state for the whole request so a concurrent reload cannot mix models
+    current = state
+    with metrics.stage("json_decode"):
+        data = request.get_json()
+    with metrics.stage("clean"):
+        ticket_id, full_text, error = parse_ticket(data, current)
+    
+    if error:
+        return jsonify({"error": error}), 400
+    
+    top_k = query_top_k(request.args.get("top_k"))
+    top_k, error = parse_top_k(data.get("top_k") if top_k is None else top_k)
+    if error:
+        return jsonify({"error": error}), 400
+    
+    response = {"ticket_id": ticket_id}
+    response.update(classify_texts_cached([full_text], top_k=top_k, current=current, ticket_ids=[ticket_id])[0])
     
     return jsonify(response), 200
 
+@app.route('/predict/batch', methods=['POST'])
+def predict_batch():
+    with metrics.stage("json_decode"):
+        items, error = parse_batch_body(request.get_data(as_text=True), request.mimetype)
+    if error:
+        return jsonify({"error": error}), 400
+    
+    if len(items) > MAX_BATCH_SIZE:
+        return jsonify({"error": f"Batch too large: {len(items)} tickets (max {MAX_BATCH_SIZE})"}), 413
+    
+    top_k, error = parse_top_k(query_top_k(request.args.get("top_k")))
+    if error:
+        return jsonify({"error": error}), 400
+    
+    return jsonify(score_batch_items(items, top_k=top_k)), 200
+
+def parse_feedback(data, current):
+    """Return (record, error) for one correction: the ticket plus the category an agent assigned."""
+    _, _, error = parse_ticket(data, current)
+    if error:
+        return None, error
+    category = data.get("category")
+    if category not in set(str(cls) for cls in current.label_encoder.classes_):
+        return None, f"Unknown category: {category!r}"
+    return {
+        "ticket_id": data.get("ticket_id", "unknown"),
+        "subject": data.get("subject", ""),
+        "description": data.get("description", ""),
+        "category": category,
+        "predicted_category": data.get("predicted_category"),
+        "model_version": current.model_version,
+        "received_at": time.time()
+    }, None
+
+def accept_feedback(data, current=None):
+    """Validate and log corrections (one object or a list); returns the /feedback (body, status code)."""
+    current = current or state
+    items = data if isinstance(data, list) else [data]
+    if len(items) > MAX_BATCH_SIZE:
+        return {"error": f"Batch too large: {len(items)} tickets (max {MAX_BATCH_SIZE})"}, 413
+    
+    records, errors = [], []
+    for i, item in enumerate(items):
+        record, error = parse_feedback(item, current)
+        if error:
+            errors.append({"index": i, "error": error})
+        else:
+            records.append(record)
+    if records:
+        feedback_learner.submit(records)
+        for record in records:
+            predicted = record["predicted_category"]
+            outcome = "unknown" if predicted is None else "confirmed" if predicted == record["category"] else "corrected"
+            metrics.inc("triage_feedback_total", (("outcome", outcome),))
+    
+    online, reason = feedback_learner.learns(current)
+    body = {"accepted": len(records), "errors": errors, "model_version": current.model_version, "online": online}
+    if not online:
+        body["message"] = f"Corrections are only logged for offline retraining: {reason}"
+    return body, 202 if records else 400
+
+@app.route('/feedback', methods=['POST'])
+def feedback():
+    """Record corrected categories; they are learned online, not on this request."""
+    if not request.is_json:
+        return jsonify({"error": "Request must be JSON"}), 400
+    body, status = accept_feedback(request.get_json())
+    return jsonify(body), status
+
+def feedback_status():
+    stats = feedback_learner.stats()
+    stats["model_version"] = state.model_version if state else None
+    return stats
+
+@app.route('/feedback/stats', methods=['GET'])
+def feedback_stats():
+    return jsonify(feedback_status()), 200
+
+def start_feedback_learner():
+    """Learn logged feedback every TRIAGE_FEEDBACK_INTERVAL seconds (0 = only log it for offline retraining)."""
+    if feedback_learner.interval <= 0:
+        return None
+    return feedback_learner.start(lambda: state)
+
+def reload_changed_artifacts():
+    """Watcher callback: reload in the watcher's thread and report whether it took effect."""
+    return reloader.reload(wait=True, reason="file-watch") and reloader.status()["state"] == "succeeded"
+
+artifact_watcher = None
+
+def start_artifact_watcher(interval=None):
+    """Reload automatically when the artifacts on disk change (TRIAGE_WATCH_INTERVAL seconds, 0 = off).
+
+    At most one watcher runs per process, however many startup hooks call this.
+    """
+    global artifact_watcher
+    interval = float(os.environ.get("TRIAGE_WATCH_INTERVAL", "0")) if interval is None else interval
+    if interval <= 0:
+        return None
+    if artifact_watcher is not None and artifact_watcher.is_alive():
+        return artifact_watcher
+    artifact_watcher = ArtifactWatcher(artifact_paths, reload_changed_artifacts, interval=interval)
+    artifact_watcher.start()
+    return artifact_watcher
+
 if __name__ == '__main__':
-    load_artifacts()
+    try:
+        load_artifacts()
+    except Exception as e:
+        print(f"Error loading artifacts: {e}")
+        sys.exit(1)
+    start_artifact_watcher()
+    start_feedback_learner()
     app.run(host='0.0.0.0', port=5001)
@@ -0,0 +1,282 @@
+import os
+import sys
+import json
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs
+
+# Ensure we can import from src regardless of the working directory
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+import src.api.app as triage
+
+# Coalescing window: a request waits at most MAX_WAIT_MS for others to share its batch
+MAX_BATCH_SIZE = int(os.environ.get("TRIAGE_MICROBATCH_SIZE", "64"))
+MAX_WAIT_MS = float(os.environ.get("TRIAGE_MICROBATCH_WAIT_MS", "2"))
+
+class MicroBatcher:
+    """Coalesces concurrent single-ticket predictions into one vectorized scoring call.
+
+    Requests are queued; the batching loop takes the first waiting request,
+    gathers more until max_batch_size is reached or max_wait_ms has passed,
+    scores the batch on a worker thread and resolves each request's future.
+    """
+
+    def __init__(self, score_fn, max_batch_size=MAX_BATCH_SIZE, max_wait_ms=MAX_WAIT_MS):
+        self._score_fn = score_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = None
+        self._task = None
+        # One scoring thread: batches run back to back while the next one fills up
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="microbatch")
+        self.batches = 0
+        self.items = 0
+        self.largest_batch = 0
+
+    async def start(self):
+        if self._task is None:
+            self._queue = asyncio.Queue()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def submit(self, item, top_k=None):
+        """Queue one item for score_fn (the API passes (text, ticket_id)) and wait for its result."""
+        await self.start()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((item, top_k, future))
+        return await future
+
+    async def _collect(self):
+        batch = [await self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            try:
+                # Take anything already queued without waiting
+                batch.append(self._queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            self.batches += 1
+            self.items += len(batch)
+            self.largest_batch = max(self.largest_batch, len(batch))
+
+            # Requests with different top_k need different result shapes
+            groups = {}
+            for item, top_k, future in batch:
+                groups.setdefault(top_k, []).append((item, future))
+
+            for top_k, entries in groups.items():
+                items = [item for item, _ in entries]
+                try:
+                    results = await loop.run_in_executor(self._executor, self._score_fn, items, top_k)
+                except Exception as e:
+                    for _, future in entries:
+                        if not future.done():
+                            future.set_exception(e)
+                    continue
+                for (_, future), result in zip(entries, results):
+                    if not future.done():
+                        future.set_result(result)
+
+    def stats(self):
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+            "batches": self.batches,
+            "items": self.items,
+            "average_batch_size": self.items / self.batches if self.batches else 0.0,
+            "largest_batch": self.largest_batch
+        }
+
+def score_texts(tickets, top_k):
+    # Pin one serving state per batch, exactly like a Flask request does
+    current = triage.state
+    texts = [text for text, _ in tickets]
+    ticket_ids = [ticket_id for _, ticket_id in tickets]
+    return triage.classify_texts_cached(texts, top_k=top_k, current=current, ticket_ids=ticket_ids)
+
+batcher = MicroBatcher(score_texts)
+
+async def read_body(receive):
+    body = b""
+    more = True
+    while more:
+        message = await receive()
+        body += message.get("body", b"")
+        more = message.get("more_body", False)
+    return body
+
+async def send_text(send, text, content_type=b"text/plain; version=0.0.4; charset=utf-8", status=200):
+    body = text.encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", content_type), (b"content-length", str(len(body)).encode())]
+    })
+    await send({"type": "http.response.body", "body": body})
+
+async def send_json(send, payload, status=200):
+    await send_text(send, json.dumps(payload), b"application/json", status)
+
+def request_mimetype(scope):
+    for name, value in scope.get("headers", []):
+        if name == b"content-type":
+            return value.decode("latin-1").split(";")[0].strip().lower()
+    return ""
+
+def query_top_k(scope):
+    values = parse_qs(scope.get("query_string", b"").decode("latin-1"), keep_blank_values=True).get("top_k")
+    return triage.query_top_k(values[0] if values else None)
+
+async def handle_predict(scope, receive, send):
+    mimetype = request_mimetype(scope)
+    body = await read_body(receive)
+    if mimetype != "application/json" and not mimetype.endswith("+json"):
+        return await send_json(send, {"error": "Request must be JSON"}, 400)
+    try:
+        with triage.metrics.stage("json_decode"):
+            data = json.loads(body)
+    except ValueError:
+        return await send_json(send, {"error": "Request must be JSON"}, 400)
+
+    with triage.metrics.stage("clean"):
+        ticket_id, full_text, error = triage.parse_ticket(data)
+    if error:
+        return await send_json(send, {"error": error}, 400)
+
+    top_k = query_top_k(scope)
+    top_k, error = triage.parse_top_k(data.get("top_k") if top_k is None else top_k)
+    if error:
+        return await send_json(send, {"error": error}, 400)
+
+    response = {"ticket_id": ticket_id}
+    response.update(await batcher.submit((full_text, ticket_id), top_k))
+    await send_json(send, response)
+
+async def handle_predict_batch(scope, receive, send):
+    body = (await read_body(receive)).decode("utf-8", errors="replace")
+    with triage.metrics.stage("json_decode"):
+        items, error = triage.parse_batch_body(body, request_mimetype(scope))
+    if error:
+        return await send_json(send, {"error": error}, 400)
+    if len(items) > triage.MAX_BATCH_SIZE:
+        return await send_json(send, {"error": f"Batch too large: {len(items)} tickets (max {triage.MAX_BATCH_SIZE})"}, 413)
+
+    top_k, error = triage.parse_top_k(query_top_k(scope))
+    if error:
+        return await send_json(send, {"error": error}, 400)
+
+    # Already a batch: score it directly off the event loop
+    loop = asyncio.get_running_loop()
+    response = await loop.run_in_executor(None, triage.score_batch_items, items, top_k)
+    await send_json(send, response)
+
+async def handle_feedback(scope, receive, send):
+    mimetype = request_mimetype(scope)
+    body = await read_body(receive)
+    if mimetype != "application/json" and not mimetype.endswith("+json"):
+        return await send_json(send, {"error": "Request must be JSON"}, 400)
+    try:
+        data = json.loads(body)
+    except ValueError:
+        return await send_json(send, {"error": "Request must be JSON"}, 400)
+
+    # Appending to the shared feedback log is file I/O: keep it off the event loop
+    loop = asyncio.get_running_loop()
+    response, status = await loop.run_in_executor(None, triage.accept_feedback, data, triage.state)
+    await send_json(send, response, status)
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            try:
+                if triage.state is None:
+                    triage.load_artifacts()
+                await batcher.start()
+                # Same background threads as the Flask entry points; under gunicorn post_fork has already started them
+                triage.start_artifact_watcher()
+                triage.start_feedback_learner()
+            except Exception as e:
+                await send({"type": "lifespan.startup.failed", "message": str(e)})
+                return
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await batcher.stop()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+ROUTES = {
+    ("POST", "/predict"): handle_predict,
+    ("POST", "/predict/batch"): handle_predict_batch,
+    ("POST", "/feedback"): handle_feedback
+}
+
+async def app(scope, receive, send):
+    """ASGI entry point: uvicorn src.api.asgi:app"""
+    if scope["type"] == "lifespan":
+        return await lifespan(receive, send)
+    if scope["type"] != "http":
+        return
+
+    method, path = scope["method"], scope["path"]
+    if method == "GET" and path == "/health":
+        return await send_json(send, *triage.health_status())
+    if method == "GET" and path == "/batcher/stats":
+        return await send_json(send, batcher.stats())
+    if method == "GET" and path == "/duplicates/stats":
+        return await send_json(send, triage.duplicate_index.stats())
+    if method == "GET" and path == "/drift":
+        return await send_json(send, triage.drift_status())
+    if method == "GET" and path == "/feedback/stats":
+        return await send_json(send, triage.feedback_status())
+    if method == "GET" and path == "/metrics":
+        return await send_text(send, triage.metrics_text())
+
+    handler = ROUTES.get((method, path))
+    if handler is None:
+        return await send_json(send, {"error": "Not found"}, 404)
+    if triage.state is None:
+        return await send_json(send, {"error": "Model not loaded"}, 503)
+
+    start = time.perf_counter()
+    status = [500]
+
+    async def send_and_record(message):
+        if message["type"] == "http.response.start":
+            status[0] = message["status"]
+        await send(message)
+
+    try:
+        await handler(scope, receive, send_and_record)
+    finally:
+        triage.metrics.observe("triage_request_duration_seconds", time.perf_counter() - start, (("endpoint", path),))
+        triage.metrics.inc("triage_requests_total", (("endpoint", path), ("status", str(status[0]))))
+
+if __name__ == '__main__':
+    import uvicorn
+
+    uvicorn.run("src.api.asgi:app", host="0.0.0.0", port=int(os.environ.get("PORT", "5001")))
@@ -0,0 +1,256 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import threading
+import http.client
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+# Ensure we can import from src regardless of the working directory
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+import src.api.app as triage
+from src.data.make_dataset import generate_tickets
+
+MIXES = ("unique", "repeat", "batch")
+MODES = ("inprocess", "socket")
+
+def make_payloads(mix, n_requests, batch_size=50, pool_size=50, seed=42):
+    """Request bodies for one run; "repeat" draws from a small pool to model templated traffic.
+
+    Tickets come from generators seeded locally, so building payloads never
+    reseeds the process-wide random state of the API it runs next to.
+    """
+    if mix not in MIXES:
+        raise ValueError(f"Unknown payload mix: {mix}")
+    rng = random.Random(seed)
+    n_tickets = {"unique": n_requests, "repeat": pool_size, "batch": n_requests * batch_size}[mix]
+    frame = generate_tickets(n_tickets, np.random.default_rng(seed))
+    # Sequential ids rather than the generated uuids, so payloads read the same across runs
+    tickets = [{"ticket_id": f"bench-{i}", "subject": subject, "description": description}
+               for i, (subject, description) in enumerate(zip(frame["subject"], frame["description"]))]
+
+    if mix == "unique":
+        return tickets
+    if mix == "repeat":
+        return [tickets[rng.randrange(pool_size)] for _ in range(n_requests)]
+    return [tickets[i:i + batch_size] for i in range(0, len(tickets), batch_size)]
+
+class InProcessClient:
+    """Drives the Flask app through its WSGI test client (no socket, full request handling)."""
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def post(self, path, body):
+        client = getattr(self._local, "client", None)
+        if client is None:
+            client = self._local.client = triage.app.test_client()
+        response = client.post(path, data=body, content_type="application/json")
+        response.get_data()
+        return response.status_code
+
+    def close(self):
+        pass
+
+class SocketClient:
+    """Runs the Flask app on a local threaded server and talks HTTP/1.1 keep-alive to it."""
+
+    def __init__(self):
+        from werkzeug.serving import make_server, WSGIRequestHandler
+
+        class QuietHandler(WSGIRequestHandler):
+            # Keep-alive connections, and no per-request access log skewing the timings
+            protocol_version = "HTTP/1.1"
+
+            def log_request(self, *args, **kwargs):
+                pass
+
+        self._server = make_server("127.0.0.1", 0, triage.app, threaded=True, request_handler=QuietHandler)
+        self.port = self._server.server_port
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        self._local = threading.local()
+
+    def post(self, path, body):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = http.client.HTTPConnection("127.0.0.1", self.port)
+        conn.request("POST", path, body=body, headers={"Content-Type": "application/json"})
+        response = conn.getresponse()
+        response.read()
+        return response.status
+
+    def close(self):
+        self._server.shutdown()
+
+def summarize(latencies_ms, wall_seconds, n_tickets, n_errors):
+    latencies = np.asarray(latencies_ms)
+    return {
+        "requests": int(latencies.size),
+        "tickets": int(n_tickets),
+        "errors": int(n_errors),
+        "wall_seconds": wall_seconds,
+        "requests_per_second": latencies.size / wall_seconds if wall_seconds else 0.0,
+        "tickets_per_second": n_tickets / wall_seconds if wall_seconds else 0.0,
+        "mean_ms": float(latencies.mean()),
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+        "p99_ms": float(np.percentile(latencies, 99)),
+        "max_ms": float(latencies.max())
+    }
+
+def run_load(client, path, bodies, concurrency, n_tickets):
+    latencies = [0.0] * len(bodies)
+    statuses = [0] * len(bodies)
+
+    def send(i):
+        start = time.perf_counter()
+        statuses[i] = client.post(path, bodies[i])
+        latencies[i] = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(send, range(len(bodies))))
+    wall = time.perf_counter() - start
+    return summarize(latencies, wall, n_tickets, sum(status != 200 for status in statuses))
+
+def stage_breakdown(payloads, warmup=20):
+    """Time each /predict stage for single tickets against the live serving state."""
+    current = triage.state
+    bodies = [json.dumps(payload) for payload in payloads]
+    stages = {name: [] for name in ("json_decode", "clean", "vectorize", "score", "decode")}
+
+    warmup = min(warmup, len(bodies) // 2)
+    for i, body in enumerate(bodies):
+        t0 = time.perf_counter()
+        data = json.loads(body)
+        t1 = time.perf_counter()
+        text = current.normalizer.ticket_text(data.get("subject", ""), data.get("description", ""))
+        t2 = time.perf_counter()
+        if current.scorer is not None:
+            # The compiled scorer tokenizes inside its scoring loop, so vectorize is folded into score
+            t3 = t2
+            probs, _ = current.scorer.predict_proba_with_heads([text])
+            labels, _, _, _ = triage.rank_probabilities(probs, current.scorer.classes_)
+        else:
+            X = current.vectorizer.transform([text])
+            t3 = time.perf_counter()
+            labels, _, _, _ = triage.predict_with_confidence(current.model, X)
+            if current.priority_model is not None:
+                triage.predict_with_confidence(current.priority_model, X)
+        t4 = time.perf_counter()
+        current.label_encoder.inverse_transform(labels)
+        t5 = time.perf_counter()
+
+        if i < warmup:
+            continue
+        for name, seconds in zip(stages, (t1 - t0, t2 - t1, t3 - t2, t4 - t3, t5 - t4)):
+            if name == "vectorize" and current.scorer is not None:
+                continue
+            stages[name].append(seconds * 1000)
+
+    return {
+        name: {"mean_ms": float(np.mean(values)), "p95_ms": float(np.percentile(values, 95))}
+        for name, values in stages.items() if values
+    }
+
+def run_benchmark(modes=MODES, mixes=MIXES, concurrency_levels=(1, 8, 32), n_requests=1000,
+                  batch_size=50, use_cache=False, output_path=None, seed=42):
+    if triage.state is None:
+        triage.load_artifacts()
+
+    # Benchmarks measure the model path unless the cache (and duplicate index) are explicitly part of the test
+    cache_size = triage.prediction_cache.max_size
+    dedup_size = triage.duplicate_index.max_size
+    if not use_cache:
+        triage.prediction_cache.max_size = 0
+        triage.duplicate_index.max_size = 0
+
+    runs = []
+    try:
+        for mode in modes:
+            client = InProcessClient() if mode == "inprocess" else SocketClient()
+            try:
+                for mix in mixes:
+                    payloads = make_payloads(mix, n_requests, batch_size=batch_size, seed=seed)
+                    path = "/predict/batch" if mix == "batch" else "/predict"
+                    bodies = [json.dumps(payload) for payload in payloads]
+                    n_tickets = len(bodies) * (batch_size if mix == "batch" else 1)
+
+                    # Warm up connections, caches and lazy imports before timing
+                    for body in bodies[:min(20, len(bodies))]:
+                        client.post(path, body)
+
+                    for concurrency in concurrency_levels:
+                        triage.prediction_cache.clear()
+                        triage.duplicate_index.clear()
+                        result = run_load(client, path, bodies, concurrency, n_tickets)
+                        result.update({"mode": mode, "mix": mix, "endpoint": path, "concurrency": concurrency})
+                        runs.append(result)
+                        print(f"{mode:9s} {mix:6s} c={concurrency:<3d} "
+                              f"{result['requests_per_second']:8.1f} req/s {result['tickets_per_second']:9.1f} tickets/s "
+                              f"p50 {result['p50_ms']:.3f} ms p95 {result['p95_ms']:.3f} ms p99 {result['p99_ms']:.3f} ms")
+            finally:
+                client.close()
+
+        stages = stage_breakdown(make_payloads("unique", min(n_requests, 2000), seed=seed))
+    finally:
+        triage.prediction_cache.max_size = cache_size
+        triage.duplicate_index.max_size = dedup_size
+
+    print("Per-stage single-ticket latency:")
+    for name, values in stages.items():
+        print(f"  {name:12s} mean {values['mean_ms']:.4f} ms  p95 {values['p95_ms']:.4f} ms")
+
+    report = {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count()
+        },
+        "config": {
+            "n_requests": n_requests,
+            "batch_size": batch_size,
+            "use_cache": use_cache,
+            "serving_mode": triage.SERVING_MODE,
+            "model_version": triage.state.model_version,
+            "seed": seed
+        },
+        "runs": runs,
+        "stages": stages
+    }
+
+    output_path = output_path or os.path.join("reports", "benchmark.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    with open(output_path, "w") as f:
+        json.dump(report, f, indent=4)
+    print(f"Benchmark saved to {output_path}")
+    return report
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Load-test the triage API in-process and over a local socket.")
+    parser.add_argument("--mode", choices=MODES + ("both",), default="both")
+    parser.add_argument("--mix", default=",".join(MIXES), help=f"comma-separated payload mixes from {MIXES}")
+    parser.add_argument("--concurrency", default="1,8,32", help="comma-separated client thread counts")
+    parser.add_argument("--requests", type=int, default=1000, help="requests per run")
+    parser.add_argument("--batch-size", type=int, default=50, help="tickets per /predict/batch request")
+    parser.add_argument("--cache", action="store_true", help="keep the prediction cache and duplicate index enabled")
+    parser.add_argument("--output", default=None, help="report path (default reports/benchmark.json)")
+    args = parser.parse_args()
+
+    run_benchmark(
+        modes=MODES if args.mode == "both" else (args.mode,),
+        mixes=tuple(mix.strip() for mix in args.mix.split(",") if mix.strip()),
+        concurrency_levels=tuple(int(c) for c in args.concurrency.split(",")),
+        n_requests=args.requests,
+        batch_size=args.batch_size,
+        use_cache=args.cache,
+        output_path=args.output
+    )
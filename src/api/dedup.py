@@ -0,0 +1,194 @@
+import threading
+from collections import OrderedDict, Counter
+
+import numpy as np
+
+class DuplicateEntry:
+    __slots__ = ("ticket_id", "key", "indices", "values", "bands", "result", "top_k")
+
+    def __init__(self, ticket_id, key, indices, values, bands, result, top_k):
+        self.ticket_id = ticket_id
+        self.key = key
+        self.indices = indices
+        self.values = values
+        self.bands = bands
+        self.result = result
+        self.top_k = top_k
+
+class DuplicateIndex:
+    """Bounded LSH index of recently scored tickets over their l2-normalized TF-IDF vectors.
+
+    Each vector gets an n_bands x band_bits random-hyperplane signature. Tickets
+    sharing a band value become candidates, and the candidates hitting the most
+    bands are checked with an exact cosine against the threshold. Entries belong
+    to one model version and are evicted least-recently-matched first.
+
+    The default threshold of 0.8 catches a ticket re-filed with a "Ticket ID
+    ref: NNNN" suffix (cosine 0.84-0.96 on the shipped vectorizer), while
+    distinct templates stay below 0.4.
+    """
+
+    def __init__(self, max_size=10000, threshold=0.8, n_bands=16, band_bits=8, max_candidates=8, seed=0):
+        if band_bits > 8:
+            raise ValueError("band_bits must be at most 8 (one packed byte per band)")
+        self.max_size = max_size
+        self.threshold = threshold
+        self.n_bands = n_bands
+        self.band_bits = band_bits
+        self.max_candidates = max_candidates
+        self.seed = seed
+        self._lock = threading.Lock()
+        self._reset(None, 0)
+        self.lookups = 0
+        self.exact_matches = 0
+        self.near_matches = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self):
+        return self.max_size > 0
+
+    def _reset(self, model_version, n_features):
+        self.model_version = model_version
+        self._entries = OrderedDict()
+        self._exact = {}
+        self._buckets = [{} for _ in range(self.n_bands)]
+        self._next_id = 0
+        # float32 hyperplanes: one column per signature bit
+        rng = np.random.default_rng(self.seed)
+        self._planes = rng.standard_normal((n_features, self.n_bands * self.band_bits)).astype(np.float32)
+
+    def _ensure(self, model_version, n_features):
+        # A new model means a new feature space; old vectors and results are meaningless
+        if model_version != self.model_version or n_features != self._planes.shape[0]:
+            self._reset(model_version, n_features)
+
+    def signature(self, indices, values):
+        bits = (values.astype(np.float32) @ self._planes[indices]) > 0
+        return tuple(np.packbits(bits.reshape(self.n_bands, self.band_bits), axis=1)[:, 0].tolist())
+
+    def _similar(self, indices, values, other_indices, other_values):
+        _, a, b = np.intersect1d(indices, other_indices, assume_unique=True, return_indices=True)
+        return float(values[a] @ other_values[b]) >= self.threshold
+
+    def _find_near(self, indices, values, bands, top_k, exclude_ticket_id):
+        hits = Counter()
+        for band, bucket in zip(bands, self._buckets):
+            hits.update(bucket.get(band, ()))
+        for entry_id, _ in hits.most_common(self.max_candidates):
+            entry = self._entries[entry_id]
+            if entry.top_k != top_k or entry.ticket_id == exclude_ticket_id:
+                continue
+            if self._similar(indices, values, entry.indices, entry.values):
+                return entry_id
+        return None
+
+    def get_exact(self, key, model_version):
+        """Entry previously added under this exact text key, without vectorizing anything."""
+        with self._lock:
+            if model_version != self.model_version:
+                return None
+            entry_id = self._exact.get(key)
+            if entry_id is None:
+                return None
+            self._entries.move_to_end(entry_id)
+            self.exact_matches += 1
+            return self._entries[entry_id]
+
+    def lookup(self, X, model_version, top_k=None, ticket_ids=None):
+        """For each row of the CSR matrix X: (matched entry or None, row signature)."""
+        matches = []
+        with self._lock:
+            self._ensure(model_version, X.shape[1])
+            for row in range(X.shape[0]):
+                start, end = X.indptr[row], X.indptr[row + 1]
+                indices, values = X.indices[start:end], X.data[start:end]
+                bands = self.signature(indices, values) if end > start else None
+                entry_id = None
+                if bands is not None:
+                    exclude = ticket_ids[row] if ticket_ids is not None else None
+                    entry_id = self._find_near(indices, values, bands, top_k, exclude)
+                self.lookups += 1
+                if entry_id is None:
+                    matches.append((None, bands))
+                    continue
+                self._entries.move_to_end(entry_id)
+                self.near_matches += 1
+                matches.append((self._entries[entry_id], bands))
+        return matches
+
+    def group(self, X, rows, bands):
+        """Map each of rows (of the CSR matrix X) to the first earlier row it near-duplicates, or to itself.
+
+        Used within one batch, before anything is scored or added: only rows
+        that lead their own group are bucketed, so every follower points at a leader.
+        """
+        leaders = {}
+        buckets = [{} for _ in range(self.n_bands)]
+        for row, row_bands in zip(rows, bands):
+            leaders[row] = row
+            if row_bands is None:
+                continue
+            start, end = X.indptr[row], X.indptr[row + 1]
+            indices, values = X.indices[start:end], X.data[start:end]
+            hits = Counter()
+            for band, bucket in zip(row_bands, buckets):
+                hits.update(bucket.get(band, ()))
+            for other, _ in hits.most_common(self.max_candidates):
+                other_start, other_end = X.indptr[other], X.indptr[other + 1]
+                if self._similar(indices, values, X.indices[other_start:other_end], X.data[other_start:other_end]):
+                    leaders[row] = other
+                    break
+            else:
+                for band, bucket in zip(row_bands, buckets):
+                    bucket.setdefault(band, []).append(row)
+        return leaders
+
+    def add(self, ticket_id, key, X, row, bands, result, model_version, top_k=None):
+        if not self.enabled or bands is None:
+            return
+        start, end = X.indptr[row], X.indptr[row + 1]
+        with self._lock:
+            if model_version != self.model_version:
+                return
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = DuplicateEntry(
+                ticket_id, key, np.array(X.indices[start:end]), np.array(X.data[start:end], dtype=np.float64),
+                bands, result, top_k
+            )
+            self._exact[key] = entry_id
+            for band, bucket in zip(bands, self._buckets):
+                bucket.setdefault(band, set()).add(entry_id)
+            while len(self._entries) > self.max_size:
+                self._evict()
+
+    def _evict(self):
+        entry_id, entry = self._entries.popitem(last=False)
+        if self._exact.get(entry.key) == entry_id:
+            del self._exact[entry.key]
+        for band, bucket in zip(entry.bands, self._buckets):
+            members = bucket[band]
+            members.discard(entry_id)
+            if not members:
+                del bucket[band]
+        self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._reset(None, 0)
+
+    def stats(self):
+        with self._lock:
+            matches = self.exact_matches + self.near_matches
+            return {
+                "enabled": self.enabled,
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "threshold": self.threshold,
+                "lookups": self.lookups,
+                "exact_matches": self.exact_matches,
+                "near_matches": self.near_matches,
+                "evictions": self.evictions,
+                "match_rate": matches / (self.lookups + self.exact_matches) if self.lookups + self.exact_matches else 0.0
+            }
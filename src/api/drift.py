@@ -0,0 +1,139 @@
+import queue
+import threading
+import time
+
+from src.features.drift import DriftSketch, compare, count_oov, vocabulary_of, word_tokenizer
+
+class DriftMonitor:
+    """Streams scored batches into drift sketches on a background thread.
+
+    observe() only enqueues references to what the request already has, so
+    the request path pays O(1); if the queue is full the batch is dropped and
+    counted. Predictions of every served ticket feed the category and
+    confidence sketches, features only those of the tickets actually
+    vectorized. Sketches are evaluated against the serving state's baseline
+    every window_size served tickets, and alerts come from those cheap comparisons.
+    """
+
+    def __init__(self, window_size=1000, max_pending=1000, psi_threshold=0.2, oov_tolerance=0.05, enabled=True):
+        self.window_size = window_size
+        self.psi_threshold = psi_threshold
+        self.oov_tolerance = oov_tolerance
+        self.enabled = enabled
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._version = None
+        self._window = None
+        self._total = None
+        self._tokenizer = None
+        self._vocabulary = None
+        self.last_window = None
+        self.alerts = {}
+        self.windows = 0
+        self.dropped = 0
+
+    def observe(self, texts, features, results, current):
+        """Queue one served batch: the vectorized texts and their features, plus every returned result.
+
+        features may be None, in which case compiled mode featurizes texts on the monitor thread.
+        """
+        if not self.enabled:
+            return
+        self._ensure_thread()
+        try:
+            self._queue.put_nowait((texts, features, results, current))
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+
+    def _ensure_thread(self):
+        # Started lazily, so a preloading master that forks workers never owns it
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._run, name="drift-monitor", daemon=True)
+                    self._thread.start()
+
+    def _run(self):
+        while True:
+            texts, features, results, current = self._queue.get()
+            try:
+                codes = {str(cls): i for i, cls in enumerate(current.label_encoder.classes_)}
+                labels = [codes[result["predicted_category"]] for result in results]
+                self.update(texts, features, labels, [result["confidence"] for result in results], current)
+            except Exception as e:
+                print(f"Drift monitor update failed: {e}")
+            finally:
+                self._queue.task_done()
+
+    def _start_version(self, current):
+        classes = current.label_encoder.classes_
+        self._version = getattr(current, "base_version", current.model_version)
+        self._window = DriftSketch(classes)
+        self._total = DriftSketch(classes)
+        self.last_window = None
+        self.alerts = {}
+        if current.scorer is not None:
+            self._tokenizer = current.scorer.tokenize
+            self._vocabulary = current.scorer.vocabulary
+        else:
+            self._vocabulary = vocabulary_of(current.vectorizer)
+            self._tokenizer = word_tokenizer(current.vectorizer) if self._vocabulary is not None else None
+
+    def update(self, texts, features, labels, confidences, current):
+        """Fold one batch into the sketches; runs on the monitor thread (or inline in tests).
+
+        texts/features are the vectorized rows, labels/confidences every served prediction.
+        """
+        if features is None and texts:
+            features = current.scorer.transform(texts)
+        with self._lock:
+            # Feedback updates keep the base version: same features, so the windows carry on
+            if getattr(current, "base_version", current.model_version) != self._version:
+                self._start_version(current)
+            oov = None
+            if self._vocabulary is not None:
+                oov = count_oov(self._tokenizer, self._vocabulary, texts)
+            for sketch in (self._window, self._total):
+                if features is not None:
+                    sketch.update_features(features)
+                sketch.update_predictions(labels, confidences)
+                if oov is not None:
+                    sketch.update_tokens(*oov)
+            if self._window.n_predictions >= self.window_size:
+                self._close_window(current)
+
+    def _close_window(self, current):
+        summary = self._window.summary()
+        signals = {}
+        if current.drift_baseline is not None:
+            signals = compare(current.drift_baseline, summary, current.confidence_baseline,
+                              psi_threshold=self.psi_threshold, oov_tolerance=self.oov_tolerance)
+        for name, signal in signals.items():
+            if signal["alert"] and not self.alerts.get(name, {}).get("alert"):
+                print(f"Drift alert: {name} = {signal['value']:.4f} (model {self._version})")
+        self.alerts = signals
+        self.last_window = dict(summary, closed_at=time.time())
+        self.windows += 1
+        self._window = DriftSketch(self._window.classes, self._window.n_buckets)
+
+    def flush(self):
+        """Block until every queued batch has been applied."""
+        self._queue.join()
+
+    def report(self):
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "model_version": self._version,
+                "window_size": self.window_size,
+                "windows": self.windows,
+                "pending": self._queue.qsize(),
+                "dropped": self.dropped,
+                "current_window_docs": self._window.n_predictions if self._window is not None else 0,
+                "total": self._total.summary() if self._total is not None else None,
+                "last_window": self.last_window,
+                "signals": self.alerts,
+                "alerting": sorted(name for name, signal in self.alerts.items() if signal["alert"])
+            }
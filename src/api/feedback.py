@@ -0,0 +1,338 @@
+import os
+import copy
+import json
+import fcntl
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+import numpy as np
+
+from src.models.predict_model import softmax
+from src.models.compiled_scorer import _probability_mode
+
+def parse_lines(data):
+    records = []
+    for line in data.splitlines():
+        try:
+            records.append(json.loads(line))
+        except ValueError:
+            continue
+    return records
+
+class FeedbackLog:
+    """Append-only JSONL file of corrected labels, shared by every worker process.
+
+    Each append is a single O_APPEND write of whole lines, so concurrent
+    workers never interleave records and readers only consume complete lines.
+    rotate() moves records a retrained model already covers to <path>.archive;
+    appends and rotation hold an flock on <path>.lock, so no append is lost.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.archive_path = f"{path}.archive"
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def _exclusive(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with self._lock:
+            fd = os.open(f"{self.path}.lock", os.O_WRONLY | os.O_CREAT, 0o644)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+                yield
+            finally:
+                # Closing the descriptor releases the flock
+                os.close(fd)
+
+    def append(self, records):
+        data = "".join(json.dumps(record) + "\n" for record in records).encode("utf-8")
+        with self._exclusive():
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, data)
+            finally:
+                os.close(fd)
+
+    def read_from(self, offset, file_id=None):
+        """(records, new offset, file id) for the complete lines after byte offset.
+
+        The file id changes when the log is rotated; given the id the offset
+        belongs to, a rotated file is read from the start instead.
+        """
+        try:
+            with open(self.path, "rb") as f:
+                stat = os.fstat(f.fileno())
+                current_id = (stat.st_dev, stat.st_ino)
+                if file_id is not None and current_id != file_id:
+                    offset = 0
+                f.seek(offset)
+                data = f.read()
+        except FileNotFoundError:
+            return [], 0, None
+        end = data.rfind(b"\n") + 1
+        return parse_lines(data[:end]), offset + end, current_id
+
+    def rotate(self, cutoff):
+        """Move records received at or before cutoff to the archive; returns how many moved.
+
+        The log is rewritten to a new file and swapped in atomically, so readers
+        holding an offset into the old one see a new file id and start over.
+        """
+        with self._exclusive():
+            try:
+                with open(self.path, "rb") as f:
+                    lines = f.read().splitlines(keepends=True)
+            except FileNotFoundError:
+                return 0
+            old, kept = [], []
+            for line in lines:
+                records = parse_lines(line)
+                (old if not records or records[0].get("received_at", 0) <= cutoff else kept).append(line)
+            if not old:
+                return 0
+            with open(self.archive_path, "ab") as f:
+                f.writelines(old)
+            with open(f"{self.path}.tmp", "wb") as f:
+                f.writelines(kept)
+            os.replace(f"{self.path}.tmp", self.path)
+        return len(old)
+
+def online_error(model):
+    """Why model cannot be updated online, or None if it can."""
+    name = model.__class__.__name__
+    if not hasattr(model, "coef_"):
+        return f"{name} has no linear weights to update online"
+    try:
+        mode = _probability_mode(model)
+    except TypeError as e:
+        return str(e)
+    return f"{name} has no log-loss to update online" if mode == "margin" else None
+
+def online_copy(model):
+    """A writable float64 copy of a linear probabilistic classifier (bundle arrays are read-only memmaps)."""
+    error = online_error(model)
+    if error:
+        raise TypeError(error)
+    online = copy.deepcopy(model)
+    online.coef_ = np.array(model.coef_, dtype=np.float64)
+    online.intercept_ = np.array(model.intercept_, dtype=np.float64)
+    return online
+
+def sgd_step(model, X, y, learning_rate, l2=0.0, update_intercept=False):
+    """One mini-batch gradient step on the model's own log-loss, in place.
+
+    Softmax (multinomial) models take the cross-entropy gradient and OvR/binary
+    models the per-class logistic one, so the served probabilities keep their
+    meaning. Apart from the l2 shrinkage, only the weights of terms in X move by
+    default: corrections tend to all point at one category, and an intercept
+    step would drag every ticket toward it. An SGDClassifier continues with its
+    own partial_fit schedule (and its own alpha).
+    """
+    if model.__class__.__name__ == "SGDClassifier":
+        model.partial_fit(X, y)
+        return
+    scores = np.asarray(X @ model.coef_.T) + model.intercept_
+    if model.coef_.shape[0] == 1:
+        targets = (y == model.classes_[1]).astype(np.float64)[:, None]
+        probs = 1.0 / (1.0 + np.exp(-scores))
+    else:
+        targets = (y[:, None] == model.classes_[None, :]).astype(np.float64)
+        probs = softmax(scores) if _probability_mode(model) == "logistic" else 1.0 / (1.0 + np.exp(-scores))
+    residuals = probs - targets
+    model.coef_ -= learning_rate * (np.asarray(X.T @ residuals).T / X.shape[0] + l2 * model.coef_)
+    if update_intercept and getattr(model, "fit_intercept", True):
+        model.intercept_ -= learning_rate * residuals.mean(axis=0)
+
+def trained_at(current):
+    """Epoch seconds the serving model was written; feedback older than this is already in it."""
+    created_at = current.bundle.header.get("created_at")
+    return datetime.fromisoformat(created_at).timestamp() if created_at else None
+
+def l2_strength(current):
+    """The served model's own L2 penalty per record, or 0.0 when the bundle does not say.
+
+    LogisticRegression minimizes C * sum(loss) + ||w||^2 / 2, i.e. mean loss plus
+    ||w||^2 / (2 * C * n) over its n training rows, so a mean-gradient step adds
+    w / (C * n). n is the bundle's train_rows.
+    """
+    C = getattr(current.model, "C", None)
+    n_rows = current.bundle.header.get("train_rows")
+    if current.model.__class__.__name__ != "LogisticRegression" or not C or not n_rows:
+        return 0.0
+    return 1.0 / (C * n_rows)
+
+class FeedbackLearner:
+    """Applies corrected labels from the feedback log to a copy of the live classifier.
+
+    Every worker tails the same log, so all of them learn the same corrections.
+    Records are applied in fixed windows of batch_size by their position in the
+    log, not by what one step happened to read, so every worker that has read
+    the same records publishes the same weights under the same version. The
+    open, not yet full window is applied to the published copy only. Each step
+    hands a frozen copy of the updated model to publish_fn(current, model,
+    applied), which validates and swaps it in.
+    When the serving model changes underneath (a reload), the learner restarts
+    from it, rotates the feedback it already covers out of the log, and replays
+    only the newer records; a reload of the same artifacts gets the already
+    adapted model published again. l2=None takes the penalty from the served
+    model (see l2_strength).
+    """
+
+    def __init__(self, log, publish_fn, interval=10.0, batch_size=64, learning_rate=0.5, epochs=3, l2=None):
+        self.log = log
+        self._publish_fn = publish_fn
+        self.interval = interval
+        self.batch_size = batch_size
+        self.learning_rate = learning_rate
+        self.epochs = epochs
+        self.l2 = l2
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._base_version = None
+        # The online copy of the serving model, and it with every full window applied
+        self._base_model = None
+        self._model = None
+        self._pending = []
+        self._l2 = 0.0
+        # Set when the serving model of _base_version cannot learn online; feedback is then only logged
+        self._disabled = None
+        # The state the last publish was based on, and the model it published
+        self._published_on = None
+        self._published_model = None
+        self._offset = 0
+        self._file_id = None
+        self._cutoff = None
+        self._stats = {"accepted": 0, "applied": 0, "skipped": 0, "updates": 0, "failures": 0,
+                       "last_update_at": None, "last_update_ms": None, "error": None}
+
+    def submit(self, records):
+        self.log.append(records)
+        with self._lock:
+            self._stats["accepted"] += len(records)
+
+    def _reset(self, current):
+        try:
+            model = online_copy(current.model)
+        except TypeError as e:
+            model = None
+            self._disabled = str(e)
+            self._stats["error"] = f"{e.__class__.__name__}: {e}"
+            print(f"Feedback is only logged for model {current.base_version}: {e}")
+        else:
+            self._disabled = None
+            self._stats["error"] = None
+        self._base_version = current.base_version
+        self._base_model = model
+        self._cutoff = trained_at(current)
+        self._l2 = self.l2 if self.l2 is not None else l2_strength(current)
+        if self._cutoff is not None:
+            # Keeps startup and reload replay proportional to the feedback since the last retrain
+            rotated = self.log.rotate(self._cutoff)
+            if rotated:
+                print(f"Moved {rotated} feedback records covered by model {current.base_version} to {self.log.archive_path}")
+        self._restart()
+
+    def _restart(self):
+        """Replay the log from its first record onto the unadapted model."""
+        self._model = copy.deepcopy(self._base_model)
+        self._pending = []
+        self._offset = 0
+        self._file_id = None
+        self._stats["applied"] = 0
+
+    def _apply(self, model, window, current):
+        texts, labels = zip(*window)
+        X = current.vectorizer.transform(list(texts))
+        y = np.asarray(labels, dtype=np.int64)
+        for _ in range(self.epochs):
+            sgd_step(model, X, y, self.learning_rate, self._l2)
+
+    def learns(self, current):
+        """(True, None) if feedback can change current's model online, else (False, reason)."""
+        if self.interval <= 0:
+            return False, "online learning is off (TRIAGE_FEEDBACK_INTERVAL=0)"
+        error = online_error(current.model)
+        return error is None, error
+
+    def step(self, current):
+        """Apply the log records added since the last step; returns how many were applied."""
+        with self._lock:
+            start = time.perf_counter()
+            if current.base_version != self._base_version:
+                self._reset(current)
+            if self._disabled is not None:
+                return 0
+            records, offset, file_id = self.log.read_from(self._offset, self._file_id)
+            if file_id != self._file_id and self._file_id is not None:
+                # Another worker rotated the log; the rewritten file is replayed from its first record
+                self._restart()
+            self._offset, self._file_id = offset, file_id
+            codes = {str(cls): i for i, cls in enumerate(current.label_encoder.classes_)}
+            texts = []
+            for record in records:
+                # A retrained model has seen older feedback; a category it lacks cannot be learned online
+                if (self._cutoff is not None and record.get("received_at", 0) <= self._cutoff) \
+                        or record.get("category") not in codes:
+                    self._stats["skipped"] += 1
+                    continue
+                texts.append(current.normalizer.ticket_text(record.get("subject", ""), record.get("description", "")))
+                self._pending.append((texts[-1], codes[record["category"]]))
+            if texts:
+                while len(self._pending) >= self.batch_size:
+                    window, self._pending = self._pending[:self.batch_size], self._pending[self.batch_size:]
+                    self._apply(self._model, window, current)
+                self._stats["applied"] += len(texts)
+            elif not self._stats["applied"] or current is self._published_on or current.model is self._published_model:
+                # Nothing new, and the adapted model is still the one serving. It is published again when a
+                # reload of the same artifacts (same base version) put the unadapted classifier back.
+                return 0
+            applied = self._stats["applied"]
+            # Requests keep reading the published copy while the next step updates this one
+            published = copy.deepcopy(self._model)
+            if self._pending:
+                # The open window is applied again in full once it fills up
+                self._apply(published, self._pending, current)
+        try:
+            self._publish_fn(current, published, applied)
+        except Exception as e:
+            with self._lock:
+                self._stats.update({"failures": self._stats["failures"] + 1, "error": f"{e.__class__.__name__}: {e}"})
+            print(f"Feedback update rejected, keeping current model: {e}")
+            return 0
+        with self._lock:
+            self._published_on, self._published_model = current, published
+            self._stats.update({"updates": self._stats["updates"] + 1, "last_update_at": time.time(),
+                                "last_update_ms": (time.perf_counter() - start) * 1000, "error": None})
+        return len(texts)
+
+    def start(self, state_fn):
+        """Run step() on the live state every interval seconds in a daemon thread."""
+        if self._thread is not None and self._thread.is_alive():
+            return self._thread
+
+        def run():
+            while not self._stop_event.wait(self.interval):
+                current = state_fn()
+                if current is None:
+                    continue
+                try:
+                    self.step(current)
+                except Exception as e:
+                    print(f"Feedback step failed: {e}")
+
+        self._thread = threading.Thread(target=run, name="feedback-learner", daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def stop(self):
+        self._stop_event.set()
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, base_version=self._base_version, disabled=self._disabled, log_offset=self._offset,
+                        pending=len(self._pending), interval=self.interval, batch_size=self.batch_size,
+                        learning_rate=self.learning_rate, l2=self._l2)
@@ -0,0 +1,37 @@
+"""Gunicorn settings for preloaded serving.
+
+    gunicorn -c src/api/gunicorn_conf.py "src.api.app:create_app()"
+    gunicorn -c src/api/gunicorn_conf.py -k uvicorn.workers.UvicornWorker src.api.asgi:app
+
+The master imports the app, loads and warms the model once, then forks the
+workers, so adding a worker costs a fork instead of an import + unpickle.
+"""
+import os
+import gc
+
+bind = os.environ.get("TRIAGE_BIND", "0.0.0.0:5001")
+workers = int(os.environ.get("TRIAGE_WORKERS", str(os.cpu_count() or 1)))
+threads = int(os.environ.get("TRIAGE_THREADS", "1"))
+preload_app = True
+
+def on_starting(server):
+    # Runs in the master after the preloaded import; covers entry points without a factory (the ASGI app)
+    import src.api.app as triage
+
+    if triage.state is None:
+        triage.load_artifacts()
+    body, _ = triage.health_status()
+    server.log.info(f"Model {body['model_version']} loaded in {body['load_ms']:.1f} ms, "
+                    f"warmed up in {body['warmup_ms']:.1f} ms; forking {workers} worker(s)")
+
+def pre_fork(server, worker):
+    # Move everything loaded so far into the permanent generation: worker GC passes then never
+    # write to (and so copy) the model objects' pages shared with the master
+    gc.freeze()
+
+def post_fork(server, worker):
+    import src.api.app as triage
+
+    # Threads do not survive fork, so each worker starts its own artifact watcher and feedback learner
+    triage.start_artifact_watcher()
+    triage.start_feedback_learner()
@@ -0,0 +1,192 @@
+import os
+import time
+import random
+import cProfile
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Stage latencies for a single ticket sit in the 10µs-1ms range; batches reach seconds
+LATENCY_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025,
+                   0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+CONFIDENCE_BUCKETS = (0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 0.95, 0.99, 1.0)
+
+STAGES = ("json_decode", "clean", "vectorize", "dedup", "score", "decode")
+
+class Histogram:
+    """Fixed-bucket cumulative histogram: O(log buckets) observe, constant memory."""
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        total = 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            total += count
+            yield bound, total
+
+def escape_label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{escape_label(value)}"' for name, value in labels) + "}"
+
+def format_bound(bound):
+    return "+Inf" if bound == float("inf") else repr(bound)
+
+class MetricsRegistry:
+    """In-memory counters and histograms rendered in the Prometheus text format.
+
+    Series are keyed by (name, labels) and created on first use; one lock
+    guards all updates, which are a dict lookup and a few integer increments.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+        self._help = {}
+
+    def describe(self, name, text):
+        self._help[name] = text
+
+    def inc(self, name, labels=(), amount=1):
+        with self._lock:
+            key = (name, labels)
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def observe(self, name, value, labels=(), buckets=LATENCY_BUCKETS):
+        self.observe_many(name, (value,), labels, buckets)
+
+    def observe_many(self, name, values, labels=(), buckets=LATENCY_BUCKETS):
+        with self._lock:
+            key = (name, labels)
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(buckets)
+            for value in values:
+                histogram.observe(value)
+
+    @contextmanager
+    def time(self, name, labels=()):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, labels)
+
+    def stage(self, stage):
+        return self.time("triage_stage_duration_seconds", (("stage", stage),))
+
+    def counter_value(self, name, labels=()):
+        with self._lock:
+            return self._counters.get((name, labels), 0)
+
+    def histogram(self, name, labels=()):
+        with self._lock:
+            return self._histograms.get((name, labels))
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def render(self, extra=None):
+        """Prometheus text exposition; extra is a list of (name, kind, help, [(labels, value)]) gauges."""
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted((key, (h.sum, h.count, list(h.cumulative())))
+                                for key, h in self._histograms.items())
+
+        lines = []
+        described = set()
+
+        def header(name, kind, default_help=""):
+            if name in described:
+                return
+            described.add(name)
+            text = self._help.get(name, default_help)
+            if text:
+                lines.append(f"# HELP {name} {text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        for (name, labels), value in counters:
+            header(name, "counter")
+            lines.append(f"{name}{format_labels(labels)} {value}")
+
+        for (name, labels), (total, count, buckets) in histograms:
+            header(name, "histogram")
+            for bound, cumulative in buckets:
+                lines.append(f"{name}_bucket{format_labels(labels + (('le', format_bound(bound)),))} {cumulative}")
+            lines.append(f"{name}_sum{format_labels(labels)} {total}")
+            lines.append(f"{name}_count{format_labels(labels)} {count}")
+
+        for name, kind, text, samples in extra or []:
+            header(name, kind, text)
+            for labels, value in samples:
+                lines.append(f"{name}{format_labels(labels)} {value}")
+
+        return "\n".join(lines) + "\n"
+
+class SlowRequestProfiler:
+    """Opt-in sampling profiler: cProfile a fraction of requests and keep only the slow ones.
+
+    Only one request is profiled at a time (cProfile is process-wide), and at
+    most max_profiles .prof files are written, so leaving it enabled is cheap.
+    """
+
+    def __init__(self, threshold_ms=0.0, sample_rate=0.0, output_dir=os.path.join("reports", "profiles"),
+                 max_profiles=50):
+        self.threshold_ms = threshold_ms
+        self.sample_rate = sample_rate
+        self.output_dir = output_dir
+        self.max_profiles = max_profiles
+        self._busy = threading.Lock()
+        self.sampled = 0
+        self.saved = 0
+
+    @property
+    def enabled(self):
+        return self.threshold_ms > 0 and self.sample_rate > 0
+
+    def start(self):
+        """Return a running profiler if this request is sampled, else None."""
+        if not self.enabled or self.saved >= self.max_profiles or random.random() >= self.sample_rate:
+            return None
+        if not self._busy.acquire(blocking=False):
+            return None
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiler (e.g. a debugger) is already active
+            self._busy.release()
+            return None
+        self.sampled += 1
+        return profiler
+
+    def finish(self, profiler, elapsed_ms, name="request"):
+        """Stop a sampled profiler; dump its stats if the request was slow. Returns the file path or None."""
+        if profiler is None:
+            return None
+        try:
+            profiler.disable()
+            if elapsed_ms < self.threshold_ms or self.saved >= self.max_profiles:
+                return None
+            os.makedirs(self.output_dir, exist_ok=True)
+            path = os.path.join(self.output_dir, f"{name}-{time.strftime('%Y%m%d-%H%M%S')}-{elapsed_ms:.0f}ms-{self.saved}.prof")
+            profiler.dump_stats(path)
+            self.saved += 1
+            return path
+        finally:
+            self._busy.release()
@@ -0,0 +1,102 @@
+import os
+import threading
+import time
+
+class ModelReloader:
+    """Single-flight background reload: load, validate, then swap one reference.
+
+    load_fn() builds new serving state without touching the live one,
+    validate_fn(state) raises if the candidate is unusable, and swap_fn(state)
+    publishes it. A failed load or validation leaves the live state untouched.
+    """
+
+    def __init__(self, load_fn, validate_fn, swap_fn):
+        self._load_fn = load_fn
+        self._validate_fn = validate_fn
+        self._swap_fn = swap_fn
+        self._lock = threading.Lock()
+        self._thread = None
+        self._status = {"state": "idle", "reloads": 0, "failures": 0}
+
+    def reload(self, wait=False, reason="manual"):
+        """Start a reload; returns False if one is already running."""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return False
+            self._status.update({"state": "loading", "reason": reason, "started_at": time.time(), "error": None})
+            self._thread = threading.Thread(target=self._run, name="model-reloader", daemon=True)
+            self._thread.start()
+            thread = self._thread
+        if wait:
+            thread.join()
+        return True
+
+    def _run(self):
+        start = time.perf_counter()
+        try:
+            state = self._load_fn()
+            self._validate_fn(state)
+            self._swap_fn(state)
+        except Exception as e:
+            with self._lock:
+                self._status.update({"state": "failed", "error": f"{e.__class__.__name__}: {e}",
+                                     "failures": self._status["failures"] + 1,
+                                     "duration_ms": (time.perf_counter() - start) * 1000})
+            print(f"Model reload failed, keeping current model: {e}")
+            return
+        with self._lock:
+            self._status.update({"state": "succeeded", "version": getattr(state, "model_version", None),
+                                 "reloads": self._status["reloads"] + 1,
+                                 "duration_ms": (time.perf_counter() - start) * 1000})
+        print(f"Model reloaded: {getattr(state, 'model_version', None)}")
+
+    def status(self):
+        with self._lock:
+            return dict(self._status)
+
+class ArtifactWatcher(threading.Thread):
+    """Polls artifact files and triggers a reload once their size/mtime change and settle.
+
+    on_change() returns True once the reload it ran has succeeded. Until then the
+    change stays pending and is retried on the next poll, so a reload that was
+    busy or failed while a writer was still replacing files is not lost.
+    """
+
+    def __init__(self, paths_fn, on_change, interval=5.0):
+        super().__init__(name="artifact-watcher", daemon=True)
+        self._paths_fn = paths_fn
+        self._on_change = on_change
+        self.interval = interval
+        self._stop_event = threading.Event()
+        self._last = self.signature()
+
+    def signature(self):
+        signature = []
+        for path in self._paths_fn():
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            signature.append((path, stat.st_mtime_ns, stat.st_size))
+        return tuple(signature)
+
+    def poll(self, pending=None):
+        """One watch step; returns the changed signature still waiting to settle, if any."""
+        current = self.signature()
+        if current == self._last:
+            return None
+        if current != pending:
+            # Changed since the last poll: wait one more interval for writers to finish
+            return current
+        if self._on_change():
+            self._last = current
+            return None
+        return current
+
+    def run(self):
+        pending = None
+        while not self._stop_event.wait(self.interval):
+            pending = self.poll(pending)
+
+    def stop(self):
+        self._stop_event.set()
@@ -10,3 +10,8 @@ echo -e "\n\nTesting Prediction (Technical Issue)..."
 curl -s -X POST -H "Content-Type: application/json" \
     -d '{"ticket_id": "124", "subject": "Connection Error", "description": "Cannot connect to the database server."}' \
     http://localhost:5001/predict | python3 -m json.tool
+
+echo -e "\n\nTesting Batch Prediction..."
+curl -s -X POST -H "Content-Type: application/json" \
+    -d '[{"ticket_id": "125", "subject": "Reset password", "description": "The reset link is not arriving."}, {"ticket_id": "126", "subject": "Add dark mode", "description": "Night time viewing please."}]' \
+    http://localhost:5001/predict/batch | python3 -m json.tool
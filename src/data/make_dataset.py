@@ -4,6 +4,10 @@ import random
 import uuid
 from datetime import datetime, timedelta
 import os
+import json
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
 
 # Set random seed for reproducibility
 np.random.seed(42)
@@ -147,6 +151,160 @@ def generate_ticket():
         "timestamp": (datetime.now() - timedelta(days=random.randint(0, 365))).isoformat()
     }
 
+OUTPUT_FORMATS = ("csv", "parquet")
+ROWS_PER_SHARD = 1_000_000
+CHUNK_SIZE = 100_000
+COLUMNS = ["ticket_id", "subject", "description", "category", "priority", "timestamp"]
+
+# Flattened templates: category c owns rows [offsets[c], offsets[c + 1]) of each array
+_SUBJECTS = np.array([s for c in CATEGORIES for s in TEMPLATES[c]["subjects"]], dtype=object)
+_SUBJECT_OFFSETS = np.cumsum([0] + [len(TEMPLATES[c]["subjects"]) for c in CATEGORIES])
+_DESCRIPTIONS = np.array([d for c in CATEGORIES for d in TEMPLATES[c]["descriptions"]], dtype=object)
+_DESCRIPTION_OFFSETS = np.cumsum([0] + [len(TEMPLATES[c]["descriptions"]) for c in CATEGORIES])
+_URGENT_PRIORITY_P = [0.1, 0.2, 0.3, 0.4]
+_NORMAL_PRIORITY_P = [0.4, 0.3, 0.2, 0.1]
+
+def pick_from_templates(rng, categories, texts, offsets):
+    counts = np.diff(offsets)[categories]
+    return texts[offsets[categories] + (rng.random(len(categories)) * counts).astype(np.int64)]
+
+def add_typo(text, rng):
+    """One keyboard-style slip: drop, double or swap a letter at a random position."""
+    if len(text) < 2:
+        return text
+    i = int(rng.integers(0, len(text) - 1))
+    kind = rng.integers(0, 3)
+    if kind == 0:
+        return text[:i] + text[i + 1:]
+    if kind == 1:
+        return text[:i] + text[i] + text[i:]
+    return text[:i] + text[i + 1] + text[i] + text[i + 2:]
+
+def generate_tickets(n_rows, rng, typo_rate=0.0, reference_time=None):
+    """A DataFrame of n_rows tickets drawn with the same distribution as generate_ticket, vectorized.
+
+    Everything, including ticket ids and timestamps, comes from rng, so the
+    same seed and reference_time always produce the same rows.
+    """
+    reference_time = np.datetime64(reference_time or datetime.now(), "us")
+    categories = rng.integers(0, len(CATEGORIES), size=n_rows)
+    subjects = pd.Series(pick_from_templates(rng, categories, _SUBJECTS, _SUBJECT_OFFSETS))
+    descriptions = pd.Series(pick_from_templates(rng, categories, _DESCRIPTIONS, _DESCRIPTION_OFFSETS))
+
+    with_ref = rng.random(n_rows) > 0.8
+    refs = rng.integers(1000, 10000, size=int(with_ref.sum()))
+    descriptions[with_ref] = descriptions[with_ref] + " Please help! Ticket ID ref: " + refs.astype(str).astype(object) + "."
+    urgent = rng.random(n_rows) > 0.9
+    subjects[urgent] = "URGENT: " + subjects[urgent]
+
+    if typo_rate > 0:
+        for column in (subjects, descriptions):
+            noisy = np.flatnonzero(rng.random(n_rows) < typo_rate)
+            column.iloc[noisy] = [add_typo(text, rng) for text in column.iloc[noisy]]
+
+    priorities = np.empty(n_rows, dtype=object)
+    escalated = urgent | (categories == CATEGORIES.index("Technical Issue"))
+    priorities[escalated] = np.array(PRIORITIES, dtype=object)[
+        rng.choice(len(PRIORITIES), size=int(escalated.sum()), p=_URGENT_PRIORITY_P)]
+    priorities[~escalated] = np.array(PRIORITIES, dtype=object)[
+        rng.choice(len(PRIORITIES), size=int((~escalated).sum()), p=_NORMAL_PRIORITY_P)]
+
+    # Random version-4 UUIDs from the seeded generator rather than uuid4's OS entropy
+    id_bytes = rng.integers(0, 256, size=(n_rows, 16), dtype=np.uint8)
+    id_bytes[:, 6] = (id_bytes[:, 6] & 0x0F) | 0x40
+    id_bytes[:, 8] = (id_bytes[:, 8] & 0x3F) | 0x80
+    ticket_ids = [str(uuid.UUID(bytes=row.tobytes())) for row in id_bytes]
+
+    days = rng.integers(0, 366, size=n_rows).astype("timedelta64[D]")
+    timestamps = np.datetime_as_string(reference_time - days, unit="us")
+
+    return pd.DataFrame({
+        "ticket_id": ticket_ids,
+        "subject": subjects.to_numpy(),
+        "description": descriptions.to_numpy(),
+        "category": np.array(CATEGORIES, dtype=object)[categories],
+        "priority": priorities,
+        "timestamp": timestamps
+    }, columns=COLUMNS)
+
+def shard_path(output_dir, index, output_format):
+    return os.path.join(output_dir, f"tickets-{index:05d}.{output_format}")
+
+def write_shard(index, n_rows, seed_sequence, output_dir, output_format="csv", chunk_size=CHUNK_SIZE,
+                typo_rate=0.0, reference_time=None):
+    """Generate one shard chunk by chunk, appending each chunk to the shard file; runs in a worker."""
+    path = shard_path(output_dir, index, output_format)
+    tmp_path = f"{path}.tmp"
+    # One child seed per chunk: the rows only depend on the shard's seed, never on chunk timing
+    chunk_seeds = seed_sequence.spawn((n_rows + chunk_size - 1) // chunk_size)
+    writer = None
+    with open(tmp_path, "wb") as out:
+        for i, chunk_seed in enumerate(chunk_seeds):
+            rows = min(chunk_size, n_rows - i * chunk_size)
+            frame = generate_tickets(rows, np.random.default_rng(chunk_seed), typo_rate, reference_time)
+            if output_format == "parquet":
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+
+                table = pa.Table.from_pandas(frame, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(out, table.schema)
+                writer.write_table(table)
+            else:
+                frame.to_csv(out, index=False, header=(i == 0))
+        if writer is not None:
+            writer.close()
+    os.replace(tmp_path, path)
+    return index, n_rows
+
+def generate_dataset(n_rows, output_dir, rows_per_shard=ROWS_PER_SHARD, n_jobs=None, seed=42,
+                     output_format="csv", chunk_size=CHUNK_SIZE, typo_rate=0.0, reference_time=None):
+    """Write n_rows synthetic tickets to output_dir as shards generated in parallel.
+
+    Shard i is always seeded from SeedSequence(seed).spawn(...)[i], so the
+    output is identical for any n_jobs. Memory per worker is bounded by chunk_size.
+    """
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Unknown output format: {output_format}. Choose from {OUTPUT_FORMATS}.")
+    if output_format == "parquet":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise ImportError("Parquet output needs pyarrow: pip install pyarrow")
+    n_jobs = n_jobs or os.cpu_count() or 1
+    # Pin the timestamps' reference point so every shard (and a rerun) shares it
+    reference_time = (reference_time or datetime.now()).isoformat()
+
+    n_shards = max(1, (n_rows + rows_per_shard - 1) // rows_per_shard)
+    shard_rows = [min(rows_per_shard, n_rows - i * rows_per_shard) for i in range(n_shards)]
+    shard_seeds = np.random.SeedSequence(seed).spawn(n_shards)
+    os.makedirs(output_dir, exist_ok=True)
+
+    print(f"Generating {n_rows} tickets in {n_shards} shard(s) with {n_jobs} worker(s)...")
+    start = time.perf_counter()
+    args = [(i, shard_rows[i], shard_seeds[i], output_dir, output_format, chunk_size, typo_rate, reference_time)
+            for i in range(n_shards)]
+    if n_jobs == 1:
+        results = [write_shard(*a) for a in args]
+    else:
+        with ProcessPoolExecutor(min(n_jobs, n_shards)) as pool:
+            results = list(pool.map(write_shard, *zip(*args)))
+    elapsed = time.perf_counter() - start
+    print(f"Wrote {sum(rows for _, rows in results)} tickets in {elapsed:.1f}s ({n_rows / elapsed:.0f} tickets/s)")
+
+    manifest = {
+        "n_rows": n_rows,
+        "seed": seed,
+        "typo_rate": typo_rate,
+        "reference_time": reference_time,
+        "format": output_format,
+        "shards": [{"path": os.path.basename(shard_path(output_dir, i, output_format)), "rows": rows}
+                   for i, rows in results]
+    }
+    with open(os.path.join(output_dir, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=4)
+    return manifest
+
 def main():
     print("Generating synthetic dataset...")
     data = [generate_ticket() for _ in range(5000)]
@@ -164,4 +322,20 @@ def main():
     print(df['category'].value_counts())
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Generate synthetic support tickets.")
+    parser.add_argument("--rows", type=int, default=None,
+                        help="generate this many tickets as parallel shards (default: 5000 tickets to data/raw/tickets.csv)")
+    parser.add_argument("--output-dir", default=os.path.join("data", "raw", "shards"), help="shard directory")
+    parser.add_argument("--rows-per-shard", type=int, default=ROWS_PER_SHARD)
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="rows generated and written at a time")
+    parser.add_argument("--n-jobs", type=int, default=None, help="worker processes (default: all CPUs)")
+    parser.add_argument("--format", choices=OUTPUT_FORMATS, default="csv")
+    parser.add_argument("--typo-rate", type=float, default=0.0, help="fraction of subjects/descriptions given a typo")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    if args.rows is None:
+        main()
+    else:
+        generate_dataset(args.rows, args.output_dir, rows_per_shard=args.rows_per_shard, n_jobs=args.n_jobs,
+                         seed=args.seed, output_format=args.format, chunk_size=args.chunk_size,
+                         typo_rate=args.typo_rate)
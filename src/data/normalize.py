@@ -0,0 +1,109 @@
+import re
+from functools import lru_cache
+
+# Bump whenever cleaning output changes; artifacts persist the version they were built with
+NORMALIZER_VERSION = 1
+
+# Rows cleaned per pass in the vectorized path
+CLEAN_CHUNK_SIZE = 100000
+
+# Subjects such as "Reset password" repeat constantly, so a small memo pays off at serving time
+MEMO_SIZE = 4096
+
+# NUL is stripped by clean_text, so it can delimit rows inside one joined string
+_SEPARATOR = "\x00"
+_DISALLOWED_RE = re.compile(r'[^a-z0-9\s.,!?]')
+_DISALLOWED_OR_SEPARATOR_RE = re.compile(r'[^a-z0-9\s.,!?\x00]')
+_WHITESPACE_RE = re.compile(r'\s+')
+# Only whitespace runs and non-space whitespace need rewriting; single spaces are left alone
+_WHITESPACE_RUN_RE = re.compile(r'\s\s+|[^\S ]')
+_KEPT_ASCII = set("abcdefghijklmnopqrstuvwxyz0123456789.,!? ")
+# ASCII fast path: drop disallowed characters and turn every other whitespace into a space
+_ASCII_TABLE = {
+    code: (" " if chr(code).isspace() else None)
+    for code in range(128) if chr(code) not in _KEPT_ASCII
+}
+# Same, but keeping the row separator for joined chunks
+_ASCII_CHUNK_TABLE = {code: value for code, value in _ASCII_TABLE.items() if chr(code) != _SEPARATOR}
+
+def clean_text(text):
+    if not isinstance(text, str):
+        return ""
+
+    text = text.lower()
+
+    if text.isascii():
+        # str.split() collapses exactly the whitespace runs \s+ matches and trims the ends
+        return " ".join(text.translate(_ASCII_TABLE).split())
+
+    text = _DISALLOWED_RE.sub('', text)
+
+    return _WHITESPACE_RE.sub(' ', text).strip()
+
+def _clean_chunk(texts):
+    texts = [text if isinstance(text, str) else "" for text in texts]
+    joined = _SEPARATOR.join(texts)
+    if joined.count(_SEPARATOR) != len(texts) - 1:
+        # Some value already contains the separator; fall back to row-by-row
+        return [clean_text(text) for text in texts]
+
+    joined = joined.lower()
+    if joined.isascii():
+        joined = joined.translate(_ASCII_CHUNK_TABLE)
+        while "  " in joined:
+            joined = joined.replace("  ", " ")
+    else:
+        # Two regex passes over the whole chunk instead of two per field
+        joined = _WHITESPACE_RUN_RE.sub(' ', _DISALLOWED_OR_SEPARATOR_RE.sub('', joined))
+    return [text.strip() for text in joined.split(_SEPARATOR)]
+
+def clean_texts(texts, chunk_size=CLEAN_CHUNK_SIZE):
+    """Vectorized clean_text over a sequence; output is identical to mapping clean_text."""
+    texts = list(texts)
+    cleaned = []
+    for start in range(0, len(texts), chunk_size):
+        cleaned.extend(_clean_chunk(texts[start:start + chunk_size]))
+    return cleaned
+
+class TextNormalizer:
+    """The ticket cleaning used by training and serving, persisted with the model artifacts.
+
+    Only the version and memo size are pickled; the compiled patterns and memo
+    are rebuilt on load, and loading a normalizer built by a different cleaning
+    version raises so serving can never silently diverge from training.
+    """
+
+    def __init__(self, memo_size=MEMO_SIZE):
+        self.version = NORMALIZER_VERSION
+        self.memo_size = memo_size
+        self._build()
+
+    def _build(self):
+        self._clean = lru_cache(maxsize=self.memo_size)(clean_text) if self.memo_size else clean_text
+
+    def __getstate__(self):
+        return {"version": self.version, "memo_size": self.memo_size}
+
+    def __setstate__(self, state):
+        if state["version"] != NORMALIZER_VERSION:
+            raise ValueError(
+                f"Artifacts were built with text normalizer v{state['version']}, "
+                f"but this code implements v{NORMALIZER_VERSION}. Rebuild the features."
+            )
+        self.__dict__.update(state)
+        self._build()
+
+    def clean(self, text):
+        if not isinstance(text, str):
+            return ""
+        return self._clean(text)
+
+    def ticket_text(self, subject, description):
+        # The same "subject description" layout preprocess.py writes to the text column
+        return self.clean(subject) + " " + self.clean(description)
+
+    def clean_many(self, texts):
+        return clean_texts(texts)
+
+    def cache_info(self):
+        return self._clean.cache_info() if self.memo_size else None
@@ -1,23 +1,27 @@
 import pandas as pd
 import numpy as np
-import re
 import os
+import sys
+import argparse
+from multiprocessing import Pool
 from sklearn.model_selection import train_test_split
 
-def clean_text(text):
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
 
-    if not isinstance(text, str):
-        return ""
-    
-    text = text.lower()
-    
-    text = re.sub(r'[^a-z0-9\s.,!?]', '', text)
-    
-    text = re.sub(r'\s+', ' ', text).strip()
-    
-    return text
+from src.data.normalize import clean_text, clean_texts, CLEAN_CHUNK_SIZE
+
+def clean_text_series(series, n_jobs=1, chunk_size=CLEAN_CHUNK_SIZE):
+    """Clean a pandas Series, optionally across n_jobs worker processes."""
+    texts = series.tolist()
+    if n_jobs > 1 and len(texts) > chunk_size:
+        chunks = [texts[start:start + chunk_size] for start in range(0, len(texts), chunk_size)]
+        with Pool(n_jobs) as pool:
+            cleaned = [text for chunk in pool.map(clean_texts, chunks) for text in chunk]
+    else:
+        cleaned = clean_texts(texts, chunk_size)
+    return pd.Series(cleaned, index=series.index, dtype=object)
 
-def preprocess_data():
+def preprocess_data(n_jobs=1):
     input_path = os.path.join("data", "raw", "tickets.csv")
     output_train_path = os.path.join("data", "processed", "train.csv")
     output_test_path = os.path.join("data", "processed", "test.csv")
@@ -29,8 +33,8 @@ def preprocess_data():
     df = pd.read_csv(input_path)
     
     print("Cleaning text fields...")
-    df['cleaned_subject'] = df['subject'].apply(clean_text)
-    df['cleaned_description'] = df['description'].apply(clean_text)
+    df['cleaned_subject'] = clean_text_series(df['subject'], n_jobs=n_jobs)
+    df['cleaned_description'] = clean_text_series(df['description'], n_jobs=n_jobs)
     
     df['text'] = df['cleaned_subject'] + " " + df['cleaned_description']
     
@@ -57,4 +61,7 @@ def preprocess_data():
     print(test_df['category'].value_counts(normalize=True))
 
 if __name__ == "__main__":
-    preprocess_data()
+    parser = argparse.ArgumentParser(description="Clean raw tickets and split into train/test sets.")
+    parser.add_argument("--n-jobs", type=int, default=1, help="worker processes for text cleaning")
+    args = parser.parse_args()
+    preprocess_data(n_jobs=args.n_jobs)
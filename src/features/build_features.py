@@ -1,22 +1,99 @@
 import pandas as pd
 import numpy as np
 import os
+import sys
+import argparse
 import joblib
-from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.feature_extraction.text import TfidfVectorizer, HashingVectorizer, TfidfTransformer
+from sklearn.pipeline import make_pipeline
 from sklearn.preprocessing import LabelEncoder
 from scipy import sparse
 
-def build_features():
-    train_path = os.path.join("data", "processed", "train.csv")
-    test_path = os.path.join("data", "processed", "test.csv")
-    models_dir = "models"
-    processed_dir = os.path.join("data", "processed")
-    
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
 
-    if not os.path.exists(train_path) or not os.path.exists(test_path):
-        raise FileNotFoundError("Processed data not found. Run preprocess.py first.")
+from src.data.normalize import TextNormalizer
+from src.features.feature_store import (stage_key, is_fresh, record_stage, save_features, feature_paths,
+                                        save_labels, label_paths)
+from src.features.drift import BASELINE_NAME, build_baseline, save_baseline
+
+FEATURE_MODES = ("tfidf", "hashing")
+HASHING_N_FEATURES = 2 ** 16
+CHUNK_SIZE = 50000
+
+class IncrementalIdf:
+    """Document frequencies accumulated chunk by chunk over hashed term counts."""
+
+    def __init__(self, n_features):
+        self.n_features = n_features
+        self.df = np.zeros(n_features, dtype=np.int64)
+        self.n_docs = 0
+
+    def partial_fit(self, counts):
+        # HashingVectorizer sums duplicates, so each stored index is one document hit
+        counts = sparse.csr_matrix(counts)
+        self.df += np.bincount(counts.indices, minlength=self.n_features)
+        self.n_docs += counts.shape[0]
+        return self
+
+    def to_transformer(self):
+        # Same smoothed idf as TfidfTransformer(smooth_idf=True)
+        transformer = TfidfTransformer()
+        transformer.idf_ = np.log((1 + self.n_docs) / (1 + self.df)) + 1
+        transformer.n_features_in_ = self.n_features
+        return transformer
+
+def make_hashing_vectorizer(n_features=HASHING_N_FEATURES):
+    # Raw counts; IDF weighting and l2 norm are applied by the TfidfTransformer step
+    return HashingVectorizer(
+        n_features=n_features,
+        stop_words='english',
+        ngram_range=(1, 2),
+        alternate_sign=False,
+        norm=None
+    )
+
+def make_streaming_vectorizer(n_features=HASHING_N_FEATURES):
+    # Hashing + l2 normalization only; needs no fitting pass over the data
+    hashing = make_hashing_vectorizer(n_features)
+    return make_pipeline(hashing, TfidfTransformer(use_idf=False).fit(hashing.transform([""])))
+
+def build_hashing_features(train_path, test_path, use_idf=True, n_features=HASHING_N_FEATURES, chunk_size=CHUNK_SIZE):
+    # Stream the CSVs in chunks; hashing needs no vocabulary, so memory is bounded by the output matrix
+    hashing = make_hashing_vectorizer(n_features)
+    idf = IncrementalIdf(n_features)
+    
+    train_counts = []
+    train_labels = []
+    for chunk in pd.read_csv(train_path, usecols=['text', 'category'], chunksize=chunk_size):
+        counts = hashing.transform(chunk['text'].fillna(''))
+        idf.partial_fit(counts)
+        train_counts.append(counts)
+        train_labels.append(chunk['category'])
+    
+    if use_idf:
+        vectorizer = make_pipeline(hashing, idf.to_transformer())
+    else:
+        vectorizer = make_streaming_vectorizer(n_features)
+    transformer = vectorizer.steps[-1][1]
     
-    print("Loading processed data...")
+    X_train = transformer.transform(sparse.vstack(train_counts, format='csr'))
+    
+    test_features = []
+    test_labels = []
+    for chunk in pd.read_csv(test_path, usecols=['text', 'category'], chunksize=chunk_size):
+        test_features.append(vectorizer.transform(chunk['text'].fillna('')))
+        test_labels.append(chunk['category'])
+    X_test = sparse.vstack(test_features, format='csr')
+    
+    return vectorizer, X_train, X_test, pd.concat(train_labels), pd.concat(test_labels)
+
+def read_priorities(path):
+    """The raw priority column, or None for ticket exports without one."""
+    if "priority" not in pd.read_csv(path, nrows=0).columns:
+        return None
+    return pd.read_csv(path, usecols=['priority'])['priority'].fillna('')
+
+def build_tfidf_features(train_path, test_path):
     train_df = pd.read_csv(train_path)
     test_df = pd.read_csv(test_path)
     
@@ -25,7 +102,6 @@ def build_features():
     test_df['text'] = test_df['text'].fillna('')
     
     # Initialize Vectorizer
-    print("Vectorizing text data...")
     tfidf = TfidfVectorizer(
         max_features=5000,
         stop_words='english',
@@ -36,33 +112,102 @@ def build_features():
     X_train = tfidf.fit_transform(train_df['text'])
     X_test = tfidf.transform(test_df['text'])
     
+    return tfidf, X_train, X_test, train_df['category'], test_df['category']
+
+def build_features(feature_mode="tfidf", use_idf=True, chunk_size=CHUNK_SIZE, n_features=HASHING_N_FEATURES, force=False):
+    train_path = os.path.join("data", "processed", "train.csv")
+    test_path = os.path.join("data", "processed", "test.csv")
+    models_dir = "models"
+    processed_dir = os.path.join("data", "processed")
+    
+
+    if not os.path.exists(train_path) or not os.path.exists(test_path):
+        raise FileNotFoundError("Processed data not found. Run preprocess.py first.")
+    
+    if feature_mode not in FEATURE_MODES:
+        raise ValueError(f"Unknown feature mode: {feature_mode}. Choose from {FEATURE_MODES}.")
+    
+    # Skip the whole stage when the processed CSVs and parameters match the last run
+    params = {"feature_mode": feature_mode}
+    if feature_mode == "hashing":
+        params.update({"use_idf": use_idf, "n_features": n_features})
+    outputs = feature_paths(processed_dir) + [
+        os.path.join(models_dir, name) for name in ("tfidf_vectorizer.joblib", "label_encoder.joblib", "text_normalizer.joblib", BASELINE_NAME)
+    ]
+    has_priority = "priority" in pd.read_csv(train_path, nrows=0).columns
+    if has_priority:
+        outputs += label_paths("priority", processed_dir) + [os.path.join(models_dir, "priority_encoder.joblib")]
+    key = stage_key(inputs=[train_path, test_path], params=params)
+    if not force and is_fresh("build_features", key, outputs, processed_dir):
+        print(f"Features are up to date (key {key}); skipping. Use --force to rebuild.")
+        return key
+    
+    print(f"Vectorizing text data ({feature_mode})...")
+    if feature_mode == "hashing":
+        vectorizer, X_train, X_test, train_categories, test_categories = build_hashing_features(
+            train_path, test_path, use_idf=use_idf, n_features=n_features, chunk_size=chunk_size
+        )
+    else:
+        vectorizer, X_train, X_test, train_categories, test_categories = build_tfidf_features(train_path, test_path)
+    
     # Encode Target Labels
     print("Encoding labels...")
     le = LabelEncoder()
-    y_train = le.fit_transform(train_df['category'])
-    y_test = le.transform(test_df['category'])
+    y_train = le.fit_transform(train_categories)
+    y_test = le.transform(test_categories)
+    
+    # Priority is a second target over the same rows, so it reuses X_train/X_test
+    priority_le = None
+    if has_priority:
+        priority_le = LabelEncoder()
+        y_priority_train = priority_le.fit_transform(read_priorities(train_path))
+        y_priority_test = priority_le.transform(read_priorities(test_path))
     
     # Save artifacts
     os.makedirs(models_dir, exist_ok=True)
     
-    # Save vectorizer and label encoder
+    # Save vectorizer, label encoder and the text normalizer the features were cleaned with
     print("Saving models...")
-    joblib.dump(tfidf, os.path.join(models_dir, "tfidf_vectorizer.joblib"))
+    joblib.dump(vectorizer, os.path.join(models_dir, "tfidf_vectorizer.joblib"))
     joblib.dump(le, os.path.join(models_dir, "label_encoder.joblib"))
+    joblib.dump(TextNormalizer(), os.path.join(models_dir, "text_normalizer.joblib"))
+    if priority_le is not None:
+        joblib.dump(priority_le, os.path.join(models_dir, "priority_encoder.joblib"))
     
-    # Save features
+    # Save features as raw CSR arrays so later stages can memory-map them
     print("Saving features...")
-    sparse.save_npz(os.path.join(processed_dir, "X_train.npz"), X_train)
-    sparse.save_npz(os.path.join(processed_dir, "X_test.npz"), X_test)
+    save_features(X_train, X_test, y_train, y_test, processed_dir)
+    if priority_le is not None:
+        save_labels("priority", y_priority_train, y_priority_test, processed_dir)
+    else:
+        # Labels left over from an earlier dataset no longer line up with these rows
+        for path in label_paths("priority", processed_dir) + [os.path.join(models_dir, "priority_encoder.joblib")]:
+            if os.path.exists(path):
+                os.remove(path)
     
-    np.save(os.path.join(processed_dir, "y_train.npy"), y_train)
-    np.save(os.path.join(processed_dir, "y_test.npy"), y_test)
+    # Reference statistics the API's drift monitor compares served traffic against
+    print("Saving drift baseline...")
+    holdout_texts = pd.read_csv(test_path, usecols=['text'])['text'].fillna('') if feature_mode == "tfidf" else ()
+    save_baseline(build_baseline(vectorizer, X_train, y_train, le.classes_, holdout_texts, feature_mode), models_dir)
+    record_stage("build_features", key, outputs, processed_dir)
     
     print(f"Features saved to {processed_dir}")
     print(f"Models saved to {models_dir}")
     print(f"X_train shape: {X_train.shape}")
     print(f"X_test shape: {X_test.shape}")
     print(f"Classes: {le.classes_}")
+    if priority_le is not None:
+        print(f"Priorities: {priority_le.classes_}")
+    return key
 
 if __name__ == "__main__":
-    build_features()
+    parser = argparse.ArgumentParser(description="Vectorize processed tickets and encode labels.")
+    parser.add_argument("--mode", choices=FEATURE_MODES, default="tfidf",
+                        help="tfidf fits a vocabulary; hashing is stateless and streams the CSVs in chunks")
+    parser.add_argument("--no-idf", action="store_true", help="hashing mode: skip the incremental IDF pass")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="hashing mode: rows per CSV chunk")
+    parser.add_argument("--n-features", type=int, default=HASHING_N_FEATURES, help="hashing mode: number of hash buckets")
+    parser.add_argument("--force", action="store_true", help="rebuild even if inputs and parameters are unchanged")
+    args = parser.parse_args()
+    build_features(feature_mode=args.mode, use_idf=not args.no_idf, chunk_size=args.chunk_size,
+                   n_features=args.n_features, force=args.force)
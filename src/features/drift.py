@@ -0,0 +1,188 @@
+import os
+import json
+import hashlib
+import numpy as np
+from datetime import datetime, timezone
+from scipy import sparse
+
+BASELINE_NAME = "drift_baseline.json"
+N_BUCKETS = 64
+CONFIDENCE_BINS = 10
+PSI_EPSILON = 1e-4
+
+def psi(expected, actual):
+    """Population stability index between two distributions (any non-negative weights)."""
+    expected = np.asarray(expected, dtype=np.float64)
+    actual = np.asarray(actual, dtype=np.float64)
+    if expected.sum() <= 0 or actual.sum() <= 0:
+        return 0.0
+    expected = np.maximum(expected / expected.sum(), PSI_EPSILON)
+    actual = np.maximum(actual / actual.sum(), PSI_EPSILON)
+    return float(np.sum((actual - expected) * np.log(actual / expected)))
+
+def confidence_histogram(confidences):
+    # Equal-width bins over [0, 1]; cheaper than np.histogram for the handful of values one request has
+    bins = (np.asarray(confidences, dtype=np.float64) * CONFIDENCE_BINS).astype(np.int64)
+    return np.bincount(np.clip(bins, 0, CONFIDENCE_BINS - 1), minlength=CONFIDENCE_BINS)
+
+def confidence_distribution(model, X):
+    """Share of rows per confidence bin for model on X: the reference the drift monitor compares served confidences to."""
+    return (confidence_histogram(model.predict_proba(X).max(axis=1)) / max(X.shape[0], 1)).tolist()
+
+def vectorizer_version(vectorizer):
+    """Fingerprint of the feature space: parameters, vocabulary and IDF weights of each step.
+
+    Unlike joblib.hash it does not depend on whether arrays were memory-mapped.
+    """
+    digest = hashlib.sha1()
+    for step in ([step for _, step in vectorizer.steps] if hasattr(vectorizer, "steps") else [vectorizer]):
+        params = {key: value for key, value in step.get_params().items() if key != "vocabulary"}
+        digest.update(f"{step.__class__.__name__}{sorted(params.items(), key=lambda item: item[0])!r}".encode())
+        vocabulary = getattr(step, "vocabulary_", None)
+        if vocabulary is not None:
+            digest.update(json.dumps(sorted((int(idx), str(term)) for term, idx in vocabulary.items())).encode())
+        idf = getattr(step, "idf_", None)
+        if idf is not None:
+            digest.update(np.ascontiguousarray(idf, dtype=np.float64).tobytes())
+    return digest.hexdigest()[:12]
+
+def vocabulary_of(vectorizer):
+    # Hashing features have no vocabulary, so no token is ever out of it
+    return getattr(vectorizer, "vocabulary_", None)
+
+def word_tokenizer(vectorizer):
+    """The vectorizer's own preprocessing, tokenization and stop-word filter, without building n-grams."""
+    preprocess, tokenize = vectorizer.build_preprocessor(), vectorizer.build_tokenizer()
+    stop_words = vectorizer.get_stop_words() or frozenset()
+    return lambda text: [w for w in tokenize(preprocess(text)) if w not in stop_words]
+
+def count_oov(tokenizer, vocabulary, texts):
+    """(word tokens, word tokens missing from vocabulary) over texts."""
+    tokens = oov = 0
+    for text in texts:
+        words = tokenizer(text)
+        tokens += len(words)
+        oov += sum(1 for w in words if w not in vocabulary)
+    return tokens, oov
+
+class DriftSketch:
+    """Fixed-size running summary of served tickets.
+
+    TF-IDF mass is folded into n_buckets feature buckets, so the memory cost
+    is the same for a 5k vocabulary and 2^16 hashed features. Every update is
+    O(nnz) (plus O(tokens) for the out-of-vocabulary count).
+    """
+
+    def __init__(self, classes, n_buckets=N_BUCKETS):
+        self.classes = [str(cls) for cls in classes]
+        self.n_buckets = n_buckets
+        self.feature_mass = np.zeros(n_buckets)
+        self.category_counts = np.zeros(len(self.classes))
+        self.confidence_counts = np.zeros(CONFIDENCE_BINS)
+        # n_docs counts vectorized tickets, n_predictions every served one (cache hits and duplicates too)
+        self.n_docs = 0
+        self.n_predictions = 0
+        self.nnz = 0
+        self.empty_docs = 0
+        self.tokens = 0
+        self.oov_tokens = 0
+
+    def update_features(self, X):
+        if not sparse.isspmatrix_csr(X):
+            X = sparse.csr_matrix(X)
+        self.feature_mass += np.bincount(X.indices % self.n_buckets, weights=X.data, minlength=self.n_buckets)
+        row_nnz = np.diff(X.indptr)
+        self.n_docs += X.shape[0]
+        self.nnz += int(row_nnz.sum())
+        self.empty_docs += int(np.count_nonzero(row_nnz == 0))
+
+    def update_tokens(self, tokens, oov_tokens):
+        self.tokens += tokens
+        self.oov_tokens += oov_tokens
+
+    def update_predictions(self, labels, confidences):
+        self.category_counts += np.bincount(np.asarray(labels, dtype=np.int64), minlength=len(self.classes))
+        self.n_predictions += len(labels)
+        self.confidence_counts += confidence_histogram(confidences)
+
+    def summary(self):
+        n_docs = max(self.n_docs, 1)
+        categories = self.category_counts / max(self.category_counts.sum(), 1)
+        return {
+            "n_docs": self.n_docs,
+            "n_predictions": self.n_predictions,
+            "mean_nnz": self.nnz / n_docs,
+            "empty_rate": self.empty_docs / n_docs,
+            "oov_rate": self.oov_tokens / self.tokens if self.tokens else None,
+            "feature_distribution": (self.feature_mass / max(self.feature_mass.sum(), 1e-12)).tolist(),
+            "category_distribution": dict(zip(self.classes, categories.tolist())),
+            "confidence_distribution": (self.confidence_counts / max(self.confidence_counts.sum(), 1)).tolist()
+        }
+
+def compare(baseline, window, confidence_baseline=None, psi_threshold=0.2, oov_tolerance=0.05, empty_tolerance=0.05):
+    """Per-signal drift of a window summary against the baseline, each with its alert flag."""
+    signals = {}
+    if window["oov_rate"] is not None and baseline.get("oov_rate") is not None:
+        signals["oov_rate"] = {"value": window["oov_rate"], "baseline": baseline["oov_rate"],
+                               "alert": window["oov_rate"] > baseline["oov_rate"] + oov_tolerance}
+    signals["empty_rate"] = {"value": window["empty_rate"], "baseline": baseline["empty_rate"],
+                             "alert": window["empty_rate"] > baseline["empty_rate"] + empty_tolerance}
+    if len(baseline["feature_distribution"]) == len(window["feature_distribution"]):
+        value = psi(baseline["feature_distribution"], window["feature_distribution"])
+        signals["feature_psi"] = {"value": value, "alert": value > psi_threshold}
+    classes = list(baseline["category_distribution"])
+    if classes == list(window["category_distribution"]):
+        value = psi([baseline["category_distribution"][c] for c in classes],
+                    [window["category_distribution"][c] for c in classes])
+        signals["category_psi"] = {"value": value, "alert": value > psi_threshold}
+    if confidence_baseline is not None:
+        value = psi(confidence_baseline, window["confidence_distribution"])
+        signals["confidence_psi"] = {"value": value, "alert": value > psi_threshold}
+    return signals
+
+def build_baseline(vectorizer, X_train, train_labels, classes, holdout_texts=(), feature_mode="tfidf", label_counts=None):
+    """Reference statistics of the training features, label mix and holdout OOV rate.
+
+    label_counts (per class) overrides the mix of train_labels, for callers
+    whose X_train is only a sample of what the model was trained on.
+    """
+    sketch = DriftSketch(classes)
+    sketch.update_features(X_train)
+    vocabulary = vocabulary_of(vectorizer)
+    if vocabulary is not None:
+        # Training texts are in-vocabulary by construction; unseen holdout text is the honest reference
+        sketch.update_tokens(*count_oov(word_tokenizer(vectorizer), vocabulary, holdout_texts))
+    summary = sketch.summary()
+    if label_counts is None:
+        label_counts = np.bincount(np.asarray(train_labels, dtype=np.int64), minlength=len(sketch.classes))
+    label_counts = np.asarray(label_counts, dtype=np.float64)
+    summary.pop("confidence_distribution")
+    summary.pop("n_predictions")
+    summary.update({
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "feature_mode": feature_mode,
+        "vectorizer_version": vectorizer_version(vectorizer),
+        "n_buckets": sketch.n_buckets,
+        "category_distribution": dict(zip(sketch.classes, (label_counts / max(label_counts.sum(), 1)).tolist()))
+    })
+    return summary
+
+def save_baseline(baseline, models_dir="models"):
+    path = os.path.join(models_dir, BASELINE_NAME)
+    with open(f"{path}.tmp", "w") as f:
+        json.dump(baseline, f, indent=4)
+    os.replace(f"{path}.tmp", path)
+    return path
+
+def load_baseline(models_dir="models", vectorizer=None):
+    """The saved baseline, or None if there is none or it was built for a different vectorizer than the given one."""
+    path = os.path.join(models_dir, BASELINE_NAME)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        baseline = json.load(f)
+    if vectorizer is not None and baseline.get("vectorizer_version") != vectorizer_version(vectorizer):
+        # Bucket masses from another feature space would only produce meaningless PSI alerts
+        print(f"Ignoring {path}: it was built for a different vectorizer. Rebuild it with the serving features.")
+        return None
+    return baseline
@@ -0,0 +1,166 @@
+import os
+import json
+import hashlib
+import numpy as np
+from datetime import datetime, timezone
+from scipy import sparse
+
+from src.data.normalize import NORMALIZER_VERSION
+
+PROCESSED_DIR = os.path.join("data", "processed")
+MANIFEST_NAME = "pipeline_cache.json"
+CSR_PARTS = ("data", "indices", "indptr")
+
+def file_digest(path):
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def stage_key(inputs=(), params=None, upstream=()):
+    """Content hash of a stage's input files, parameters and upstream stage keys.
+
+    The normalizer and sklearn versions are always mixed in, so upgrading
+    either invalidates every cached stage.
+    """
+    import sklearn
+
+    digest = hashlib.sha1()
+    payload = {
+        "inputs": [file_digest(path) for path in inputs],
+        "params": params or {},
+        "upstream": list(upstream),
+        "normalizer_version": NORMALIZER_VERSION,
+        "sklearn_version": sklearn.__version__
+    }
+    digest.update(json.dumps(payload, sort_keys=True, default=str).encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+def manifest_path(processed_dir=PROCESSED_DIR):
+    return os.path.join(processed_dir, MANIFEST_NAME)
+
+def load_manifest(processed_dir=PROCESSED_DIR):
+    path = manifest_path(processed_dir)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+def outputs_unchanged(entry, outputs=None):
+    """True if every output (default: the ones recorded) still has the content the stage wrote.
+
+    Promote steps overwrite the vectorizer and model in place, so existence
+    alone cannot tell a stage's own artifacts from ones copied over them.
+    """
+    digests = entry.get("digests")
+    if digests is None:
+        return False
+    paths = entry.get("outputs", []) if outputs is None else outputs
+    return all(os.path.exists(p) and digests.get(p) == file_digest(p) for p in paths)
+
+def recorded_key(stage, processed_dir=PROCESSED_DIR):
+    """The stage's last key, or None once one of its outputs has been replaced."""
+    entry = load_manifest(processed_dir).get(stage)
+    if entry is None or not outputs_unchanged(entry):
+        return None
+    return entry["key"]
+
+def stage_replaced(stage, processed_dir=PROCESSED_DIR):
+    """True if the stage ran but something else has since overwritten one of its outputs."""
+    entry = load_manifest(processed_dir).get(stage)
+    return entry is not None and "digests" in entry and not outputs_unchanged(entry)
+
+def downstream_key(params=None, inputs=(), upstream_stages=("build_features",), processed_dir=PROCESSED_DIR):
+    """Key for a stage fed by earlier stages; None (never cached) if an upstream stage has no record."""
+    upstream = [recorded_key(stage, processed_dir) for stage in upstream_stages]
+    if None in upstream:
+        return None
+    return stage_key(inputs=inputs, params=params, upstream=upstream)
+
+def is_fresh(stage, key, outputs=(), processed_dir=PROCESSED_DIR):
+    """True if stage last ran with this key and all of its outputs are still the ones it wrote."""
+    if key is None:
+        return False
+    entry = load_manifest(processed_dir).get(stage)
+    return entry is not None and entry["key"] == key and outputs_unchanged(entry, outputs)
+
+def record_stage(stage, key, outputs=(), processed_dir=PROCESSED_DIR):
+    if key is None:
+        return
+    manifest = load_manifest(processed_dir)
+    manifest[stage] = {
+        "key": key,
+        "outputs": list(outputs),
+        "digests": {path: file_digest(path) for path in outputs if os.path.exists(path)},
+        "completed_at": datetime.now(timezone.utc).isoformat()
+    }
+    os.makedirs(processed_dir, exist_ok=True)
+    path = manifest_path(processed_dir)
+    with open(f"{path}.tmp", "w") as f:
+        json.dump(manifest, f, indent=4)
+    os.replace(f"{path}.tmp", path)
+
+def save_csr(processed_dir, name, X):
+    """Store a CSR matrix as raw .npy arrays (plus a small shape header) so it can be memory-mapped."""
+    X = sparse.csr_matrix(X)
+    X.sort_indices()
+    for part in CSR_PARTS:
+        np.save(os.path.join(processed_dir, f"{name}.{part}.npy"), getattr(X, part))
+    with open(os.path.join(processed_dir, f"{name}.json"), "w") as f:
+        json.dump({"format": "csr", "shape": list(X.shape), "nnz": int(X.nnz)}, f)
+
+def load_csr(processed_dir, name, mmap_mode="r"):
+    """Rebuild a CSR matrix over memory-mapped arrays; falls back to a legacy <name>.npz."""
+    header_path = os.path.join(processed_dir, f"{name}.json")
+    if not os.path.exists(header_path):
+        return sparse.load_npz(os.path.join(processed_dir, f"{name}.npz"))
+    with open(header_path) as f:
+        header = json.load(f)
+    data, indices, indptr = (np.load(os.path.join(processed_dir, f"{name}.{part}.npy"), mmap_mode=mmap_mode)
+                             for part in CSR_PARTS)
+    # copy=False keeps the memmaps, so joblib workers receive file references instead of copies
+    X = sparse.csr_matrix((data, indices, indptr), shape=tuple(header["shape"]), copy=False)
+    X.has_sorted_indices = True
+    return X
+
+def csr_paths(processed_dir, name):
+    return [os.path.join(processed_dir, f"{name}.json")] + [
+        os.path.join(processed_dir, f"{name}.{part}.npy") for part in CSR_PARTS
+    ]
+
+def feature_paths(processed_dir=PROCESSED_DIR):
+    return (csr_paths(processed_dir, "X_train") + csr_paths(processed_dir, "X_test") +
+            [os.path.join(processed_dir, "y_train.npy"), os.path.join(processed_dir, "y_test.npy")])
+
+def save_features(X_train, X_test, y_train, y_test, processed_dir=PROCESSED_DIR):
+    os.makedirs(processed_dir, exist_ok=True)
+    save_csr(processed_dir, "X_train", X_train)
+    save_csr(processed_dir, "X_test", X_test)
+    np.save(os.path.join(processed_dir, "y_train.npy"), y_train)
+    np.save(os.path.join(processed_dir, "y_test.npy"), y_test)
+
+def label_paths(name, processed_dir=PROCESSED_DIR):
+    return [os.path.join(processed_dir, f"y_{name}_train.npy"), os.path.join(processed_dir, f"y_{name}_test.npy")]
+
+def save_labels(name, y_train, y_test, processed_dir=PROCESSED_DIR):
+    """Extra encoded targets (e.g. priority) that share the feature matrices."""
+    os.makedirs(processed_dir, exist_ok=True)
+    train_path, test_path = label_paths(name, processed_dir)
+    np.save(train_path, y_train)
+    np.save(test_path, y_test)
+
+def load_labels(name, processed_dir=PROCESSED_DIR, mmap_mode="r"):
+    """(y_train, y_test) for an extra target, or None if build_features did not encode it."""
+    paths = label_paths(name, processed_dir)
+    if not all(os.path.exists(path) for path in paths):
+        return None
+    return tuple(np.load(path, mmap_mode=mmap_mode) for path in paths)
+
+def load_features(processed_dir=PROCESSED_DIR, mmap_mode="r"):
+    """(X_train, X_test, y_train, y_test) memory-mapped from the processed directory."""
+    X_train = load_csr(processed_dir, "X_train", mmap_mode)
+    X_test = load_csr(processed_dir, "X_test", mmap_mode)
+    y_train = np.load(os.path.join(processed_dir, "y_train.npy"), mmap_mode=mmap_mode)
+    y_test = np.load(os.path.join(processed_dir, "y_test.npy"), mmap_mode=mmap_mode)
+    return X_train, X_test, y_train, y_test
@@ -0,0 +1,228 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from src.data.normalize import TextNormalizer
+from src.models.bundle import BUNDLE_NAME, load_bundle, load_legacy_artifacts
+from src.models.predict_model import predict_with_confidence
+
+OUTPUT_FORMATS = ("csv", "parquet")
+CHUNK_SIZE = 20000
+
+# Artifacts loaded once per worker process by init_worker
+_artifacts = None
+
+def load_serving_artifacts(models_dir="models"):
+    """The same artifacts app.py serves: the bundle if present, else the separate joblib files."""
+    bundle_path = os.path.join(models_dir, BUNDLE_NAME)
+    if os.path.exists(bundle_path):
+        return load_bundle(bundle_path)
+    return load_legacy_artifacts(models_dir)
+
+def init_worker(models_dir):
+    global _artifacts
+    # The bundle is memory-mapped, so workers share the model's array pages
+    _artifacts = load_serving_artifacts(models_dir)
+
+def require_parquet():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        raise ImportError("Parquet input/output needs pyarrow: pip install pyarrow")
+
+def frame_texts(frame, artifacts):
+    """Cleaned "subject description" texts, as the API builds them, for a subject/description DataFrame."""
+    normalizer = artifacts.normalizer or TextNormalizer()
+    subjects = normalizer.clean_many(frame["subject"].fillna("").astype(str))
+    descriptions = normalizer.clean_many(frame["description"].fillna("").astype(str))
+    return [subject + " " + description for subject, description in zip(subjects, descriptions)]
+
+def score_frame(frame, artifacts=None, top_k=None):
+    """Predicted category and confidence (plus priority, if bundled) for a ticket_id/subject/description DataFrame."""
+    artifacts = artifacts or _artifacts
+    X = artifacts.vectorizer.transform(frame_texts(frame, artifacts))
+    labels, confidences, top_labels, top_confidences = predict_with_confidence(artifacts.model, X, top_k)
+
+    scored = pd.DataFrame({
+        "ticket_id": frame["ticket_id"].values,
+        "predicted_category": artifacts.label_encoder.inverse_transform(labels),
+        "confidence": confidences
+    })
+    if top_labels is not None:
+        for rank in range(top_labels.shape[1]):
+            scored[f"category_{rank + 1}"] = artifacts.label_encoder.inverse_transform(top_labels[:, rank])
+            scored[f"confidence_{rank + 1}"] = top_confidences[:, rank]
+    if artifacts.priority_model is not None:
+        # Same feature matrix, second head
+        priority_labels, priority_confidences, _, _ = predict_with_confidence(artifacts.priority_model, X)
+        scored["predicted_priority"] = artifacts.priority_encoder.inverse_transform(priority_labels)
+        scored["priority_confidence"] = priority_confidences
+    return scored
+
+def iter_input_chunks(input_path, chunk_size, columns=("ticket_id", "subject", "description")):
+    columns = list(columns)
+    if input_path.endswith(".parquet"):
+        require_parquet()
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(input_path).iter_batches(batch_size=chunk_size, columns=columns):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(input_path, usecols=columns, chunksize=chunk_size, dtype=str, keep_default_na=False)
+
+def score_chunk(index, frame, parts_dir, output_format, top_k):
+    """Score one chunk and write it as an atomically-renamed part file; runs in a worker."""
+    scored = score_frame(frame, top_k=top_k)
+    path = os.path.join(parts_dir, f"part-{index:06d}.{output_format}")
+    tmp_path = f"{path}.tmp"
+    if output_format == "parquet":
+        scored.to_parquet(tmp_path, index=False)
+    else:
+        scored.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, path)
+    return index, len(scored)
+
+def input_fingerprint(input_path, model_version, chunk_size, output_format, top_k):
+    # A checkpoint only resumes the exact same input, model, chunking and output layout
+    stat = os.stat(input_path)
+    return {
+        "input": os.path.abspath(input_path),
+        "input_size": stat.st_size,
+        "input_mtime_ns": stat.st_mtime_ns,
+        "model_version": model_version,
+        "chunk_size": chunk_size,
+        "output_format": output_format,
+        "top_k": top_k
+    }
+
+def load_checkpoint(checkpoint_path, fingerprint):
+    if not os.path.exists(checkpoint_path):
+        return set()
+    with open(checkpoint_path) as f:
+        checkpoint = json.load(f)
+    if checkpoint.get("fingerprint") != fingerprint:
+        print("Checkpoint belongs to a different input, model or configuration; starting over.")
+        return None
+    return set(checkpoint.get("completed", []))
+
+def save_checkpoint(checkpoint_path, fingerprint, completed):
+    tmp_path = f"{checkpoint_path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"fingerprint": fingerprint, "completed": sorted(completed)}, f)
+    os.replace(tmp_path, checkpoint_path)
+
+def merge_parts(parts_dir, output_path, output_format, n_chunks):
+    """Concatenate part files in chunk order into the final output, streaming one part at a time."""
+    tmp_path = f"{output_path}.tmp"
+    paths = [os.path.join(parts_dir, f"part-{index:06d}.{output_format}") for index in range(n_chunks)]
+    if output_format == "parquet":
+        import pyarrow.parquet as pq
+
+        writer = None
+        for path in paths:
+            table = pq.read_table(path)
+            if writer is None:
+                writer = pq.ParquetWriter(tmp_path, table.schema)
+            writer.write_table(table)
+        if writer is not None:
+            writer.close()
+    else:
+        with open(tmp_path, "wb") as out:
+            for i, path in enumerate(paths):
+                with open(path, "rb") as part:
+                    if i > 0:
+                        part.readline()  # drop the repeated header
+                    shutil.copyfileobj(part, out)
+    os.replace(tmp_path, output_path)
+
+def batch_score(input_path, output_path, models_dir="models", chunk_size=CHUNK_SIZE, n_jobs=None,
+                output_format=None, top_k=None, resume=True):
+    """Stream input_path in chunks, score them across n_jobs processes and write output_path.
+
+    Each scored chunk lands in <output>.parts/ and is recorded in
+    <output>.checkpoint.json, so an interrupted run picks up where it left off.
+    """
+    output_format = output_format or ("parquet" if output_path.endswith(".parquet") else "csv")
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Unknown output format: {output_format}")
+    if output_format == "parquet":
+        require_parquet()
+    n_jobs = n_jobs or os.cpu_count() or 1
+
+    parts_dir = f"{output_path}.parts"
+    checkpoint_path = f"{output_path}.checkpoint.json"
+    artifacts = load_serving_artifacts(models_dir)
+    fingerprint = input_fingerprint(input_path, artifacts.version, chunk_size, output_format, top_k)
+
+    completed = load_checkpoint(checkpoint_path, fingerprint) if resume else None
+    if completed is None:
+        shutil.rmtree(parts_dir, ignore_errors=True)
+        completed = set()
+    elif completed:
+        print(f"Resuming: {len(completed)} chunks already scored.")
+    os.makedirs(parts_dir, exist_ok=True)
+
+    print(f"Scoring {input_path} in chunks of {chunk_size} with {n_jobs} worker(s)...")
+    start = time.perf_counter()
+    n_chunks = 0
+    n_rows = 0
+
+    def finished(index, rows):
+        nonlocal n_rows
+        completed.add(index)
+        n_rows += rows
+        save_checkpoint(checkpoint_path, fingerprint, completed)
+        print(f"  chunk {index}: {rows} tickets ({n_rows / (time.perf_counter() - start):.0f} tickets/s)")
+
+    if n_jobs == 1:
+        global _artifacts
+        _artifacts = artifacts
+        for index, frame in enumerate(iter_input_chunks(input_path, chunk_size)):
+            n_chunks += 1
+            if index not in completed:
+                finished(*score_chunk(index, frame, parts_dir, output_format, top_k))
+    else:
+        # Bounded in-flight submissions keep memory flat no matter how large the input is
+        with ProcessPoolExecutor(n_jobs, initializer=init_worker, initargs=(models_dir,)) as pool:
+            pending = set()
+            for index, frame in enumerate(iter_input_chunks(input_path, chunk_size)):
+                n_chunks += 1
+                if index in completed:
+                    continue
+                pending.add(pool.submit(score_chunk, index, frame, parts_dir, output_format, top_k))
+                if len(pending) >= 2 * n_jobs:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        finished(*future.result())
+            for future in pending:
+                finished(*future.result())
+
+    merge_parts(parts_dir, output_path, output_format, n_chunks)
+    shutil.rmtree(parts_dir, ignore_errors=True)
+    os.remove(checkpoint_path)
+
+    elapsed = time.perf_counter() - start
+    print(f"Scored {n_rows} new tickets in {elapsed:.1f}s; wrote {n_chunks} chunks to {output_path}")
+    return output_path
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Score a CSV/Parquet dump of tickets with the serving model.")
+    parser.add_argument("input", help="CSV or Parquet with ticket_id, subject, description columns")
+    parser.add_argument("output", help="output path (.csv or .parquet)")
+    parser.add_argument("--models-dir", default="models")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--n-jobs", type=int, default=None, help="worker processes (default: all CPUs)")
+    parser.add_argument("--format", choices=OUTPUT_FORMATS, default=None, help="output format (default: from extension)")
+    parser.add_argument("--top-k", type=int, default=None, help="also write the top-k categories and confidences")
+    parser.add_argument("--no-resume", action="store_true", help="ignore any existing checkpoint")
+    args = parser.parse_args()
+
+    batch_score(args.input, args.output, models_dir=args.models_dir, chunk_size=args.chunk_size,
+                n_jobs=args.n_jobs, output_format=args.format, top_k=args.top_k, resume=not args.no_resume)
@@ -0,0 +1,132 @@
+import os
+import time
+import joblib
+from datetime import datetime, timezone
+
+BUNDLE_FORMAT_VERSION = 1
+BUNDLE_NAME = "triage_bundle.joblib"
+
+class ModelBundle:
+    """Everything needed to serve predictions, loaded and swapped as one unit."""
+
+    def __init__(self, model, vectorizer, label_encoder, normalizer=None, header=None, path=None, load_seconds=None,
+                 priority_model=None, priority_encoder=None):
+        self.model = model
+        self.vectorizer = vectorizer
+        self.label_encoder = label_encoder
+        self.normalizer = normalizer
+        # Optional second head scored from the same vectorized features
+        self.priority_model = priority_model
+        self.priority_encoder = priority_encoder
+        self.header = header or {}
+        self.path = path
+        self.load_seconds = load_seconds
+
+    @property
+    def version(self):
+        return self.header.get("version")
+
+def bundle_version(model, vectorizer, label_encoder, priority_model=None, priority_encoder=None):
+    # Content hash of the fitted objects, stable across re-saves of the same model
+    parts = (model, vectorizer, label_encoder)
+    if priority_model is not None:
+        parts += (priority_model, priority_encoder)
+    return joblib.hash(parts)[:12]
+
+def save_bundle(path, model, vectorizer, label_encoder, normalizer=None, metadata=None,
+                priority_model=None, priority_encoder=None):
+    import sklearn
+
+    if (priority_model is None) != (priority_encoder is None):
+        raise ValueError("priority_model and priority_encoder must be saved together")
+    header = {
+        "format_version": BUNDLE_FORMAT_VERSION,
+        "version": bundle_version(model, vectorizer, label_encoder, priority_model, priority_encoder),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "sklearn_version": sklearn.__version__,
+        "model_class": model.__class__.__name__,
+        "vectorizer_class": vectorizer.__class__.__name__,
+        "classes": [str(cls) for cls in label_encoder.classes_],
+        "priority_classes": [str(cls) for cls in priority_encoder.classes_] if priority_encoder is not None else None,
+        "normalizer_version": getattr(normalizer, "version", None)
+    }
+    header.update(metadata or {})
+
+    payload = {
+        "header": header,
+        "model": model,
+        "vectorizer": vectorizer,
+        "label_encoder": label_encoder,
+        "normalizer": normalizer,
+        "priority_model": priority_model,
+        "priority_encoder": priority_encoder
+    }
+    # Uncompressed on purpose: joblib can only memory-map arrays stored raw.
+    # Written to a temp file and renamed so a watching server never reads a partial bundle.
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    joblib.dump(payload, tmp_path, compress=0)
+    os.replace(tmp_path, path)
+    return header
+
+def load_bundle(path, mmap_mode="r"):
+    """Load a bundle; large arrays are memory-mapped read-only so forked workers share their pages."""
+    start = time.perf_counter()
+    payload = joblib.load(path, mmap_mode=mmap_mode)
+
+    header = payload.get("header", {}) if isinstance(payload, dict) else {}
+    if header.get("format_version") != BUNDLE_FORMAT_VERSION:
+        raise ValueError(f"Unsupported bundle format in {path}: {header.get('format_version')}")
+
+    return ModelBundle(
+        model=payload["model"],
+        vectorizer=payload["vectorizer"],
+        label_encoder=payload["label_encoder"],
+        normalizer=payload.get("normalizer"),
+        header=header,
+        path=path,
+        load_seconds=time.perf_counter() - start,
+        priority_model=payload.get("priority_model"),
+        priority_encoder=payload.get("priority_encoder")
+    )
+
+def load_legacy_artifacts(models_dir, model_name="best_model_tuned.joblib"):
+    """Load the separate joblib files written by build_features/optimize_model as a bundle."""
+    start = time.perf_counter()
+    model_path = os.path.join(models_dir, model_name)
+    model = joblib.load(model_path)
+    vectorizer = joblib.load(os.path.join(models_dir, "tfidf_vectorizer.joblib"))
+    label_encoder = joblib.load(os.path.join(models_dir, "label_encoder.joblib"))
+
+    normalizer = None
+    normalizer_path = os.path.join(models_dir, "text_normalizer.joblib")
+    if os.path.exists(normalizer_path):
+        normalizer = joblib.load(normalizer_path)
+
+    priority_model = priority_encoder = None
+    priority_paths = [os.path.join(models_dir, name) for name in ("priority_model.joblib", "priority_encoder.joblib")]
+    if all(os.path.exists(p) for p in priority_paths):
+        priority_model, priority_encoder = (joblib.load(p) for p in priority_paths)
+
+    header = {
+        "format_version": None,
+        "version": bundle_version(model, vectorizer, label_encoder, priority_model, priority_encoder),
+        # No header was saved with the model, so its file time stands in for the training time
+        "created_at": datetime.fromtimestamp(os.path.getmtime(model_path), timezone.utc).isoformat(),
+        "model_class": model.__class__.__name__,
+        "classes": [str(cls) for cls in label_encoder.classes_],
+        "priority_classes": [str(cls) for cls in priority_encoder.classes_] if priority_encoder is not None else None
+    }
+    return ModelBundle(model, vectorizer, label_encoder, normalizer, header=header,
+                       path=models_dir, load_seconds=time.perf_counter() - start,
+                       priority_model=priority_model, priority_encoder=priority_encoder)
+
+def write_bundle_from_models_dir(models_dir="models", model_name="best_model_tuned.joblib", metadata=None):
+    """Package the separate serving artifacts in models_dir into models_dir/triage_bundle.joblib."""
+    artifacts = load_legacy_artifacts(models_dir, model_name)
+    path = os.path.join(models_dir, BUNDLE_NAME)
+    header = save_bundle(path, artifacts.model, artifacts.vectorizer, artifacts.label_encoder,
+                         normalizer=artifacts.normalizer, metadata=metadata,
+                         priority_model=artifacts.priority_model, priority_encoder=artifacts.priority_encoder)
+    print(f"Saved model bundle {header['version']} to {path}")
+    return path
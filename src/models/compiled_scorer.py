@@ -0,0 +1,416 @@
+import os
+import sys
+import re
+import copy
+import json
+import time
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from src.models.predict_model import softmax
+
+SCORER_FORMAT_VERSION = 1
+WEIGHT_DTYPES = ("float64", "float16", "int8")
+
+def _probability_mode(model):
+    # How the served model turns linear scores into probabilities
+    name = model.__class__.__name__
+    if name == "LogisticRegression":
+        multi_class = getattr(model, "multi_class", "auto")
+        if multi_class == "ovr" or (multi_class == "auto" and getattr(model, "solver", None) == "liblinear"):
+            return "ovr"
+        return "logistic"
+    if name == "SGDClassifier" and getattr(model, "loss", None) == "log_loss":
+        return "ovr"
+    if hasattr(model, "predict_proba"):
+        raise TypeError(f"Cannot compile probabilities of {name}")
+    return "margin"
+
+def _linear_proba(scores, mode):
+    # Same probability mapping as the compiled sklearn model
+    if scores.shape[1] == 1:
+        # Binary models keep a single weight vector for the positive class
+        if mode == "margin":
+            scores = np.hstack([-scores, scores])
+        else:
+            scores = np.hstack([np.zeros_like(scores), scores])
+        return softmax(scores)
+    if mode == "ovr":
+        probs = 1.0 / (1.0 + np.exp(-scores))
+        return probs / probs.sum(axis=1, keepdims=True)
+    return softmax(scores)
+
+def _head(model):
+    return {"coef": model.coef_, "intercept": model.intercept_, "classes": model.classes_, "mode": _probability_mode(model)}
+
+class CompiledScorer:
+    """Frozen TF-IDF + linear classifier that scores raw text with NumPy only.
+
+    The vocabulary is kept as a plain dict (token hash -> feature index) and the
+    classifier as a dense (n_features, n_classes) weight matrix, so scoring a
+    ticket is a tokenize, a handful of dict lookups and one small gather-dot.
+    Hashing-mode features pass vocabulary=None and map tokens with murmurhash3.
+    Extra linear heads (e.g. priority) score the same featurized ticket.
+    """
+
+    def __init__(self, vocabulary, idf, coef, intercept, classes, stop_words=(),
+                 token_pattern=r"(?u)\b\w\w+\b", ngram_range=(1, 2), lowercase=True,
+                 norm="l2", sublinear_tf=False, mode="logistic", weight_scale=None, heads=None):
+        self.vocabulary = vocabulary
+        self.idf = np.asarray(idf, dtype=np.float64)
+        # Stored feature-major so one ticket's weights are a contiguous row gather.
+        # Quantized weights stay float16/int8 in memory; only the gathered rows are upcast.
+        coef = np.asarray(coef)
+        if coef.dtype.name not in WEIGHT_DTYPES:
+            coef = coef.astype(np.float64)
+        self.weights = np.ascontiguousarray(coef.T)
+        self.weight_scale = None if weight_scale is None else np.asarray(weight_scale, dtype=np.float64)
+        self.intercept = np.asarray(intercept, dtype=np.float64)
+        self.classes_ = np.asarray(classes)
+        self.stop_words = frozenset(stop_words)
+        self.token_pattern = token_pattern
+        self.ngram_range = tuple(ngram_range)
+        self.lowercase = lowercase
+        self.norm = norm
+        self.sublinear_tf = sublinear_tf
+        self.mode = mode
+        self.heads = {
+            name: {
+                "weights": np.ascontiguousarray(np.asarray(head["coef"], dtype=np.float64).T),
+                "intercept": np.asarray(head["intercept"], dtype=np.float64),
+                "classes": np.asarray(head["classes"]),
+                "mode": head["mode"]
+            }
+            for name, head in (heads or {}).items()
+        }
+        self._token_re = re.compile(token_pattern)
+        self._murmurhash = None
+        if vocabulary is None:
+            # Only hashing features need sklearn at scoring time; vocabulary scorers stay NumPy-only
+            from sklearn.utils import murmurhash3_32
+            self._murmurhash = murmurhash3_32
+
+    @classmethod
+    def from_sklearn(cls, vectorizer, model, heads=None):
+        for head_model in [model] + list((heads or {}).values()):
+            if not hasattr(head_model, "coef_"):
+                raise TypeError(f"{head_model.__class__.__name__} is not a linear model and cannot be compiled")
+
+        if hasattr(vectorizer, "steps"):
+            # Hashing feature mode: HashingVectorizer counts followed by a TfidfTransformer
+            (_, analyzer), (_, weighting) = vectorizer.steps
+            if analyzer.__class__.__name__ != "HashingVectorizer" or analyzer.alternate_sign or analyzer.norm:
+                raise ValueError("Only HashingVectorizer(alternate_sign=False, norm=None) pipelines can be compiled")
+            vocabulary = None
+            n_features = analyzer.n_features
+        else:
+            analyzer = weighting = vectorizer
+            vocabulary = {str(term): int(idx) for term, idx in vectorizer.vocabulary_.items()}
+            n_features = len(vocabulary)
+
+        if getattr(analyzer, "analyzer", None) != "word" or analyzer.tokenizer is not None \
+                or analyzer.preprocessor is not None or analyzer.strip_accents is not None:
+            raise ValueError("Only word analyzers with the default tokenizer/preprocessor can be compiled")
+
+        idf = weighting.idf_ if getattr(weighting, "use_idf", False) else np.ones(n_features)
+        return cls(
+            vocabulary=vocabulary,
+            idf=idf,
+            coef=model.coef_,
+            intercept=model.intercept_,
+            classes=model.classes_,
+            stop_words=analyzer.get_stop_words() or (),
+            token_pattern=analyzer.token_pattern,
+            ngram_range=analyzer.ngram_range,
+            lowercase=analyzer.lowercase,
+            norm=getattr(weighting, "norm", None),
+            sublinear_tf=getattr(weighting, "sublinear_tf", False),
+            mode=_probability_mode(model),
+            heads={name: _head(head_model) for name, head_model in (heads or {}).items()}
+        )
+
+    @property
+    def n_features(self):
+        return self.weights.shape[0]
+
+    def quantize(self, dtype):
+        """Store weights as float16, or as int8 with one float scale per class."""
+        if dtype not in WEIGHT_DTYPES:
+            raise ValueError(f"Unknown weight dtype: {dtype}. Choose from {WEIGHT_DTYPES}.")
+        weights = self.weights.astype(np.float64)
+        if self.weight_scale is not None:
+            weights = weights * self.weight_scale
+        self.weight_scale = None
+        if dtype == "int8":
+            scale = np.abs(weights).max(axis=0) / 127.0
+            scale[scale == 0] = 1.0
+            self.weights = np.round(weights / scale).astype(np.int8)
+            self.weight_scale = scale
+        else:
+            self.weights = np.ascontiguousarray(weights.astype(dtype))
+        return self
+
+    def with_weights(self, coef, intercept):
+        """A copy scoring with new classifier weights in the same dtype; vocabulary, IDF and heads are shared."""
+        scorer = copy.copy(self)
+        scorer.weights = np.ascontiguousarray(np.asarray(coef, dtype=np.float64).T)
+        scorer.weight_scale = None
+        scorer.intercept = np.asarray(intercept, dtype=np.float64)
+        dtype = self.weights.dtype.name
+        return scorer.quantize(dtype) if dtype != "float64" else scorer
+
+    def tokenize(self, text):
+        """Word tokens after lowercasing and stop-word removal, before n-grams."""
+        if self.lowercase:
+            text = text.lower()
+        stop_words = self.stop_words
+        return [w for w in self._token_re.findall(text) if w not in stop_words]
+
+    def analyze(self, text):
+        # Mirrors sklearn's word analyzer: tokenize, drop stop words, emit n-grams
+        tokens = self.tokenize(text)
+
+        min_n, max_n = self.ngram_range
+        if max_n == 1:
+            return tokens
+        original = tokens
+        if min_n == 1:
+            tokens = list(original)
+            min_n += 1
+        else:
+            tokens = []
+        for n in range(min_n, min(max_n + 1, len(original) + 1)):
+            for i in range(len(original) - n + 1):
+                tokens.append(" ".join(original[i:i + n]))
+        return tokens
+
+    def featurize(self, text):
+        """Return (feature_indices, tfidf_values) for one text."""
+        counts = {}
+        vocabulary = self.vocabulary
+        if vocabulary is None:
+            n_features = self.n_features
+            murmurhash3_32 = self._murmurhash
+            for term in self.analyze(text):
+                # Same index as sklearn's HashingVectorizer (signed murmurhash3, seed 0)
+                h = murmurhash3_32(term, seed=0)
+                idx = (2147483647 - (n_features - 1)) % n_features if h == -2147483648 else abs(h) % n_features
+                counts[idx] = counts.get(idx, 0) + 1
+        else:
+            for term in self.analyze(text):
+                idx = vocabulary.get(term)
+                if idx is not None:
+                    counts[idx] = counts.get(idx, 0) + 1
+
+        indices = np.fromiter(counts.keys(), dtype=np.intp, count=len(counts))
+        values = np.fromiter(counts.values(), dtype=np.float64, count=len(counts))
+        if self.sublinear_tf:
+            values = np.log(values) + 1
+        values *= self.idf[indices]
+
+        if self.norm == "l2":
+            norm = np.sqrt(np.dot(values, values))
+        elif self.norm == "l1":
+            norm = np.abs(values).sum()
+        else:
+            norm = 0.0
+        if norm > 0:
+            values /= norm
+        return indices, values
+
+    def transform(self, texts):
+        """CSR matrix of the same tf-idf features the sklearn vectorizer would produce."""
+        from scipy import sparse
+
+        rows = [self.featurize(text) for text in texts]
+        indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+        indptr[1:] = np.cumsum([len(indices) for indices, _ in rows])
+        indices = np.concatenate([indices for indices, _ in rows]) if rows else np.empty(0, dtype=np.intp)
+        values = np.concatenate([values for _, values in rows]) if rows else np.empty(0)
+        X = sparse.csr_matrix((values, indices, indptr), shape=(len(rows), self.n_features))
+        X.sort_indices()
+        return X
+
+    def decision_functions(self, texts, heads=(), features=None):
+        """Category scores plus {head: scores} for the named heads, featurizing each text once.
+
+        features, if given, is transform(texts) already computed by the caller;
+        its rows are scored instead of featurizing the texts again.
+        """
+        if features is None:
+            rows = map(self.featurize, texts)
+        else:
+            rows = ((features.indices[start:end], features.data[start:end])
+                    for start, end in zip(features.indptr[:-1], features.indptr[1:]))
+        n_rows = len(texts) if features is None else features.shape[0]
+        scores = np.empty((n_rows, self.weights.shape[1]), dtype=np.float64)
+        head_weights = [(name, self.heads[name]["weights"]) for name in heads]
+        head_scores = {name: np.empty((n_rows, weights.shape[1])) for name, weights in head_weights}
+        for row, (indices, values) in enumerate(rows):
+            scores[row] = values @ self.weights[indices]
+            for name, weights in head_weights:
+                head_scores[name][row] = values @ weights[indices]
+        if self.weight_scale is not None:
+            scores *= self.weight_scale
+        for name in head_scores:
+            head_scores[name] += self.heads[name]["intercept"]
+        return scores + self.intercept, head_scores
+
+    def decision_function(self, texts, features=None):
+        return self.decision_functions(texts, features=features)[0]
+
+    def predict_proba(self, texts, features=None):
+        return _linear_proba(self.decision_function(texts, features), self.mode)
+
+    def predict_proba_with_heads(self, texts, heads=None, features=None):
+        """(category probabilities, {head: probabilities}) from one featurization per text."""
+        heads = list(self.heads) if heads is None else heads
+        scores, head_scores = self.decision_functions(texts, heads, features)
+        return _linear_proba(scores, self.mode), {
+            name: _linear_proba(head_scores[name], self.heads[name]["mode"]) for name in heads
+        }
+
+    def predict(self, texts):
+        scores = self.decision_function(texts)
+        if scores.shape[1] == 1:
+            return self.classes_[(scores[:, 0] > 0).astype(int)]
+        return self.classes_[scores.argmax(axis=1)]
+
+    def save(self, path):
+        terms = np.empty(self.n_features if self.vocabulary is not None else 0, dtype=object)
+        for term, idx in (self.vocabulary or {}).items():
+            terms[idx] = term
+        config = {
+            "format_version": SCORER_FORMAT_VERSION,
+            "hashing": self.vocabulary is None,
+            "token_pattern": self.token_pattern,
+            "ngram_range": list(self.ngram_range),
+            "lowercase": self.lowercase,
+            "norm": self.norm,
+            "sublinear_tf": self.sublinear_tf,
+            "mode": self.mode,
+            "weights_dtype": self.weights.dtype.name,
+            "heads": {name: head["mode"] for name, head in self.heads.items()}
+        }
+        extra = {} if self.weight_scale is None else {"weight_scale": self.weight_scale}
+        for name, head in self.heads.items():
+            extra.update({f"head_{name}_weights": head["weights"], f"head_{name}_intercept": head["intercept"],
+                          f"head_{name}_classes": head["classes"]})
+        np.savez(
+            path,
+            terms=terms.astype(str),
+            idf=self.idf,
+            weights=self.weights,
+            intercept=self.intercept,
+            classes=self.classes_,
+            stop_words=np.array(sorted(self.stop_words), dtype=str),
+            config=np.array(json.dumps(config)),
+            **extra
+        )
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            config = json.loads(str(data["config"]))
+            if config.get("format_version") != SCORER_FORMAT_VERSION:
+                raise ValueError(f"Unsupported scorer format version: {config.get('format_version')}")
+            vocabulary = None
+            if not config.get("hashing"):
+                vocabulary = {term: idx for idx, term in enumerate(data["terms"].tolist())}
+            return cls(
+                vocabulary=vocabulary,
+                idf=data["idf"],
+                coef=data["weights"].T,
+                intercept=data["intercept"],
+                classes=data["classes"],
+                stop_words=data["stop_words"].tolist(),
+                token_pattern=config["token_pattern"],
+                ngram_range=config["ngram_range"],
+                lowercase=config["lowercase"],
+                norm=config["norm"],
+                sublinear_tf=config["sublinear_tf"],
+                mode=config["mode"],
+                weight_scale=data["weight_scale"] if "weight_scale" in data.files else None,
+                heads={
+                    name: {"coef": data[f"head_{name}_weights"].T, "intercept": data[f"head_{name}_intercept"],
+                           "classes": data[f"head_{name}_classes"], "mode": mode}
+                    for name, mode in config.get("heads", {}).items()
+                }
+            )
+
+def export_scorer(models_dir="models", model_name="best_model_tuned.joblib"):
+    import joblib
+
+    print(f"Loading artifacts from {models_dir}...")
+    vectorizer = joblib.load(os.path.join(models_dir, "tfidf_vectorizer.joblib"))
+    model = joblib.load(os.path.join(models_dir, model_name))
+    heads = {}
+    if os.path.exists(os.path.join(models_dir, "priority_model.joblib")):
+        heads["priority"] = joblib.load(os.path.join(models_dir, "priority_model.joblib"))
+
+    scorer = CompiledScorer.from_sklearn(vectorizer, model, heads=heads)
+    output_path = os.path.join(models_dir, "compiled_scorer.npz")
+    scorer.save(output_path)
+    print(f"Saved compiled scorer ({scorer.n_features} {'hashed ' if scorer.vocabulary is None else ''}features, {len(scorer.classes_)} classes, "
+          f"mode={scorer.mode}, heads={sorted(scorer.heads) or 'none'}) to {output_path}")
+    return scorer
+
+def benchmark_scorer(models_dir="models", model_name="best_model_tuned.joblib", n_tickets=1000):
+    import joblib
+    import pandas as pd
+
+    from src.models.predict_model import predict_with_confidence
+
+    vectorizer = joblib.load(os.path.join(models_dir, "tfidf_vectorizer.joblib"))
+    model = joblib.load(os.path.join(models_dir, model_name))
+    scorer = CompiledScorer.load(os.path.join(models_dir, "compiled_scorer.npz"))
+
+    texts = pd.read_csv(os.path.join("data", "processed", "test.csv"))['text'].fillna('').tolist()
+    texts = [texts[i % len(texts)] for i in range(n_tickets)]
+
+    # Parity on the whole sample before timing anything
+    X = vectorizer.transform(texts)
+    agreement = float(np.mean(scorer.predict(texts) == model.predict(X)))
+    max_prob_diff = None
+    if hasattr(model, "predict_proba"):
+        max_prob_diff = float(np.abs(scorer.predict_proba(texts) - model.predict_proba(X)).max())
+
+    def per_ticket_ms(fn):
+        for text in texts[:10]:
+            fn(text)
+        latencies = []
+        for text in texts:
+            start = time.perf_counter()
+            fn(text)
+            latencies.append((time.perf_counter() - start) * 1000)
+        return float(np.mean(latencies)), float(np.percentile(latencies, 95))
+
+    sk_avg, sk_p95 = per_ticket_ms(lambda text: predict_with_confidence(model, vectorizer.transform([text])))
+    compiled_avg, compiled_p95 = per_ticket_ms(lambda text: scorer.predict_proba([text]))
+
+    results = {
+        "n_tickets": n_tickets,
+        "label_agreement": agreement,
+        "max_probability_diff": max_prob_diff,
+        "sklearn_avg_latency_ms": sk_avg,
+        "sklearn_p95_latency_ms": sk_p95,
+        "compiled_avg_latency_ms": compiled_avg,
+        "compiled_p95_latency_ms": compiled_p95,
+        "speedup": sk_avg / compiled_avg
+    }
+
+    print(f"Label agreement: {agreement:.4f}")
+    print(f"sklearn  (vectorize + score): avg {sk_avg:.4f} ms, p95 {sk_p95:.4f} ms")
+    print(f"compiled (vectorize + score): avg {compiled_avg:.4f} ms, p95 {compiled_p95:.4f} ms")
+    print(f"Speedup: {results['speedup']:.1f}x")
+
+    os.makedirs("reports", exist_ok=True)
+    with open(os.path.join("reports", "scorer_benchmark.json"), "w") as f:
+        json.dump(results, f, indent=4)
+    return results
+
+if __name__ == "__main__":
+    export_scorer()
+    if "--benchmark" in sys.argv:
+        benchmark_scorer()
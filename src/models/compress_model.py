@@ -0,0 +1,229 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.base import clone
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import accuracy_score, f1_score
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from src.data.normalize import TextNormalizer
+from src.models.bundle import BUNDLE_NAME, save_bundle, load_bundle
+from src.models.compiled_scorer import CompiledScorer, WEIGHT_DTYPES
+from src.features.drift import BASELINE_NAME, build_baseline, save_baseline, confidence_distribution
+
+PRUNE_METHODS = ("magnitude", "l1")
+
+def magnitude_keep_mask(model, keep_fraction):
+    """Keep the terms whose largest absolute weight over all classes is in the top keep_fraction."""
+    importance = np.abs(model.coef_).max(axis=0)
+    n_keep = max(1, int(round(keep_fraction * importance.size)))
+    keep = np.zeros(importance.size, dtype=bool)
+    keep[np.argsort(importance)[::-1][:n_keep]] = True
+    return keep
+
+def l1_logistic_regression(**params):
+    """A pure-L1 LogisticRegression on either side of scikit-learn 1.8's penalty change.
+
+    1.8 deprecated penalty= in favour of l1_ratio=1.0. Older versions ignore
+    l1_ratio unless penalty="elasticnet", so the fit would silently stay L2.
+    """
+    if LogisticRegression().get_params().get("penalty", "deprecated") == "deprecated":
+        return LogisticRegression(l1_ratio=1.0, **params)
+    return LogisticRegression(penalty="l1", **params)
+
+def l1_keep_mask(X_train, y_train, C=1.0):
+    """Keep the terms an L1-penalized logistic regression gives a non-zero weight in any class."""
+    selector = l1_logistic_regression(solver="saga", C=C, max_iter=2000, random_state=42)
+    selector.fit(X_train, y_train)
+    keep = np.any(selector.coef_ != 0, axis=0)
+    if not keep.any():
+        raise ValueError(f"L1 selection with C={C} removed every feature; use a larger --l1-c.")
+    return keep
+
+def prune_vectorizer(vectorizer, keep, train_texts):
+    """A TfidfVectorizer restricted to the kept terms, with the same IDF values for them."""
+    if not hasattr(vectorizer, "vocabulary_"):
+        raise TypeError("Only vocabulary-based TfidfVectorizer features can be pruned; hashing features have no terms to drop.")
+    terms = np.empty(len(vectorizer.vocabulary_), dtype=object)
+    for term, idx in vectorizer.vocabulary_.items():
+        terms[idx] = term
+    kept_terms = sorted(terms[keep])
+    # Smoothed IDF only depends on each term's document frequency, so refitting on a fixed vocabulary reproduces it
+    pruned = clone(vectorizer).set_params(vocabulary={term: i for i, term in enumerate(kept_terms)}, max_features=None)
+    return pruned.fit(train_texts)
+
+def measure(vectorizer, model, scorer, texts, y_true, n_latency=500):
+    """Test accuracy/F1 of the sklearn pipeline plus per-ticket latency of both serving paths."""
+    y_pred = model.predict(vectorizer.transform(texts))
+    sample = [texts[i % len(texts)] for i in range(n_latency)]
+
+    def per_ticket_ms(fn):
+        for text in sample[:10]:
+            fn(text)
+        start = time.perf_counter()
+        for text in sample:
+            fn(text)
+        return (time.perf_counter() - start) * 1000 / len(sample)
+
+    return {
+        "n_features": int(model.coef_.shape[1]),
+        "accuracy": float(accuracy_score(y_true, y_pred)),
+        "f1_score": float(f1_score(y_true, y_pred, average="weighted")),
+        "compiled_accuracy": float(accuracy_score(y_true, scorer.predict(texts))),
+        "sklearn_latency_ms": per_ticket_ms(lambda text: model.predict_proba(vectorizer.transform([text]))),
+        "compiled_latency_ms": per_ticket_ms(lambda text: scorer.predict_proba([text]))
+    }
+
+def artifact_sizes(output_dir):
+    bundle_path = os.path.join(output_dir, BUNDLE_NAME)
+    start = time.perf_counter()
+    load_bundle(bundle_path)
+    return {
+        "bundle_bytes": os.path.getsize(bundle_path),
+        "bundle_load_ms": (time.perf_counter() - start) * 1000,
+        "scorer_bytes": os.path.getsize(os.path.join(output_dir, "compiled_scorer.npz"))
+    }
+
+def write_artifacts(output_dir, vectorizer, model, label_encoder, scorer, metadata=None,
+                    priority_model=None, priority_encoder=None, drift_baseline=None):
+    os.makedirs(output_dir, exist_ok=True)
+    if drift_baseline is not None:
+        save_baseline(drift_baseline, output_dir)
+    joblib.dump(vectorizer, os.path.join(output_dir, "tfidf_vectorizer.joblib"))
+    joblib.dump(model, os.path.join(output_dir, "best_model_tuned.joblib"))
+    joblib.dump(label_encoder, os.path.join(output_dir, "label_encoder.joblib"))
+    joblib.dump(TextNormalizer(), os.path.join(output_dir, "text_normalizer.joblib"))
+    if priority_model is not None:
+        joblib.dump(priority_model, os.path.join(output_dir, "priority_model.joblib"))
+        joblib.dump(priority_encoder, os.path.join(output_dir, "priority_encoder.joblib"))
+    save_bundle(os.path.join(output_dir, BUNDLE_NAME), model, vectorizer, label_encoder,
+                normalizer=TextNormalizer(), metadata=metadata,
+                priority_model=priority_model, priority_encoder=priority_encoder)
+    scorer.save(os.path.join(output_dir, "compiled_scorer.npz"))
+
+def compress_model(keep_fraction=0.25, method="magnitude", l1_C=1.0, quantize="float64",
+                   models_dir="models", output_dir=None, promote=False):
+    """Prune the served vocabulary, refit the tuned model on it and quantize the compiled scorer.
+
+    Writes the full serving artifact set to models/compressed/ and a before/after
+    comparison to reports/compression.json; --promote copies it over models/.
+    """
+    if method not in PRUNE_METHODS:
+        raise ValueError(f"Unknown pruning method: {method}. Choose from {PRUNE_METHODS}.")
+    if quantize not in WEIGHT_DTYPES:
+        raise ValueError(f"Unknown weight dtype: {quantize}. Choose from {WEIGHT_DTYPES}.")
+    output_dir = output_dir or os.path.join(models_dir, "compressed")
+
+    print("Loading artifacts and data...")
+    vectorizer = joblib.load(os.path.join(models_dir, "tfidf_vectorizer.joblib"))
+    model = joblib.load(os.path.join(models_dir, "best_model_tuned.joblib"))
+    label_encoder = joblib.load(os.path.join(models_dir, "label_encoder.joblib"))
+    train_df = pd.read_csv(os.path.join("data", "processed", "train.csv"))
+    test_df = pd.read_csv(os.path.join("data", "processed", "test.csv"))
+    train_texts = train_df["text"].fillna("").tolist()
+    test_texts = test_df["text"].fillna("").tolist()
+    y_train = label_encoder.transform(train_df["category"])
+    y_test = label_encoder.transform(test_df["category"])
+
+    # The priority head shares the vectorizer, so it is pruned and refit along with the category model
+    priority_model = priority_encoder = None
+    priority_path = os.path.join(models_dir, "priority_model.joblib")
+    if os.path.exists(priority_path) and "priority" in train_df.columns:
+        priority_model = joblib.load(priority_path)
+        priority_encoder = joblib.load(os.path.join(models_dir, "priority_encoder.joblib"))
+    heads = {"priority": priority_model} if priority_model is not None else {}
+
+    baseline_scorer = CompiledScorer.from_sklearn(vectorizer, model, heads=heads)
+    baseline = measure(vectorizer, model, baseline_scorer, test_texts, y_test)
+    baseline_dir = os.path.join(output_dir, "_baseline")
+    write_artifacts(baseline_dir, vectorizer, model, label_encoder, baseline_scorer,
+                    priority_model=priority_model, priority_encoder=priority_encoder)
+    baseline.update(artifact_sizes(baseline_dir))
+    shutil.rmtree(baseline_dir)
+
+    print(f"Pruning {baseline['n_features']} features ({method})...")
+    if method == "l1":
+        keep = l1_keep_mask(vectorizer.transform(train_texts), y_train, C=l1_C)
+    else:
+        keep = magnitude_keep_mask(model, keep_fraction)
+    pruned_vectorizer = prune_vectorizer(vectorizer, keep, train_texts)
+
+    # Refit on the pruned features: the l2 norm of each row changes once terms are dropped
+    X_pruned = pruned_vectorizer.transform(train_texts)
+    pruned_model = clone(model).fit(X_pruned, y_train)
+    pruned_priority = None
+    if priority_model is not None:
+        pruned_priority = clone(priority_model).fit(X_pruned, priority_encoder.transform(train_df["priority"]))
+    pruned_heads = {"priority": pruned_priority} if pruned_priority is not None else {}
+    scorer = CompiledScorer.from_sklearn(pruned_vectorizer, pruned_model, heads=pruned_heads).quantize(quantize)
+
+    compressed = measure(pruned_vectorizer, pruned_model, scorer, test_texts, y_test)
+    # Drift references for the pruned feature space; the old baseline's buckets no longer line up
+    drift_baseline = build_baseline(pruned_vectorizer, X_pruned, y_train, label_encoder.classes_, holdout_texts=test_texts)
+    write_artifacts(output_dir, pruned_vectorizer, pruned_model, label_encoder, scorer, metadata={
+        "compression": {"method": method, "keep_fraction": keep_fraction if method == "magnitude" else None,
+                        "l1_C": l1_C if method == "l1" else None, "scorer_weights": quantize},
+        "test_accuracy": compressed["accuracy"],
+        "test_f1_score": compressed["f1_score"],
+        "train_rows": len(train_texts),
+        "confidence_distribution": confidence_distribution(pruned_model, pruned_vectorizer.transform(test_texts))
+    }, priority_model=pruned_priority, priority_encoder=priority_encoder, drift_baseline=drift_baseline)
+    compressed.update(artifact_sizes(output_dir))
+
+    report = {
+        "method": method,
+        "keep_fraction": keep_fraction if method == "magnitude" else None,
+        "l1_C": l1_C if method == "l1" else None,
+        "scorer_weights": quantize,
+        "baseline": baseline,
+        "compressed": compressed,
+        "accuracy_delta": compressed["accuracy"] - baseline["accuracy"],
+        "f1_delta": compressed["f1_score"] - baseline["f1_score"],
+        "bundle_size_ratio": compressed["bundle_bytes"] / baseline["bundle_bytes"],
+        "scorer_size_ratio": compressed["scorer_bytes"] / baseline["scorer_bytes"]
+    }
+
+    print(f"{'':22s} {'baseline':>12s} {'compressed':>12s}")
+    for name in ("n_features", "accuracy", "f1_score", "compiled_accuracy", "bundle_bytes", "scorer_bytes",
+                 "bundle_load_ms", "sklearn_latency_ms", "compiled_latency_ms"):
+        print(f"{name:22s} {baseline[name]:12.4f} {compressed[name]:12.4f}" if isinstance(baseline[name], float)
+              else f"{name:22s} {baseline[name]:12d} {compressed[name]:12d}")
+    print(f"Accuracy delta: {report['accuracy_delta']:+.4f}, F1 delta: {report['f1_delta']:+.4f}")
+    if quantize != "float64":
+        print(f"Only the compiled scorer's category weights are stored as {quantize}; its priority head "
+              f"and the sklearn models in the bundle stay float64.")
+
+    os.makedirs("reports", exist_ok=True)
+    with open(os.path.join("reports", "compression.json"), "w") as f:
+        json.dump(report, f, indent=4)
+    print(f"Compressed artifacts saved to {output_dir}; report saved to reports/compression.json")
+
+    if promote:
+        # Bundle last: it is what the API's artifact watcher and loader look for first
+        names = ["tfidf_vectorizer.joblib", "best_model_tuned.joblib", "label_encoder.joblib", "text_normalizer.joblib"]
+        if pruned_priority is not None:
+            names += ["priority_model.joblib", "priority_encoder.joblib"]
+        for name in names + ["compiled_scorer.npz", BASELINE_NAME, BUNDLE_NAME]:
+            shutil.copyfile(os.path.join(output_dir, name), os.path.join(models_dir, f"{name}.tmp"))
+            os.replace(os.path.join(models_dir, f"{name}.tmp"), os.path.join(models_dir, name))
+        print(f"Promoted compressed artifacts to {models_dir}")
+    return report
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Prune and quantize the served model.")
+    parser.add_argument("--method", choices=PRUNE_METHODS, default="magnitude",
+                        help="magnitude: keep the largest weights; l1: keep features an L1 model selects")
+    parser.add_argument("--keep", type=float, default=0.25, help="magnitude: fraction of vocabulary to keep")
+    parser.add_argument("--l1-c", type=float, default=1.0, help="l1: inverse regularization strength of the selector")
+    parser.add_argument("--quantize", choices=WEIGHT_DTYPES, default="float64", help="compiled scorer weight dtype")
+    parser.add_argument("--promote", action="store_true", help="copy the compressed artifacts over the served ones")
+    args = parser.parse_args()
+    compress_model(keep_fraction=args.keep, method=args.method, l1_C=args.l1_c, quantize=args.quantize,
+                   promote=args.promote)
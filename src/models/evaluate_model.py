@@ -1,83 +1,295 @@
 import numpy as np
 import os
+import sys
+import glob
+import argparse
 import joblib
 import json
 import time
-import matplotlib.pyplot as plt
-import seaborn as sns
 from scipy import sparse
-from sklearn.metrics import classification_report, accuracy_score, f1_score, confusion_matrix
 
-def evaluate_model():
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from src.features.feature_store import (load_features, stage_key, downstream_key, is_fresh, record_stage,
+                                        stage_replaced)
+from src.models.bundle import BUNDLE_NAME
+from src.models.predict_model import predict_with_confidence
+
+CHUNK_SIZE = 50000
+CALIBRATION_BINS = 10
+THROUGHPUT_BATCH_SIZES = (1, 32, 256, 2048)
+# Rows kept from the first chunks for the latency/throughput runs
+TIMING_SAMPLE_ROWS = 20000
+
+def plot_confusion_matrix(cm, target_names, path):
+    # Imported here: matplotlib/seaborn add seconds of startup that the up-to-date path never needs
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    plt.figure(figsize=(10, 8))
+    sns.heatmap(cm, annot=True, fmt='d', cmap='Blues',
+                xticklabels=target_names, yticklabels=target_names)
+    plt.ylabel('Actual')
+    plt.xlabel('Predicted')
+    plt.title('Confusion Matrix')
+    plt.tight_layout()
+    plt.savefig(path)
+    plt.close()
+
+class StreamingMetrics:
+    """Confusion matrix and calibration bins accumulated one chunk of predictions at a time.
+
+    Memory is O(n_classes^2 + n_bins) however many rows are evaluated; accuracy,
+    per-class precision/recall/F1 and calibration are all derived from these counts.
+    """
+
+    def __init__(self, n_classes, n_bins=CALIBRATION_BINS):
+        self.n_classes = n_classes
+        self.n_bins = n_bins
+        self.confusion = np.zeros((n_classes, n_classes), dtype=np.int64)
+        self.bin_counts = np.zeros(n_bins, dtype=np.int64)
+        self.bin_confidence = np.zeros(n_bins)
+        self.bin_correct = np.zeros(n_bins)
+
+    @property
+    def n_rows(self):
+        return int(self.confusion.sum())
+
+    def update(self, y_true, y_pred, confidences):
+        y_true = np.asarray(y_true, dtype=np.int64)
+        y_pred = np.asarray(y_pred, dtype=np.int64)
+        confidences = np.asarray(confidences, dtype=np.float64)
+        n = self.n_classes
+        self.confusion += np.bincount(y_true * n + y_pred, minlength=n * n).reshape(n, n)
+        bins = np.clip((confidences * self.n_bins).astype(np.int64), 0, self.n_bins - 1)
+        self.bin_counts += np.bincount(bins, minlength=self.n_bins)
+        self.bin_confidence += np.bincount(bins, weights=confidences, minlength=self.n_bins)
+        self.bin_correct += np.bincount(bins, weights=(y_pred == y_true), minlength=self.n_bins)
+
+    def per_class(self):
+        """(precision, recall, f1, support) arrays; 0 where a class was never predicted or never seen."""
+        tp = np.diag(self.confusion).astype(np.float64)
+        predicted = self.confusion.sum(axis=0)
+        support = self.confusion.sum(axis=1)
+        precision = np.divide(tp, predicted, out=np.zeros_like(tp), where=predicted > 0)
+        recall = np.divide(tp, support, out=np.zeros_like(tp), where=support > 0)
+        total = precision + recall
+        f1 = np.divide(2 * precision * recall, total, out=np.zeros_like(tp), where=total > 0)
+        return precision, recall, f1, support
+
+    def report(self, target_names):
+        precision, recall, f1, support = self.per_class()
+        n_rows = max(self.n_rows, 1)
+        seen = support > 0
+        edges = np.linspace(0.0, 1.0, self.n_bins + 1)
+        return {
+            "accuracy": float(np.trace(self.confusion) / n_rows),
+            # Support-weighted, as f1_score(average='weighted')
+            "f1_score": float(f1 @ support / n_rows),
+            "macro_f1_score": float(f1[seen].mean()) if seen.any() else 0.0,
+            "n_rows": self.n_rows,
+            "per_class": {
+                name: {"precision": float(precision[i]), "recall": float(recall[i]),
+                       "f1_score": float(f1[i]), "support": int(support[i])}
+                for i, name in enumerate(target_names)
+            },
+            "calibration": [
+                {"bin": f"{edges[b]:.1f}-{edges[b + 1]:.1f}", "count": int(self.bin_counts[b]),
+                 "mean_confidence": float(self.bin_confidence[b] / self.bin_counts[b]) if self.bin_counts[b] else None,
+                 "accuracy": float(self.bin_correct[b] / self.bin_counts[b]) if self.bin_counts[b] else None}
+                for b in range(self.n_bins)
+            ],
+            "expected_calibration_error": float(np.abs(self.bin_correct - self.bin_confidence).sum() / n_rows)
+        }
+
+def iter_test_chunks(processed_dir, chunk_size):
+    """(X, y) row slices of the memory-mapped test split; only one slice is resident at a time."""
+    _, X_test, _, y_test = load_features(processed_dir)
+    for start in range(0, X_test.shape[0], chunk_size):
+        yield X_test[start:start + chunk_size], np.asarray(y_test[start:start + chunk_size])
+
+def holdout_files(holdout):
+    """A single CSV/Parquet file, or every shard in a make_dataset.py --rows output directory."""
+    if not os.path.isdir(holdout):
+        return [holdout]
+    files = sorted(glob.glob(os.path.join(holdout, "*.csv")) + glob.glob(os.path.join(holdout, "*.parquet")))
+    if not files:
+        raise FileNotFoundError(f"No .csv or .parquet shards in {holdout}")
+    return files
+
+def iter_holdout_chunks(files, artifacts, chunk_size, skipped):
+    """(X, y) chunks of raw tickets, cleaned and vectorized exactly as the API serves them.
+
+    Rows whose category the label encoder does not know are counted in skipped["unknown_labels"].
+    """
+    # Imported here: batch_score pulls in pandas, which only the holdout path needs
+    from src.models.batch_score import iter_input_chunks, frame_texts
+
+    codes = {str(cls): i for i, cls in enumerate(artifacts.label_encoder.classes_)}
+    for path in files:
+        for frame in iter_input_chunks(path, chunk_size, columns=("subject", "description", "category")):
+            y = frame["category"].astype(str).map(codes)
+            known = y.notna().to_numpy()
+            skipped["unknown_labels"] += int((~known).sum())
+            if not known.any():
+                continue
+            yield artifacts.vectorizer.transform(frame_texts(frame[known], artifacts)), y[known].to_numpy(dtype=np.int64)
+
+def measure_latency(model, X, n_requests=1000):
+    """Mean and p95 milliseconds of single-row predicts, cycling through the rows of X."""
+    rows = [X[i] for i in range(min(X.shape[0], n_requests))]
+    for row in rows[:10]:
+        model.predict(row)
+    latencies = []
+    for i in range(n_requests):
+        row = rows[i % len(rows)]
+        start_time = time.perf_counter()
+        model.predict(row)
+        latencies.append((time.perf_counter() - start_time) * 1000)
+    return float(np.mean(latencies)), float(np.percentile(latencies, 95))
+
+def measure_throughput(model, X, batch_sizes=THROUGHPUT_BATCH_SIZES, min_seconds=0.5):
+    """Rows/sec of the serving predict (probabilities + argmax) at each batch size that fits in X."""
+    results = []
+    for batch_size in batch_sizes:
+        if batch_size > X.shape[0]:
+            print(f"Skipping batch size {batch_size}: only {X.shape[0]} sample rows")
+            continue
+        # Slice outside the timed loop; at most 200 distinct batches are cycled through
+        batches = [X[start:start + batch_size] for start in
+                   range(0, min(X.shape[0] - batch_size + 1, 200 * batch_size), batch_size)]
+        predict_with_confidence(model, batches[0])
+        rows = calls = 0
+        start = time.perf_counter()
+        while True:
+            predict_with_confidence(model, batches[calls % len(batches)])
+            rows += batch_size
+            calls += 1
+            elapsed = time.perf_counter() - start
+            if elapsed >= min_seconds and calls >= len(batches):
+                break
+        results.append({"batch_size": batch_size, "rows_per_second": rows / elapsed,
+                        "batch_latency_ms": elapsed * 1000 / calls})
+    return results
+
+def evaluate_model(force=False, chunk_size=CHUNK_SIZE, holdout=None, batch_sizes=THROUGHPUT_BATCH_SIZES):
+    """Stream the test split (or a raw holdout) through the model in chunks and report metrics.
+
+    Confusion matrix, per-class precision/recall/F1 and calibration bins are
+    accumulated per chunk, so memory is bounded by chunk_size, not the row count.
+    Latency and batched throughput are measured on the first rows.
+    """
     processed_dir = os.path.join("data", "processed")
     models_dir = "models"
     reports_dir = "reports"
     figures_dir = os.path.join(reports_dir, "figures")
-    
+    model_path = os.path.join(models_dir, "best_model_tuned.joblib")
+
+    # Skip evaluation when neither the inputs nor the model changed
+    if holdout is None:
+        stage = "evaluate_model"
+        metrics_path = os.path.join(reports_dir, "metrics.json")
+        figure_path = os.path.join(figures_dir, "confusion_matrix.png")
+        if stage_replaced("build_features", processed_dir):
+            raise ValueError("The vectorizer in models/ is not the one that built data/processed "
+                             "(a promote replaced it). Re-run build_features.py, or evaluate with --holdout.")
+        key = downstream_key(inputs=[model_path], processed_dir=processed_dir)
+    else:
+        files = holdout_files(holdout)
+        stage = "evaluate_holdout"
+        metrics_path = os.path.join(reports_dir, "holdout_metrics.json")
+        figure_path = os.path.join(figures_dir, "holdout_confusion_matrix.png")
+        served = os.path.join(models_dir, BUNDLE_NAME)
+        key = stage_key(inputs=files + [served if os.path.exists(served) else model_path], params={"holdout": files})
+    outputs = [metrics_path, figure_path]
+    if not force and is_fresh(stage, key, outputs, processed_dir):
+        print(f"Evaluation is up to date (key {key}); skipping. Use --force to re-evaluate.")
+        return
+
     os.makedirs(figures_dir, exist_ok=True)
-    
-    # Load data
-    print("Loading data...")
-    X_test = sparse.load_npz(os.path.join(processed_dir, "X_test.npz"))
-    y_test = np.load(os.path.join(processed_dir, "y_test.npy"))
-    
+
     # Load model and label encoder
     print("Loading model...")
-    model = joblib.load(os.path.join(models_dir, "best_model_tuned.joblib"))
-    le = joblib.load(os.path.join(models_dir, "label_encoder.joblib"))
+    skipped = {"unknown_labels": 0}
+    if holdout is None:
+        model = joblib.load(model_path)
+        le = joblib.load(os.path.join(models_dir, "label_encoder.joblib"))
+        chunks = iter_test_chunks(processed_dir, chunk_size)
+    else:
+        # The holdout is raw tickets, so it goes through the served normalizer and vectorizer too
+        from src.models.batch_score import load_serving_artifacts
+        artifacts = load_serving_artifacts(models_dir)
+        model, le = artifacts.model, artifacts.label_encoder
+        chunks = iter_holdout_chunks(files, artifacts, chunk_size, skipped)
     target_names = [str(cls) for cls in le.classes_]
-    
+
+    print(f"Evaluating in chunks of {chunk_size} rows...")
+    accumulator = StreamingMetrics(len(target_names))
+    sample = []
+    sample_rows = 0
+    start = time.perf_counter()
+    for X, y in chunks:
+        labels, confidences, _, _ = predict_with_confidence(model, X)
+        accumulator.update(y, labels, confidences)
+        if sample_rows < TIMING_SAMPLE_ROWS:
+            sample.append(X[:TIMING_SAMPLE_ROWS - sample_rows])
+            sample_rows += sample[-1].shape[0]
+        print(f"  {accumulator.n_rows} rows evaluated")
+    eval_seconds = time.perf_counter() - start
+    if not accumulator.n_rows:
+        raise ValueError("No rows to evaluate.")
+    sample = sparse.vstack(sample, format="csr")
+
+    metrics = accumulator.report(target_names)
+    print(f"Test Accuracy: {metrics['accuracy']:.4f}")
+    print(f"Test F1 Score: {metrics['f1_score']:.4f} (macro {metrics['macro_f1_score']:.4f})")
+    print(f"Expected calibration error: {metrics['expected_calibration_error']:.4f}")
+    print(f"{'class':24s} {'precision':>10s} {'recall':>10s} {'f1':>10s} {'support':>10s}")
+    for name, row in metrics["per_class"].items():
+        print(f"{name:24s} {row['precision']:10.4f} {row['recall']:10.4f} {row['f1_score']:10.4f} {row['support']:10d}")
+
     # Measure Latency
     print("Measuring latency...")
-    latencies = []
-    # Warmup
-    for _ in range(10):
-        model.predict(X_test[0])
-        
-    # Test
-    for i in range(1000):
-        idx = i % X_test.shape[0]
-        start_time = time.time()
-        model.predict(X_test[idx])
-        latencies.append((time.time() - start_time) * 1000) # ms
-        
-    avg_latency = np.mean(latencies)
-    p95_latency = np.percentile(latencies, 95)
+    avg_latency, p95_latency = measure_latency(model, sample)
     print(f"Average Latency: {avg_latency:.4f} ms")
     print(f"95th Percentile Latency: {p95_latency:.4f} ms")
-    
-    # Predictions
-    print("Generating predictions...")
-    y_pred = model.predict(X_test)
-    
-    # Metrics
-    accuracy = accuracy_score(y_test, y_pred)
-    f1 = f1_score(y_test, y_pred, average='weighted')
-    
-    metrics = {
-        "accuracy": accuracy,
-        "f1_score": f1,
+
+    print("Measuring batched throughput...")
+    throughput = measure_throughput(model, sample, batch_sizes)
+    for row in throughput:
+        print(f"  batch {row['batch_size']:6d}: {row['rows_per_second']:12.0f} rows/s ({row['batch_latency_ms']:.3f} ms/batch)")
+
+    metrics.update({
         "average_latency_ms": avg_latency,
-        "p95_latency_ms": p95_latency
-    }
-    
+        "p95_latency_ms": p95_latency,
+        "throughput": throughput,
+        "evaluation_rows_per_second": accumulator.n_rows / eval_seconds,
+        "chunk_size": chunk_size
+    })
+    if holdout is not None:
+        metrics.update({"holdout": files, "skipped_unknown_labels": skipped["unknown_labels"]})
+
     # Save Metrics
-    with open(os.path.join(reports_dir, "metrics.json"), "w") as f:
+    with open(metrics_path, "w") as f:
         json.dump(metrics, f, indent=4)
-        
+
     # Confusion Matrix
     print("Generating confusion matrix...")
-    cm = confusion_matrix(y_test, y_pred)
-    plt.figure(figsize=(10, 8))
-    sns.heatmap(cm, annot=True, fmt='d', cmap='Blues', 
-                xticklabels=target_names, yticklabels=target_names)
-    plt.ylabel('Actual')
-    plt.xlabel('Predicted')
-    plt.title('Confusion Matrix')
-    plt.tight_layout()
-    plt.savefig(os.path.join(figures_dir, "confusion_matrix.png"))
-    
+    plot_confusion_matrix(accumulator.confusion, target_names, figure_path)
+
     print(f"Evaluation complete. Reports saved to {reports_dir}")
+    record_stage(stage, key, outputs, processed_dir)
+    return metrics
 
 if __name__ == "__main__":
-    evaluate_model()
+    parser = argparse.ArgumentParser(description="Evaluate the tuned model on the test set.")
+    parser.add_argument("--force", action="store_true", help="re-evaluate even if features and model are unchanged")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="rows scored and accumulated per chunk")
+    parser.add_argument("--holdout", default=None,
+                        help="raw ticket CSV/Parquet (or a directory of shards) to evaluate instead of the test split")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=list(THROUGHPUT_BATCH_SIZES),
+                        help="batch sizes for the throughput measurement")
+    args = parser.parse_args()
+    evaluate_model(force=args.force, chunk_size=args.chunk_size, holdout=args.holdout, batch_sizes=args.batch_sizes)
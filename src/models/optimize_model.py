@@ -1,49 +1,173 @@
 import numpy as np
 import os
+import sys
+import argparse
 import joblib
 import json
-from scipy import sparse
+import time
+from sklearn.base import clone
 from sklearn.linear_model import LogisticRegression
-from sklearn.model_selection import GridSearchCV
-from sklearn.metrics import classification_report, accuracy_score, f1_score
+from sklearn.experimental import enable_halving_search_cv  # noqa: F401
+from sklearn.model_selection import GridSearchCV, HalvingGridSearchCV, StratifiedKFold
+from sklearn.metrics import classification_report, accuracy_score, f1_score, get_scorer
 
-def optimize_model():
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from src.models.bundle import BUNDLE_NAME, write_bundle_from_models_dir
+from src.features.feature_store import load_features, load_labels, downstream_key, is_fresh, record_stage
+from src.features.drift import confidence_distribution
+
+SEARCH_MODES = ("grid", "halving", "path")
+C_VALUES = [0.01, 0.1, 1, 10, 100]
+
+def search_space(search):
+    """The grid each search mode explores.
+
+    The exhaustive grid keeps its original solvers for comparison; the faster
+    modes only search lbfgs, since liblinear cannot fit multiclass targets and
+    its NaN candidates would use up half of a halving round.
+    """
+    if search == "grid":
+        return {'C': C_VALUES, 'solver': ['lbfgs', 'liblinear']}
+    return {'C': C_VALUES, 'solver': ['lbfgs']}
+
+def cv_candidates(cv_results, n_splits):
+    """Per-candidate score and wall clock (fit + score over all folds) from a *SearchCV's cv_results_."""
+    candidates = []
+    for i, params in enumerate(cv_results["params"]):
+        candidate = {
+            "params": params,
+            "mean_f1": float(cv_results["mean_test_score"][i]),
+            "std_f1": float(cv_results["std_test_score"][i]),
+            "wall_seconds": float((cv_results["mean_fit_time"][i] + cv_results["mean_score_time"][i]) * n_splits)
+        }
+        if "iter" in cv_results:
+            candidate["iteration"] = int(cv_results["iter"][i])
+            candidate["n_samples"] = int(cv_results["n_resources"][i])
+        candidates.append(candidate)
+    return candidates
+
+def run_search_cv(base_model, param_grid, X, y, cv=5, scoring="f1_weighted", halving=False):
+    """Exhaustive grid, or successive halving: every candidate on a small sample, the best third on 3x more rows."""
+    if halving:
+        search = HalvingGridSearchCV(base_model, param_grid, cv=cv, scoring=scoring, factor=3,
+                                     resource="n_samples", random_state=42, n_jobs=-1, verbose=1)
+    else:
+        search = GridSearchCV(base_model, param_grid, cv=cv, scoring=scoring, n_jobs=-1, verbose=1)
+    search.fit(X, y)
+    return search.best_estimator_, search.best_params_, float(search.best_score_), cv_candidates(search.cv_results_, cv)
+
+def warm_start_path_search(base_model, Cs, X, y, cv=5, scoring="f1_weighted", time_budget=None, patience=2):
+    """Walk C from strongest to weakest regularization, warm-starting each fold's model from the previous C.
+
+    Each step only refines the previous solution, so the whole path costs about as
+    much as a few cold fits. The walk stops early once the mean CV score has not
+    improved for `patience` consecutive Cs, or once `time_budget` seconds are spent.
+    """
+    scorer = get_scorer(scoring)
+    folds = list(StratifiedKFold(n_splits=cv).split(X, y))
+    # lbfgs is the solver that honors warm_start for multinomial logistic regression
+    models = [clone(base_model).set_params(solver="lbfgs", warm_start=True) for _ in folds]
+    
+    start = time.perf_counter()
+    candidates = []
+    best = None
+    stale = 0
+    for C in sorted(Cs):
+        if candidates and time_budget is not None and time.perf_counter() - start > time_budget:
+            print(f"Time budget of {time_budget:.0f}s spent; stopping before C={C}.")
+            break
+        candidate_start = time.perf_counter()
+        scores = []
+        for model, (train_idx, val_idx) in zip(models, folds):
+            model.set_params(C=C).fit(X[train_idx], y[train_idx])
+            scores.append(scorer(model, X[val_idx], y[val_idx]))
+        candidate = {
+            "params": {"C": C, "solver": "lbfgs"},
+            "mean_f1": float(np.mean(scores)),
+            "std_f1": float(np.std(scores)),
+            "wall_seconds": time.perf_counter() - candidate_start
+        }
+        candidates.append(candidate)
+        print(f"  C={C:<8g} F1 {candidate['mean_f1']:.4f} ({candidate['wall_seconds']:.2f}s)")
+        
+        if best is None or candidate["mean_f1"] > best["mean_f1"]:
+            best, stale = candidate, 0
+        else:
+            stale += 1
+            if stale >= patience:
+                print(f"No improvement for {patience} Cs; stopping early.")
+                break
+    
+    best_model = clone(base_model).set_params(**best["params"]).fit(X, y)
+    return best_model, best["params"], best["mean_f1"], candidates
+
+def fit_priority_model(search_fn, X_train, X_test, priority_labels):
+    """Priority head on the same features, tuned with the same search as the category model."""
+    y_train, y_test = priority_labels
+    priority_model, priority_params, _, _ = search_fn(y_train)
+    y_pred = priority_model.predict(X_test)
+    return (priority_model, priority_params, float(accuracy_score(y_test, y_pred)),
+            float(f1_score(y_test, y_pred, average='weighted')))
+
+def optimize_model(force=False, search="grid", time_budget=None, patience=2):
     processed_dir = os.path.join("data", "processed")
     models_dir = "models"
     
+    if search not in SEARCH_MODES:
+        raise ValueError(f"Unknown search mode: {search}. Choose from {SEARCH_MODES}.")
+    if time_budget is not None and search != "path":
+        # Grid and halving searches always run every round they plan, so a budget would be silently ignored
+        raise ValueError(f"--time-budget only applies to the path search, not {search}.")
+    
+    base_model = LogisticRegression(random_state=42, max_iter=1000)
+    param_grid = search_space(search)
+    
+    # Skip the search when the features and search space match the last run
+    outputs = [os.path.join(models_dir, "best_model_tuned.joblib"), os.path.join(models_dir, BUNDLE_NAME)]
+    priority_model_path = os.path.join(models_dir, "priority_model.joblib")
+    priority_labels = load_labels("priority", processed_dir)
+    if priority_labels is not None:
+        outputs.append(priority_model_path)
+    key = downstream_key(params={"base_model": repr(base_model), "param_grid": param_grid, "cv": 5,
+                                 "scoring": "f1_weighted", "search": search, "time_budget": time_budget,
+                                 "patience": patience}, processed_dir=processed_dir)
+    if not force and is_fresh("optimize_model", key, outputs, processed_dir):
+        print(f"Tuned model is up to date (key {key}); skipping. Use --force to search again.")
+        return
+    
+    # Memory-mapped features: GridSearch workers get file references instead of pickled copies
     print("Loading data...")
-    X_train = sparse.load_npz(os.path.join(processed_dir, "X_train.npz"))
-    X_test = sparse.load_npz(os.path.join(processed_dir, "X_test.npz"))
-    y_train = np.load(os.path.join(processed_dir, "y_train.npy"))
-    y_test = np.load(os.path.join(processed_dir, "y_test.npy"))
+    X_train, X_test, y_train, y_test = load_features(processed_dir)
     
     le = joblib.load(os.path.join(models_dir, "label_encoder.joblib"))
     target_names = [str(cls) for cls in le.classes_]
     
-    base_model = LogisticRegression(random_state=42, max_iter=1000)
+    def search_fn(y):
+        if search == "path":
+            return warm_start_path_search(base_model, param_grid['C'], X_train, y, cv=5, scoring='f1_weighted',
+                                          time_budget=time_budget, patience=patience)
+        return run_search_cv(base_model, param_grid, X_train, y, cv=5, scoring='f1_weighted',
+                             halving=(search == "halving"))
     
-    param_grid = {
-        'C': [0.01, 0.1, 1, 10, 100],
-        'solver': ['lbfgs', 'liblinear']
-    }
-    
-    print(f"Starting Grid Search with {base_model.__class__.__name__}...")
-    grid_search = GridSearchCV(
-        base_model, 
-        param_grid, 
-        cv=5, 
-        scoring='f1_weighted',
-        n_jobs=-1,
-        verbose=1
-    )
-    
-    grid_search.fit(X_train, y_train)
+    print(f"Starting {search} search with {base_model.__class__.__name__}...")
+    search_start = time.perf_counter()
+    best_model, best_params, best_score, candidates = search_fn(y_train)
+    search_seconds = time.perf_counter() - search_start
     
     print("\nBest Parameters found:")
-    print(grid_search.best_params_)
-    print(f"Best CV Score: {grid_search.best_score_:.4f}")
+    print(best_params)
+    print(f"Best CV Score: {best_score:.4f}")
+    print(f"Search took {search_seconds:.1f}s over {len(candidates)} candidates")
     
-    best_model = grid_search.best_estimator_
+    with open(os.path.join(models_dir, "search_results.json"), "w") as f:
+        json.dump({
+            "search": search,
+            "wall_seconds": search_seconds,
+            "best_params": best_params,
+            "best_cv_f1": best_score,
+            "candidates": candidates
+        }, f, indent=4)
     
     print("\nEvaluating Best Model on Test Set...")
     y_pred = best_model.predict(X_test)
@@ -60,6 +184,42 @@ def optimize_model():
     tuned_model_path = os.path.join(models_dir, "best_model_tuned.joblib")
     joblib.dump(best_model, tuned_model_path)
     print(f"Saved tuned model to {tuned_model_path}")
+    
+    metadata = {
+        "best_params": best_params,
+        "search": search,
+        "cv_f1_score": best_score,
+        "test_accuracy": float(accuracy),
+        "test_f1_score": float(f1),
+        # The feedback learner derives its L2 step from C and this row count
+        "train_rows": int(X_train.shape[0]),
+        # Held-out confidence mix: the API's drift monitor compares served confidences against it
+        "confidence_distribution": confidence_distribution(best_model, X_test)
+    }
+    if priority_labels is not None:
+        print("\nTuning priority model on the same features...")
+        priority_model, priority_params, priority_accuracy, priority_f1 = fit_priority_model(
+            search_fn, X_train, X_test, priority_labels)
+        print(f"Priority Best Parameters: {priority_params}")
+        print(f"Priority Test Accuracy: {priority_accuracy:.4f}")
+        print(f"Priority Test F1 Score: {priority_f1:.4f}")
+        joblib.dump(priority_model, priority_model_path)
+        metadata.update({"priority_params": priority_params, "priority_test_accuracy": priority_accuracy,
+                         "priority_test_f1_score": priority_f1})
+    elif os.path.exists(priority_model_path):
+        # Trained on features that no longer exist; never bundle it with this model
+        os.remove(priority_model_path)
+    
+    # Single-file bundle the API loads (vectorizer + model(s) + labels + normalizer)
+    write_bundle_from_models_dir(models_dir, metadata=metadata)
+    record_stage("optimize_model", key, outputs, processed_dir)
 
 if __name__ == "__main__":
-    optimize_model()
+    parser = argparse.ArgumentParser(description="Tune Logistic Regression hyperparameters.")
+    parser.add_argument("--search", choices=SEARCH_MODES, default="grid",
+                        help="grid: exhaustive; halving: successive halving over rows; path: warm-started C path")
+    parser.add_argument("--time-budget", type=float, default=None, help="path search: stop after this many seconds (rejected by the other modes)")
+    parser.add_argument("--patience", type=int, default=2, help="path search: stop after this many Cs without improvement")
+    parser.add_argument("--force", action="store_true", help="search again even if features and grid are unchanged")
+    args = parser.parse_args()
+    optimize_model(force=args.force, search=args.search, time_budget=args.time_budget, patience=args.patience)
@@ -0,0 +1,48 @@
+import numpy as np
+
+def softmax(scores):
+    # Numerically stable row-wise softmax
+    scores = np.asarray(scores, dtype=np.float64)
+    scores = scores - scores.max(axis=1, keepdims=True)
+    np.exp(scores, out=scores)
+    scores /= scores.sum(axis=1, keepdims=True)
+    return scores
+
+def predict_scores(model, X):
+    """Return an (n_samples, n_classes) probability matrix from a single model call."""
+    if hasattr(model, "predict_proba"):
+        return np.asarray(model.predict_proba(X))
+
+    if hasattr(model, "decision_function"):
+        # Non-probabilistic models (e.g. LinearSVC): softmax over the margins
+        scores = np.asarray(model.decision_function(X), dtype=np.float64)
+        if scores.ndim == 1:
+            scores = np.column_stack([-scores, scores])
+        return softmax(scores)
+
+    raise TypeError(f"{model.__class__.__name__} exposes neither predict_proba nor decision_function")
+
+def rank_probabilities(probs, classes, top_k=None):
+    """Turn a probability matrix into (labels, confidences, top_k_labels, top_k_confidences).
+
+    The top-k arrays are None when top_k is not requested.
+    """
+    rows = np.arange(probs.shape[0])
+
+    best = probs.argmax(axis=1)
+    labels = classes[best]
+    confidences = probs[rows, best]
+
+    if not top_k:
+        return labels, confidences, None, None
+
+    top_k = min(int(top_k), probs.shape[1])
+    # argpartition keeps this O(n_classes) before sorting the k survivors
+    top = np.argpartition(-probs, top_k - 1, axis=1)[:, :top_k]
+    order = np.argsort(-probs[rows[:, None], top], axis=1)
+    top = top[rows[:, None], order]
+    return labels, confidences, classes[top], probs[rows[:, None], top]
+
+def predict_with_confidence(model, X, top_k=None):
+    """Derive labels, confidences and optional top-k from one probability computation."""
+    return rank_probabilities(predict_scores(model, X), model.classes_, top_k)
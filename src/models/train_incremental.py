@@ -0,0 +1,199 @@
+import numpy as np
+import pandas as pd
+import os
+import sys
+import json
+import random
+import shutil
+import argparse
+import joblib
+from sklearn.linear_model import SGDClassifier
+from sklearn.naive_bayes import ComplementNB
+from sklearn.preprocessing import LabelEncoder
+from sklearn.metrics import classification_report, accuracy_score, f1_score
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from src.data.make_dataset import CATEGORIES
+from src.data.normalize import clean_texts, TextNormalizer
+from src.features.build_features import make_streaming_vectorizer, HASHING_N_FEATURES
+from src.models.bundle import write_bundle_from_models_dir
+from src.models.compiled_scorer import CompiledScorer
+from src.features.drift import build_baseline, save_baseline, confidence_distribution
+
+CHUNK_SIZE = 50000
+HOLDOUT_PER_CLASS = 2000
+
+LEARNERS = {
+    "sgd": lambda: SGDClassifier(loss='log_loss', alpha=1e-5, random_state=42),
+    "nb": lambda: ComplementNB(alpha=0.1)
+}
+
+class StratifiedReservoir:
+    """Fixed-size uniform sample per class, kept out of training for evaluation.
+
+    offer() returns the row that should be trained on instead: None when the
+    offered row was admitted without eviction, the evicted row when it replaced
+    one, or the offered row itself when it was not sampled. Every row is thus
+    either held out or trained on exactly once.
+    """
+
+    def __init__(self, per_class, seed=42):
+        self.per_class = per_class
+        self.samples = {}
+        self.seen = {}
+        self._rng = random.Random(seed)
+
+    def offer(self, label, item):
+        samples = self.samples.setdefault(label, [])
+        self.seen[label] = self.seen.get(label, 0) + 1
+        if len(samples) < self.per_class:
+            samples.append(item)
+            return None
+        j = self._rng.randrange(self.seen[label])
+        if j < self.per_class:
+            evicted, samples[j] = samples[j], item
+            return evicted
+        return item
+
+    def items(self):
+        return [(label, item) for label, samples in self.samples.items() for item in samples]
+
+def iter_ticket_chunks(input_path, chunk_size=CHUNK_SIZE):
+    for chunk in pd.read_csv(input_path, usecols=['subject', 'description', 'category'], chunksize=chunk_size):
+        subjects = clean_texts(chunk['subject'].tolist())
+        descriptions = clean_texts(chunk['description'].tolist())
+        yield [subject + " " + description for subject, description in zip(subjects, descriptions)], chunk['category'].tolist()
+
+def train_incremental(input_path=None, learner="sgd", chunk_size=CHUNK_SIZE,
+                      holdout_per_class=HOLDOUT_PER_CLASS, n_features=HASHING_N_FEATURES,
+                      classes=CATEGORIES, promote=False):
+    input_path = input_path or os.path.join("data", "raw", "tickets.csv")
+    models_dir = "models"
+
+    if not os.path.exists(input_path):
+        raise FileNotFoundError(f"Input file not found: {input_path}. Please run make_dataset.py first.")
+
+    le = LabelEncoder().fit(list(classes))
+    all_classes = np.arange(len(le.classes_))
+    known = set(le.classes_)
+
+    vectorizer = make_streaming_vectorizer(n_features)
+    model = LEARNERS[learner]()
+    reservoir = StratifiedReservoir(holdout_per_class)
+
+    n_rows = 0
+    n_trained = 0
+    n_skipped = 0
+
+    print(f"Streaming {input_path} in chunks of {chunk_size} rows ({learner})...")
+    for texts, categories in iter_ticket_chunks(input_path, chunk_size):
+        batch_texts = []
+        batch_labels = []
+        for text, category in zip(texts, categories):
+            if category not in known:
+                n_skipped += 1
+                continue
+            to_train = reservoir.offer(category, text)
+            if to_train is not None:
+                batch_texts.append(to_train)
+                batch_labels.append(category)
+        n_rows += len(texts)
+
+        if batch_texts:
+            model.partial_fit(vectorizer.transform(batch_texts), le.transform(batch_labels), classes=all_classes)
+            n_trained += len(batch_texts)
+        print(f"  {n_rows} rows read, {n_trained} trained on")
+
+    if n_trained == 0:
+        raise ValueError("No rows left for training; lower holdout_per_class or provide more data.")
+    if n_skipped:
+        print(f"Skipped {n_skipped} rows with unknown categories")
+
+    print("Evaluating on held-out reservoir...")
+    holdout = reservoir.items()
+    X_holdout = vectorizer.transform([text for _, text in holdout])
+    y_holdout = le.transform([label for label, _ in holdout])
+    y_pred = model.predict(X_holdout)
+
+    accuracy = accuracy_score(y_holdout, y_pred)
+    f1 = f1_score(y_holdout, y_pred, average='weighted')
+    print(f"Holdout Accuracy: {accuracy:.4f}")
+    print(f"Holdout F1 Score: {f1:.4f}")
+    print("\nClassification Report:")
+    print(classification_report(y_holdout, y_pred, labels=all_classes,
+                                target_names=[str(cls) for cls in le.classes_], zero_division=0))
+
+    os.makedirs(models_dir, exist_ok=True)
+    paths = {
+        "best_model_tuned.joblib": os.path.join(models_dir, "incremental_model.joblib"),
+        "tfidf_vectorizer.joblib": os.path.join(models_dir, "incremental_vectorizer.joblib"),
+        "label_encoder.joblib": os.path.join(models_dir, "incremental_label_encoder.joblib"),
+        "text_normalizer.joblib": os.path.join(models_dir, "incremental_text_normalizer.joblib")
+    }
+    joblib.dump(model, paths["best_model_tuned.joblib"])
+    joblib.dump(vectorizer, paths["tfidf_vectorizer.joblib"])
+    joblib.dump(le, paths["label_encoder.joblib"])
+    joblib.dump(TextNormalizer(), paths["text_normalizer.joblib"])
+
+    results = {
+        "learner": learner,
+        "rows": n_rows,
+        "trained_rows": n_trained,
+        "holdout_rows": len(holdout),
+        "accuracy": accuracy,
+        "f1_score": f1
+    }
+    with open(os.path.join(models_dir, "incremental_results.json"), "w") as f:
+        json.dump(results, f, indent=4)
+    print(f"Saved incremental model to {models_dir}")
+
+    if promote:
+        # Copy over the artifacts the API serves
+        for serving_name, path in paths.items():
+            shutil.copyfile(path, os.path.join(models_dir, serving_name))
+        # A priority head fit on the batch pipeline's features cannot score these hashed ones
+        stale_priority = os.path.join(models_dir, "priority_model.joblib")
+        if os.path.exists(stale_priority):
+            os.remove(stale_priority)
+        # Compiled serving mode must score the promoted model too, never the previous pipeline's weights
+        scorer_path = os.path.join(models_dir, "compiled_scorer.npz")
+        try:
+            CompiledScorer.from_sklearn(vectorizer, model).save(scorer_path)
+            print(f"Saved compiled scorer to {scorer_path}")
+        except (TypeError, ValueError) as e:
+            if os.path.exists(scorer_path):
+                os.remove(scorer_path)
+            print(f"Removed stale compiled scorer ({e})")
+        # The drift monitor must compare against these hashed features, not the replaced vocabulary's.
+        # The held-out reservoir is sampled per class, so the label mix comes from every row seen.
+        save_baseline(build_baseline(vectorizer, X_holdout, y_holdout, le.classes_, feature_mode="hashing",
+                                     label_counts=[reservoir.seen.get(cls, 0) for cls in le.classes_]), models_dir)
+        write_bundle_from_models_dir(models_dir, metadata={
+            "source": "train_incremental",
+            "holdout_accuracy": float(accuracy),
+            "holdout_f1_score": float(f1),
+            "train_rows": int(results["trained_rows"]),
+            "confidence_distribution": confidence_distribution(model, X_holdout)
+        })
+        print("Promoted incremental model to serving artifacts")
+
+    return model, results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train out-of-core from the raw ticket CSV.")
+    parser.add_argument("--input", default=None, help="raw tickets CSV (default data/raw/tickets.csv)")
+    parser.add_argument("--learner", choices=sorted(LEARNERS), default="sgd")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--holdout-per-class", type=int, default=HOLDOUT_PER_CLASS)
+    parser.add_argument("--n-features", type=int, default=HASHING_N_FEATURES)
+    parser.add_argument("--promote", action="store_true", help="also write the serving artifact names")
+    args = parser.parse_args()
+    train_incremental(
+        input_path=args.input,
+        learner=args.learner,
+        chunk_size=args.chunk_size,
+        holdout_per_class=args.holdout_per_class,
+        n_features=args.n_features,
+        promote=args.promote
+    )
@@ -1,79 +1,201 @@
 import numpy as np
 import os
+import sys
+import time
+import shutil
+import argparse
 import joblib
 import json
-from scipy import sparse
+import multiprocessing
+from queue import Empty
 from sklearn.linear_model import LogisticRegression
 from sklearn.svm import LinearSVC
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.metrics import classification_report, accuracy_score, f1_score
 
-def train_models():
-    processed_dir = os.path.join("data", "processed")
-    models_dir = "models"
-    
-
-    print("Loading data...")
-    X_train = sparse.load_npz(os.path.join(processed_dir, "X_train.npz"))
-    X_test = sparse.load_npz(os.path.join(processed_dir, "X_test.npz"))
-    y_train = np.load(os.path.join(processed_dir, "y_train.npy"))
-    y_test = np.load(os.path.join(processed_dir, "y_test.npy"))
-    
-    # Load label encoder to map back to class names
-    le = joblib.load(os.path.join(models_dir, "label_encoder.joblib"))
-    target_names = [str(cls) for cls in le.classes_]
-    
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
 
-    models = {
+from src.features.feature_store import load_features, downstream_key, is_fresh, record_stage
+
+TIME_BUDGET = 300.0
+F1_TOLERANCE = 0.005
+LATENCY_ROWS = 200
+
+def candidate_models():
+    return {
         "Logistic Regression": LogisticRegression(max_iter=1000, random_state=42),
         "Linear SVM": LinearSVC(random_state=42, dual='auto'),
         "Random Forest": RandomForestClassifier(n_estimators=100, random_state=42)
     }
-    
-    best_model_name = None
-    best_model = None
-    best_f1 = 0.0
+
+def single_row_latency(model, X, n_rows=LATENCY_ROWS):
+    # Serving scores one ticket at a time, so time single-row predicts
+    for i in range(min(10, X.shape[0])):
+        model.predict(X[i])
+    latencies = []
+    for i in range(n_rows):
+        row = X[i % X.shape[0]]
+        start = time.perf_counter()
+        model.predict(row)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return float(np.mean(latencies)), float(np.percentile(latencies, 95))
+
+def train_candidate(name, model, processed_dir, model_path, queue):
+    """Fit and score one candidate in its own process; the result dict goes back on queue.
+
+    Latency is not measured here: the other candidates are still training on
+    the same cores, so timings would depend on what else happens to be running.
+    """
+    try:
+        # Memory-mapped: every candidate process shares the same feature pages
+        X_train, X_test, y_train, y_test = load_features(processed_dir)
+
+        start = time.perf_counter()
+        model.fit(X_train, y_train)
+        train_seconds = time.perf_counter() - start
+
+        y_pred = model.predict(X_test)
+
+        joblib.dump(model, model_path)
+        queue.put({
+            "name": name,
+            "status": "ok",
+            "accuracy": float(accuracy_score(y_test, y_pred)),
+            "f1_score": float(f1_score(y_test, y_pred, average='weighted')),
+            "train_seconds": train_seconds,
+            "model_bytes": os.path.getsize(model_path),
+            "model_path": model_path
+        })
+    except Exception as e:
+        queue.put({"name": name, "status": "failed", "error": f"{e.__class__.__name__}: {e}"})
+
+def run_bakeoff(models, processed_dir, candidates_dir, n_jobs=None, time_budget=TIME_BUDGET):
+    """Train candidates in parallel processes, terminating any that exceed time_budget seconds."""
+    n_jobs = n_jobs or os.cpu_count() or 1
+    os.makedirs(candidates_dir, exist_ok=True)
+    queue = multiprocessing.Queue()
+    waiting = list(models.items())
+    running = {}
     results = {}
-    
+
+    while waiting or running:
+        while waiting and len(running) < n_jobs:
+            name, model = waiting.pop(0)
+            model_path = os.path.join(candidates_dir, name.lower().replace(" ", "_") + ".joblib")
+            process = multiprocessing.Process(target=train_candidate, name=f"candidate-{name}",
+                                              args=(name, model, processed_dir, model_path, queue))
+            process.start()
+            running[name] = (process, time.perf_counter())
+            print(f"Training {name}...")
+
+        try:
+            result = queue.get(timeout=0.1)
+            results[result["name"]] = result
+        except Empty:
+            pass
+
+        for name, (process, started) in list(running.items()):
+            if name in results:
+                process.join()
+                del running[name]
+            elif time.perf_counter() - started > time_budget:
+                process.terminate()
+                process.join()
+                del running[name]
+                results[name] = {"name": name, "status": "timeout", "train_seconds": time.perf_counter() - started}
+                print(f"  {name} exceeded its {time_budget:.0f}s budget and was stopped.")
+            elif not process.is_alive() and process.exitcode != 0:
+                del running[name]
+                results[name] = {"name": name, "status": "failed", "error": f"exit code {process.exitcode}"}
+
+    measure_latencies(results, processed_dir)
+    return {name: results[name] for name in models}
+
+def measure_latencies(results, processed_dir):
+    """Time each finished candidate in this process, one at a time, once all training has stopped."""
+    _, X_test, _, _ = load_features(processed_dir)
+    for result in results.values():
+        if result["status"] != "ok":
+            continue
+        mean_ms, p95_ms = single_row_latency(joblib.load(result["model_path"]), X_test)
+        result.update({"latency_ms": mean_ms, "p95_latency_ms": p95_ms})
+
+def select_best(results, f1_tolerance=F1_TOLERANCE):
+    """Best F1, preferring the fastest p95 latency among candidates within f1_tolerance of it."""
+    finished = {name: r for name, r in results.items() if r["status"] == "ok"}
+    if not finished:
+        return None
+    best_f1 = max(r["f1_score"] for r in finished.values())
+    contenders = [name for name, r in finished.items() if r["f1_score"] >= best_f1 - f1_tolerance]
+    return min(contenders, key=lambda name: (finished[name]["p95_latency_ms"], -finished[name]["f1_score"]))
+
+def print_results_table(results):
+    print(f"{'Model':22s} {'Status':8s} {'F1':>7s} {'Train s':>8s} {'ms/row':>8s} {'p95 ms':>8s} {'Size KB':>9s}")
+    for name, r in results.items():
+        if r["status"] != "ok":
+            print(f"{name:22s} {r['status']:8s}")
+            continue
+        print(f"{name:22s} {r['status']:8s} {r['f1_score']:7.4f} {r['train_seconds']:8.2f} "
+              f"{r['latency_ms']:8.4f} {r['p95_latency_ms']:8.4f} {r['model_bytes'] / 1024:9.1f}")
+
+def train_models(force=False, n_jobs=None, time_budget=TIME_BUDGET, f1_tolerance=F1_TOLERANCE):
+    processed_dir = os.path.join("data", "processed")
+    models_dir = "models"
+
+    models = candidate_models()
+
+    # Skip training when the features and candidate models match the last run
+    outputs = [os.path.join(models_dir, "best_model.joblib"), os.path.join(models_dir, "results.json")]
+    params = {name: repr(model) for name, model in models.items()}
+    params.update({"time_budget": time_budget, "f1_tolerance": f1_tolerance})
+    key = downstream_key(params=params, processed_dir=processed_dir)
+    if not force and is_fresh("train_models", key, outputs, processed_dir):
+        print(f"Baseline models are up to date (key {key}); skipping. Use --force to retrain.")
+        return
+
+    # Load label encoder to map back to class names
+    le = joblib.load(os.path.join(models_dir, "label_encoder.joblib"))
+    target_names = [str(cls) for cls in le.classes_]
+
     print("\nTraining and Evaluating Models...")
     print("-" * 60)
-    
-    for name, model in models.items():
-        print(f"Training {name}...")
-        model.fit(X_train, y_train)
-        
-        y_pred = model.predict(X_test)
-        
-        accuracy = accuracy_score(y_test, y_pred)
-        f1 = f1_score(y_test, y_pred, average='weighted')
-        
-        results[name] = {
-            "accuracy": accuracy,
-            "f1_score": f1
-        }
-        
-        print(f"  Accuracy: {accuracy:.4f}")
-        print(f"  F1 Score: {f1:.4f}")
-        
-        if f1 > best_f1:
-            best_f1 = f1
-            best_model = model
-            best_model_name = name
-            
+    candidates_dir = os.path.join(models_dir, "candidates")
+    results = run_bakeoff(models, processed_dir, candidates_dir, n_jobs=n_jobs, time_budget=time_budget)
     print("-" * 60)
-    print(f"Best Model: {best_model_name} (F1 Score: {best_f1:.4f})")
-    
+    print_results_table(results)
+
+    best_model_name = select_best(results, f1_tolerance)
+    if best_model_name is None:
+        raise RuntimeError("No candidate model finished training.")
+    best = results[best_model_name]
+    print("-" * 60)
+    print(f"Best Model: {best_model_name} (F1 Score: {best['f1_score']:.4f}, p95 {best['p95_latency_ms']:.4f} ms/row)")
 
     model_path = os.path.join(models_dir, "best_model.joblib")
-    joblib.dump(best_model, model_path)
+    os.replace(best["model_path"], model_path)
+    best_model = joblib.load(model_path)
+    shutil.rmtree(candidates_dir, ignore_errors=True)
     print(f"Saved best model to {model_path}")
-    
+
+    for result in results.values():
+        result.pop("name", None)
+        result.pop("model_path", None)
     with open(os.path.join(models_dir, "results.json"), "w") as f:
         json.dump(results, f, indent=4)
-        
+
     print("\nClassification Report (Best Model):")
+    _, X_test, _, y_test = load_features(processed_dir)
     y_pred_best = best_model.predict(X_test)
     print(classification_report(y_test, y_pred_best, target_names=target_names))
 
+    record_stage("train_models", key, outputs, processed_dir)
+
 if __name__ == "__main__":
-    train_models()
+    parser = argparse.ArgumentParser(description="Train and compare baseline models.")
+    parser.add_argument("--n-jobs", type=int, default=None, help="candidates trained at once (default: all CPUs)")
+    parser.add_argument("--time-budget", type=float, default=TIME_BUDGET, help="seconds before a candidate is stopped")
+    parser.add_argument("--f1-tolerance", type=float, default=F1_TOLERANCE,
+                        help="among models this close to the best F1, pick the lowest p95 latency")
+    parser.add_argument("--force", action="store_true", help="retrain even if features and models are unchanged")
+    args = parser.parse_args()
+    train_models(force=args.force, n_jobs=args.n_jobs, time_budget=args.time_budget, f1_tolerance=args.f1_tolerance)
@@ -0,0 +1,35 @@
+import pytest
+import sys
+import os
+
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.data.make_dataset import main as make_raw_dataset
+from src.data.preprocess import preprocess_data
+from src.features.build_features import build_features
+from src.models.train_models import train_models
+from src.models.optimize_model import optimize_model
+from src.models.compiled_scorer import export_scorer
+
+@pytest.fixture(scope="session")
+def pipeline_dir(tmp_path_factory):
+    # Generated data and models are not checked in, so run the pipeline once per session
+    root = tmp_path_factory.mktemp("pipeline")
+    with pytest.MonkeyPatch.context() as mp:
+        mp.chdir(root)
+        make_raw_dataset()
+        preprocess_data()
+        build_features()
+        train_models()
+        optimize_model()
+        export_scorer()
+    return root
+
+@pytest.fixture(scope="session")
+def pipeline_models(pipeline_dir):
+    # The API resolves TRIAGE_MODELS_DIR on every load, so reloads stay inside the scratch copy
+    path = str(pipeline_dir / "models")
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setenv("TRIAGE_MODELS_DIR", path)
+        yield path
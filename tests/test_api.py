@@ -9,7 +9,7 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from src.api.app import app, load_artifacts
 
 @pytest.fixture
-def client():
+def client(pipeline_models):
     # Load artifacts before testing
     load_artifacts()
     app.config['TESTING'] = True
@@ -21,6 +21,41 @@ def test_health_check(client):
     assert response.status_code == 200
     data = json.loads(response.data)
     assert data["status"] == "healthy"
+    assert data["ready"] is True
+    assert data["load_ms"] > 0 and data["warmup_ms"] > 0
+    assert data["preloaded"] is False
+
+def test_health_not_ready_before_load(client, monkeypatch):
+    import src.api.app as app_module
+    monkeypatch.setattr(app_module, "state", None)
+    response = client.get('/health')
+    assert response.status_code == 503
+    assert json.loads(response.data)["ready"] is False
+
+def test_forked_worker_inherits_preloaded_state(client):
+    import multiprocessing
+    import src.api.app as app_module
+    
+    def worker(queue):
+        # What a gunicorn worker sees after the preloading master forks it
+        body, status = app_module.health_status()
+        loaded = app_module.build_state
+        app_module.build_state = None  # any attempt to load artifacts in the worker would fail
+        client = app_module.app.test_client()
+        response = client.post('/predict', json={"subject": "Charged twice", "description": "Refund please"})
+        app_module.build_state = loaded
+        queue.put((body, status, response.status_code))
+    
+    app_module.create_app()
+    ctx = multiprocessing.get_context("fork")
+    queue = ctx.Queue()
+    process = ctx.Process(target=worker, args=(queue,))
+    process.start()
+    body, status, predict_status = queue.get(timeout=30)
+    process.join()
+    assert status == 200 and body["preloaded"] is True
+    assert body["model_version"] == app_module.state.model_version
+    assert predict_status == 200
 
 def test_predict_valid(client):
     payload = {
@@ -48,3 +83,139 @@ def test_predict_missing_fields(client):
 def test_predict_invalid_json(client):
     response = client.post('/predict', data="not json")
     assert response.status_code == 400
+
+def test_predict_batch_json(client):
+    payload = [
+        {"ticket_id": "b-1", "subject": "Charged twice", "description": "I was charged twice this month."},
+        {"ticket_id": "b-2"},
+        "not a ticket",
+        {"ticket_id": "b-4", "subject": "Cannot connect to server", "description": "API timeout"}
+    ]
+    response = client.post('/predict/batch', json=payload)
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert data["count"] == 4
+    assert data["errors"] == 2
+    results = data["results"]
+    assert [r["index"] for r in results] == [0, 1, 2, 3]
+    assert results[0]["ticket_id"] == "b-1"
+    assert isinstance(results[0]["predicted_category"], str)
+    assert "error" in results[1]
+    assert "error" in results[2]
+    assert "predicted_category" in results[3]
+
+def test_predict_batch_matches_single(client):
+    ticket = {"ticket_id": "s-1", "subject": "Reset password", "description": "The reset link is not arriving."}
+    single = json.loads(client.post('/predict', json=ticket).data)
+    batch = json.loads(client.post('/predict/batch', json={"tickets": [ticket]}).data)
+    assert batch["results"][0]["predicted_category"] == single["predicted_category"]
+    assert batch["results"][0]["confidence"] == pytest.approx(single["confidence"])
+
+def test_predict_batch_ndjson(client):
+    body = '\n'.join([
+        json.dumps({"ticket_id": "n-1", "subject": "Add dark mode", "description": "Night viewing"}),
+        '{broken',
+        ''
+    ])
+    response = client.post('/predict/batch', data=body, content_type='application/x-ndjson')
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert data["count"] == 2
+    assert "predicted_category" in data["results"][0]
+    assert "error" in data["results"][1]
+
+def test_predict_batch_invalid_body(client):
+    response = client.post('/predict/batch', json={"subject": "no list"})
+    assert response.status_code == 400
+
+def test_predict_top_k(client):
+    payload = {
+        "ticket_id": "test-125",
+        "subject": "Refund request",
+        "description": "I would like a refund for unused months.",
+        "top_k": 3
+    }
+    response = client.post('/predict', json=payload)
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert isinstance(data["confidence"], float)
+    assert len(data["top_categories"]) == 3
+    assert data["top_categories"][0]["category"] == data["predicted_category"]
+
+def test_predict_invalid_top_k(client):
+    payload = {"subject": "Refund request", "top_k": "three"}
+    response = client.post('/predict', json=payload)
+    assert response.status_code == 400
+
+    # A bad query value is rejected, not replaced by the body's top_k or dropped (same as the ASGI server)
+    assert client.post('/predict?top_k=abc', json=dict(payload, top_k=2)).status_code == 400
+    assert client.post('/predict/batch?top_k=abc', json=[payload]).status_code == 400
+    assert client.post('/predict/batch?top_k=0', json=[payload]).status_code == 400
+    ranked = json.loads(client.post('/predict/batch?top_k=2', json=[payload]).data)
+    assert len(ranked["results"][0]["top_categories"]) == 2
+
+def test_predict_compiled_mode_matches_sklearn(client, monkeypatch):
+    import src.api.app as app_module
+    from src.models.compiled_scorer import CompiledScorer
+    payload = {"ticket_id": "c-1", "subject": "Charged twice", "description": "Extra charge on my invoice."}
+    expected = json.loads(client.post('/predict', json=payload).data)
+
+    current = app_module.state
+    compiled = app_module.ServingState(
+        current.bundle,
+        scorer=CompiledScorer.from_sklearn(current.vectorizer, current.model, heads=(
+            {"priority": current.priority_model} if current.priority_model is not None else None)),
+        model_version="compiled-test"
+    )
+    monkeypatch.setattr(app_module, "state", compiled)
+    data = json.loads(client.post('/predict', json=payload).data)
+    assert data["predicted_category"] == expected["predicted_category"]
+    assert data["confidence"] == pytest.approx(expected["confidence"])
+    assert data.get("predicted_priority") == expected.get("predicted_priority")
+    if "priority_confidence" in expected:
+        assert data["priority_confidence"] == pytest.approx(expected["priority_confidence"])
+
+    # Each missed ticket is featurized once: the dedup lookup's rows are scored and sent to the drift monitor
+    featurized = []
+    featurize = compiled.scorer.featurize
+    monkeypatch.setattr(compiled.scorer, "featurize", lambda text: featurized.append(text) or featurize(text))
+    batch = [dict(payload, ticket_id=f"c-{i}", description=f"Invoice {i} was charged twice.") for i in range(2, 5)]
+    app_module.prediction_cache.clear()
+    assert client.post('/predict/batch', json=batch).status_code == 200
+    app_module.drift_monitor.flush()
+    assert len(featurized) == len(batch)
+
+def test_predict_cache_hits_repeated_ticket(client):
+    payload = {"ticket_id": "r-1", "subject": "Reset password", "description": "Reset link not arriving."}
+    first = json.loads(client.post('/predict', json=payload).data)
+    stats_before = json.loads(client.get('/cache/stats').data)
+
+    # Same ticket after normalization: case, spacing and symbols differ
+    repeat = {"ticket_id": "r-2", "subject": "  RESET   password@ ", "description": "Reset link not arriving."}
+    second = json.loads(client.post('/predict', json=repeat).data)
+    stats_after = json.loads(client.get('/cache/stats').data)
+
+    assert second["ticket_id"] == "r-2"
+    assert second["predicted_category"] == first["predicted_category"]
+    assert stats_after["hits"] == stats_before["hits"] + 1
+    assert stats_after["model_version"]
+
+def test_metrics_endpoint_reports_stages_and_categories(client):
+    from src.api.app import metrics
+    metrics.reset()
+    
+    payload = {"ticket_id": "m-1", "subject": "Refund request", "description": "I was charged twice, please refund."}
+    category = json.loads(client.post('/predict', json=payload).data)["predicted_category"]
+    client.post('/predict/batch', json=[payload, {"ticket_id": "bad"}])
+    
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert response.content_type.startswith("text/plain")
+    text = response.get_data(as_text=True)
+    
+    for stage in ("json_decode", "clean", "decode"):
+        assert f'triage_stage_duration_seconds_count{{stage="{stage}"}}' in text
+    assert f'triage_predictions_total{{category="{category}"}} 2' in text
+    assert 'triage_prediction_confidence_count 2' in text
+    assert 'triage_requests_total{endpoint="/predict",status="200"} 1' in text
+    assert 'triage_model_info{version=' in text
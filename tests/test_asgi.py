@@ -0,0 +1,131 @@
+import sys
+import os
+import json
+import asyncio
+
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.api.app import load_artifacts
+from src.api.asgi import MicroBatcher, app
+
+async def call(method, path, payload=None, query=b""):
+    body = json.dumps(payload).encode() if payload is not None else b""
+    scope = {
+        "type": "http", "method": method, "path": path, "query_string": query,
+        "headers": [(b"content-type", b"application/json")]
+    }
+    messages = [{"type": "http.request", "body": body, "more_body": False}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    await app(scope, receive, send)
+    return sent[0]["status"], json.loads(sent[1]["body"])
+
+def test_batcher_coalesces_concurrent_requests():
+    calls = []
+
+    def score(texts, top_k):
+        calls.append(list(texts))
+        return [{"text": text, "top_k": top_k} for text in texts]
+
+    async def scenario():
+        batcher = MicroBatcher(score, max_batch_size=8, max_wait_ms=50)
+        try:
+            results = await asyncio.gather(*[batcher.submit(f"ticket {i}") for i in range(20)])
+        finally:
+            await batcher.stop()
+        return batcher, results
+
+    batcher, results = asyncio.run(scenario())
+    assert [result["text"] for result in results] == [f"ticket {i}" for i in range(20)]
+    assert [len(batch) for batch in calls] == [8, 8, 4]
+    assert batcher.stats()["largest_batch"] == 8
+
+def test_batcher_groups_by_top_k_and_propagates_errors():
+    def score(texts, top_k):
+        if top_k == 3:
+            raise RuntimeError("scoring failed")
+        return [{"top_k": top_k} for _ in texts]
+
+    async def scenario():
+        batcher = MicroBatcher(score, max_batch_size=8, max_wait_ms=20)
+        try:
+            return await asyncio.gather(batcher.submit("a"), batcher.submit("b", 3), return_exceptions=True)
+        finally:
+            await batcher.stop()
+
+    ok, failed = asyncio.run(scenario())
+    assert ok == {"top_k": None}
+    assert isinstance(failed, RuntimeError)
+
+def test_asgi_predict_endpoints(pipeline_models):
+    load_artifacts()
+
+    async def scenario():
+        from src.api.asgi import batcher
+        try:
+            single = await asyncio.gather(*[
+                call("POST", "/predict", {"ticket_id": f"t-{i}", "subject": "Charged twice", "description": "Refund"})
+                for i in range(5)
+            ])
+            ranked = await call("POST", "/predict", {"subject": "Add dark mode"}, query=b"top_k=2")
+            invalid = await call("POST", "/predict", {"ticket_id": "x"})
+            bad_top_k = [(await call("POST", path, body, query=b"top_k=abc"))[0]
+                         for path, body in (("/predict", {"subject": "Add dark mode", "top_k": 2}),
+                                            ("/predict/batch", [{"subject": "Add dark mode"}]))]
+            batch = await call("POST", "/predict/batch", [{"subject": "Reset password"}, {}])
+            health = await call("GET", "/health")
+            missing = await call("GET", "/nope")
+        finally:
+            await batcher.stop()
+        return single, ranked, invalid, bad_top_k, batch, health, missing
+
+    single, ranked, invalid, bad_top_k, batch, health, missing = asyncio.run(scenario())
+    assert [status for status, _ in single] == [200] * 5
+    assert [data["ticket_id"] for _, data in single] == [f"t-{i}" for i in range(5)]
+    assert len(ranked[1]["top_categories"]) == 2
+    assert invalid[0] == 400
+    assert bad_top_k == [400, 400]
+    assert batch[0] == 200 and batch[1]["errors"] == 1
+    assert health[0] == 200 and health[1]["status"] == "healthy" and health[1]["ready"] is True
+    assert missing[0] == 404
+
+def test_asgi_feedback_routes_and_lifespan_start_learner(pipeline_models, tmp_path, monkeypatch):
+    import src.api.app as triage
+    from src.api.feedback import FeedbackLog, FeedbackLearner
+
+    load_artifacts()
+    learner = FeedbackLearner(FeedbackLog(str(tmp_path / "log.jsonl")), triage.publish_feedback_model, interval=60)
+    monkeypatch.setattr(triage, "feedback_learner", learner)
+    watchers = []
+    monkeypatch.setattr(triage, "start_artifact_watcher", lambda: watchers.append(True))
+
+    async def lifespan_startup():
+        messages = [{"type": "lifespan.startup"}, {"type": "lifespan.shutdown"}]
+        sent = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message["type"])
+
+        await app({"type": "lifespan"}, receive, send)
+        return sent
+
+    assert asyncio.run(lifespan_startup()) == ["lifespan.startup.complete", "lifespan.shutdown.complete"]
+    assert watchers == [True] and learner._thread.is_alive()
+    learner.stop()
+
+    ticket = {"subject": "Refund", "description": "Refund the double charge", "category": "Account Management"}
+    status, body = asyncio.run(call("POST", "/feedback", [ticket, {"subject": "x", "category": "Nope"}]))
+    assert status == 202 and body["accepted"] == 1 and body["online"] is True
+    status, stats = asyncio.run(call("GET", "/feedback/stats"))
+    assert status == 200 and stats["accepted"] == 1
+    assert os.path.getsize(tmp_path / "log.jsonl") > 0
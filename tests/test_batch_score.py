@@ -0,0 +1,77 @@
+import pytest
+import sys
+import os
+import json
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.models.batch_score import (batch_score, score_frame, load_serving_artifacts,
+                                    input_fingerprint, save_checkpoint)
+
+@pytest.fixture
+def tickets_csv(pipeline_dir, tmp_path, monkeypatch):
+    # Score against the session pipeline's models/ directory
+    monkeypatch.chdir(pipeline_dir)
+    raw_path = os.path.join("data", "raw", "tickets.csv")
+    path = tmp_path / "tickets.csv"
+    pd.read_csv(raw_path, nrows=250).to_csv(path, index=False)
+    return str(path)
+
+def test_batch_score_matches_direct_scoring(tickets_csv, tmp_path):
+    output = str(tmp_path / "scored.csv")
+    batch_score(tickets_csv, output, chunk_size=60, n_jobs=2)
+    
+    scored = pd.read_csv(output)
+    expected = score_frame(pd.read_csv(tickets_csv), load_serving_artifacts())
+    assert len(scored) == 250
+    assert list(scored["ticket_id"]) == list(expected["ticket_id"])
+    assert list(scored["predicted_category"]) == list(expected["predicted_category"])
+    assert scored["confidence"].to_numpy() == pytest.approx(expected["confidence"].to_numpy())
+    
+    # Parts and checkpoint are cleaned up after a successful run
+    assert not os.path.exists(output + ".parts")
+    assert not os.path.exists(output + ".checkpoint.json")
+
+def test_batch_score_top_k_columns(tickets_csv, tmp_path):
+    output = str(tmp_path / "scored.csv")
+    batch_score(tickets_csv, output, chunk_size=100, n_jobs=1, top_k=2)
+    
+    scored = pd.read_csv(output)
+    assert {"category_1", "confidence_1", "category_2", "confidence_2"} <= set(scored.columns)
+    assert (scored["category_1"] == scored["predicted_category"]).all()
+
+def test_batch_score_includes_priority_head(tickets_csv, tmp_path):
+    artifacts = load_serving_artifacts()
+    if artifacts.priority_model is None:
+        pytest.skip("Served model has no priority head.")
+    output = str(tmp_path / "scored.csv")
+    batch_score(tickets_csv, output, chunk_size=100, n_jobs=1)
+    
+    scored = pd.read_csv(output)
+    assert set(scored["predicted_priority"]) <= set(artifacts.priority_encoder.classes_)
+    assert scored["priority_confidence"].between(0, 1).all()
+
+def test_batch_score_resumes_from_checkpoint(tickets_csv, tmp_path):
+    output = str(tmp_path / "scored.csv")
+    parts_dir = output + ".parts"
+    os.makedirs(parts_dir)
+    
+    # Pretend an earlier run finished chunk 0 before being interrupted
+    marker = score_frame(pd.read_csv(tickets_csv, nrows=1), load_serving_artifacts())
+    marker["ticket_id"] = "from-checkpoint"
+    marker.to_csv(os.path.join(parts_dir, "part-000000.csv"), index=False)
+    fingerprint = input_fingerprint(tickets_csv, load_serving_artifacts().version, 100, "csv", None)
+    save_checkpoint(output + ".checkpoint.json", fingerprint, {0})
+    
+    batch_score(tickets_csv, output, chunk_size=100, n_jobs=1)
+    scored = pd.read_csv(output)
+    assert scored["ticket_id"].iloc[0] == "from-checkpoint"
+    assert len(scored) == 1 + 150
+    
+    # A checkpoint for a different configuration is ignored
+    os.makedirs(parts_dir)
+    marker.to_csv(os.path.join(parts_dir, "part-000000.csv"), index=False)
+    save_checkpoint(output + ".checkpoint.json", dict(fingerprint, chunk_size=7), {0})
+    batch_score(tickets_csv, output, chunk_size=100, n_jobs=1)
+    assert len(pd.read_csv(output)) == 250
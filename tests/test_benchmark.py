@@ -0,0 +1,54 @@
+import pytest
+import sys
+import os
+import json
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.api.app import load_artifacts
+from src.api.benchmark import make_payloads, run_benchmark
+
+def test_make_payloads_mixes():
+    unique = make_payloads("unique", 20)
+    assert len(unique) == 20
+    assert set(unique[0]) == {"ticket_id", "subject", "description"}
+
+    repeat = make_payloads("repeat", 50, pool_size=5)
+    assert len({p["ticket_id"] for p in repeat}) <= 5
+
+    batch = make_payloads("batch", 3, batch_size=4)
+    assert [len(b) for b in batch] == [4, 4, 4]
+
+    # Seeded, so runs are comparable across machines
+    assert make_payloads("unique", 5) == make_payloads("unique", 5)
+
+    with pytest.raises(ValueError):
+        make_payloads("bogus", 1)
+
+def test_run_benchmark_writes_report(pipeline_models, tmp_path):
+    load_artifacts()
+
+    output = tmp_path / "benchmark.json"
+    report = run_benchmark(modes=("inprocess",), mixes=("unique", "batch"), concurrency_levels=(1, 2),
+                           n_requests=10, batch_size=3, output_path=str(output))
+
+    saved = json.loads(output.read_text())
+    assert saved["config"]["model_version"] == report["config"]["model_version"]
+    assert len(saved["runs"]) == 4
+    for run in saved["runs"]:
+        assert run["errors"] == 0
+        assert run["p50_ms"] <= run["p95_ms"] <= run["p99_ms"]
+    assert saved["runs"][-1]["tickets"] == 30
+    assert {"json_decode", "clean", "score", "decode"} <= set(saved["stages"])
+
+def test_make_payloads_leaves_global_random_state_alone():
+    import random
+    import numpy as np
+
+    random.seed(7)
+    np.random.seed(7)
+    expected = (random.random(), np.random.random())
+    random.seed(7)
+    np.random.seed(7)
+    make_payloads("repeat", 20, pool_size=4, seed=1)
+    assert (random.random(), np.random.random()) == expected
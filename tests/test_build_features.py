@@ -0,0 +1,49 @@
+import pytest
+import sys
+import os
+import numpy as np
+import pandas as pd
+
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sklearn.feature_extraction.text import TfidfTransformer
+from src.features.build_features import IncrementalIdf, build_hashing_features, make_hashing_vectorizer
+
+TEXTS = [
+    "app crashes on launch", "button not working after update", "login fails with correct password",
+    "add dark mode please", "export to pdf", "integration with slack",
+    "charged twice this month", "refund request for unused months", "update credit card",
+]
+CATEGORIES = ["Bug Report"] * 3 + ["Feature Request"] * 3 + ["Billing Inquiry"] * 3
+
+@pytest.fixture
+def processed_csvs(tmp_path):
+    train_path = tmp_path / "train.csv"
+    test_path = tmp_path / "test.csv"
+    pd.DataFrame({"text": TEXTS, "category": CATEGORIES}).to_csv(train_path, index=False)
+    pd.DataFrame({"text": TEXTS[:3], "category": CATEGORIES[:3]}).to_csv(test_path, index=False)
+    return train_path, test_path
+
+def test_incremental_idf_matches_batch_fit():
+    hashing = make_hashing_vectorizer(n_features=2 ** 12)
+    counts = hashing.transform(TEXTS)
+
+    idf = IncrementalIdf(2 ** 12)
+    for start in range(0, len(TEXTS), 4):
+        idf.partial_fit(counts[start:start + 4])
+
+    expected = TfidfTransformer().fit(counts)
+    assert np.allclose(idf.to_transformer().idf_, expected.idf_)
+
+def test_hashing_features_independent_of_chunk_size(processed_csvs):
+    train_path, test_path = processed_csvs
+    _, X_small, X_test_small, y_small, _ = build_hashing_features(train_path, test_path, n_features=2 ** 12, chunk_size=2)
+    vectorizer, X_large, X_test_large, y_large, _ = build_hashing_features(train_path, test_path, n_features=2 ** 12, chunk_size=100)
+
+    assert X_small.shape == (len(TEXTS), 2 ** 12)
+    assert np.allclose(X_small.toarray(), X_large.toarray())
+    assert np.allclose(X_test_small.toarray(), X_test_large.toarray())
+    assert list(y_small) == list(y_large) == CATEGORIES
+    # The saved pipeline reproduces the training features from raw text
+    assert np.allclose(vectorizer.transform(TEXTS).toarray(), X_large.toarray())
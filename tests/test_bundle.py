@@ -0,0 +1,109 @@
+import pytest
+import sys
+import os
+import json
+import joblib
+import numpy as np
+
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+from sklearn.preprocessing import LabelEncoder
+from src.data.make_dataset import TEMPLATES
+from src.data.normalize import TextNormalizer
+from src.models.bundle import BUNDLE_NAME, load_bundle, save_bundle, write_bundle_from_models_dir
+
+@pytest.fixture
+def models_dir(tmp_path):
+    texts, categories = [], []
+    for category, template in TEMPLATES.items():
+        for subject, description in zip(template["subjects"], template["descriptions"]):
+            texts.append(f"{subject} {description}".lower())
+            categories.append(category)
+    le = LabelEncoder()
+    y = le.fit_transform(categories)
+    vectorizer = TfidfVectorizer(stop_words='english', ngram_range=(1, 2))
+    model = LogisticRegression(max_iter=1000).fit(vectorizer.fit_transform(texts), y)
+
+    joblib.dump(model, tmp_path / "best_model_tuned.joblib")
+    joblib.dump(vectorizer, tmp_path / "tfidf_vectorizer.joblib")
+    joblib.dump(le, tmp_path / "label_encoder.joblib")
+    joblib.dump(TextNormalizer(), tmp_path / "text_normalizer.joblib")
+    return tmp_path
+
+def test_bundle_round_trip_is_memory_mapped(models_dir):
+    path = write_bundle_from_models_dir(str(models_dir), metadata={"test_f1_score": 1.0})
+    bundle = load_bundle(path)
+
+    assert isinstance(bundle.model.coef_, np.memmap)
+    assert bundle.header["test_f1_score"] == 1.0
+    assert bundle.header["classes"] == [str(cls) for cls in bundle.label_encoder.classes_]
+    assert bundle.version == bundle.header["version"]
+    assert bundle.load_seconds >= 0
+    assert isinstance(bundle.normalizer, TextNormalizer)
+
+    original = joblib.load(models_dir / "best_model_tuned.joblib")
+    X = bundle.vectorizer.transform(["i was charged twice for my subscription"])
+    assert np.allclose(bundle.model.predict_proba(X), original.predict_proba(X))
+
+def test_bundle_version_tracks_model_content(models_dir, tmp_path):
+    model = joblib.load(models_dir / "best_model_tuned.joblib")
+    vectorizer = joblib.load(models_dir / "tfidf_vectorizer.joblib")
+    le = joblib.load(models_dir / "label_encoder.joblib")
+
+    first = save_bundle(tmp_path / "a.joblib", model, vectorizer, le)
+    again = save_bundle(tmp_path / "b.joblib", model, vectorizer, le)
+    model.coef_ = model.coef_ * 2
+    changed = save_bundle(tmp_path / "c.joblib", model, vectorizer, le)
+    assert first["version"] == again["version"]
+    assert first["version"] != changed["version"]
+
+def add_priority_head(models_dir):
+    vectorizer = joblib.load(models_dir / "tfidf_vectorizer.joblib")
+    texts = [f"{s} {d}".lower() for t in TEMPLATES.values() for s, d in zip(t["subjects"], t["descriptions"])]
+    priorities = ["High" if "error" in text or "crash" in text else ["Low", "Medium"][i % 2] for i, text in enumerate(texts)]
+    priority_le = LabelEncoder()
+    priority_model = LogisticRegression(max_iter=1000).fit(vectorizer.transform(texts), priority_le.fit_transform(priorities))
+    joblib.dump(priority_model, models_dir / "priority_model.joblib")
+    joblib.dump(priority_le, models_dir / "priority_encoder.joblib")
+
+def test_bundle_carries_priority_head(models_dir):
+    without = load_bundle(write_bundle_from_models_dir(str(models_dir)))
+    assert without.priority_model is None and without.header["priority_classes"] is None
+
+    add_priority_head(models_dir)
+    bundle = load_bundle(write_bundle_from_models_dir(str(models_dir)))
+    assert bundle.header["priority_classes"] == ["High", "Low", "Medium"]
+    assert isinstance(bundle.priority_model.coef_, np.memmap)
+    assert bundle.version != without.version
+
+def test_unknown_bundle_format_rejected(tmp_path):
+    path = tmp_path / BUNDLE_NAME
+    joblib.dump({"header": {"format_version": 999}}, path)
+    with pytest.raises(ValueError):
+        load_bundle(path)
+
+def test_api_serves_bundle(pipeline_models, models_dir, monkeypatch):
+    import src.api.app as app_module
+    write_bundle_from_models_dir(str(models_dir))
+    monkeypatch.setenv("TRIAGE_MODELS_DIR", str(models_dir))
+    app_module.load_artifacts()
+    try:
+        assert app_module.state.bundle.path.endswith(BUNDLE_NAME)
+        client = app_module.app.test_client()
+        response = client.post('/predict', json={"subject": "Charged twice", "description": "Refund please"})
+        assert response.status_code == 200
+        assert json.loads(response.data)["predicted_category"] in TEMPLATES
+        assert "predicted_priority" not in json.loads(response.data)
+
+        add_priority_head(models_dir)
+        write_bundle_from_models_dir(str(models_dir))
+        app_module.load_artifacts()
+        data = json.loads(client.post('/predict', json={"subject": "App crashes", "description": "Error on launch"}).data)
+        assert data["predicted_priority"] in ("High", "Low", "Medium")
+        assert 0.0 <= data["priority_confidence"] <= 1.0
+    finally:
+        monkeypatch.setenv("TRIAGE_MODELS_DIR", pipeline_models)
+        app_module.load_artifacts()
@@ -0,0 +1,136 @@
+import pytest
+import sys
+import os
+import numpy as np
+
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+from sklearn.svm import LinearSVC
+from src.data.make_dataset import TEMPLATES
+from src.models.compiled_scorer import CompiledScorer
+from src.models.predict_model import predict_scores
+
+@pytest.fixture
+def corpus():
+    texts, labels = [], []
+    for label, template in enumerate(TEMPLATES.values()):
+        for subject, description in zip(template["subjects"], template["descriptions"]):
+            texts.append(f"{subject} {description}".lower())
+            labels.append(label)
+    return texts, np.array(labels)
+
+@pytest.fixture
+def vectorizer(corpus):
+    texts, _ = corpus
+    vectorizer = TfidfVectorizer(max_features=300, stop_words='english', ngram_range=(1, 2))
+    vectorizer.fit(texts)
+    return vectorizer
+
+def test_parity_with_sklearn_logistic_regression(corpus, vectorizer):
+    texts, y = corpus
+    X = vectorizer.transform(texts)
+    model = LogisticRegression(max_iter=1000).fit(X, y)
+    scorer = CompiledScorer.from_sklearn(vectorizer, model)
+
+    unseen = texts + ["completely unrelated words zzz", "", "urgent: login fails with correct password!!"]
+    X_unseen = vectorizer.transform(unseen)
+    assert np.allclose(scorer.decision_function(unseen), model.decision_function(X_unseen))
+    assert np.allclose(scorer.predict_proba(unseen), model.predict_proba(X_unseen))
+    assert np.array_equal(scorer.predict(unseen), model.predict(X_unseen))
+
+def test_parity_with_margin_model(corpus, vectorizer):
+    texts, y = corpus
+    X = vectorizer.transform(texts)
+    model = LinearSVC(dual='auto').fit(X, y)
+    scorer = CompiledScorer.from_sklearn(vectorizer, model)
+    assert scorer.mode == "margin"
+    assert np.allclose(scorer.predict_proba(texts), predict_scores(model, X))
+
+def test_save_load_round_trip(tmp_path, corpus, vectorizer):
+    texts, y = corpus
+    model = LogisticRegression(max_iter=1000).fit(vectorizer.transform(texts), y)
+    scorer = CompiledScorer.from_sklearn(vectorizer, model)
+    path = tmp_path / "compiled_scorer.npz"
+    scorer.save(path)
+    loaded = CompiledScorer.load(path)
+    assert np.allclose(loaded.predict_proba(texts), scorer.predict_proba(texts))
+    assert np.array_equal(loaded.classes_, scorer.classes_)
+
+def test_non_linear_model_rejected(corpus, vectorizer):
+    from sklearn.ensemble import RandomForestClassifier
+    texts, y = corpus
+    model = RandomForestClassifier(n_estimators=2).fit(vectorizer.transform(texts), y)
+    with pytest.raises(TypeError):
+        CompiledScorer.from_sklearn(vectorizer, model)
+
+def test_parity_with_hashing_pipeline(tmp_path, corpus):
+    from sklearn.pipeline import make_pipeline
+    from src.features.build_features import IncrementalIdf, make_hashing_vectorizer
+    texts, y = corpus
+    hashing = make_hashing_vectorizer(n_features=2 ** 12)
+    counts = hashing.transform(texts)
+    vectorizer = make_pipeline(hashing, IncrementalIdf(2 ** 12).partial_fit(counts).to_transformer())
+    model = LogisticRegression(max_iter=1000).fit(vectorizer.transform(texts), y)
+
+    scorer = CompiledScorer.from_sklearn(vectorizer, model)
+    path = tmp_path / "compiled_scorer.npz"
+    scorer.save(path)
+    loaded = CompiledScorer.load(path)
+    assert loaded.vocabulary is None
+    assert np.allclose(loaded.predict_proba(texts), model.predict_proba(vectorizer.transform(texts)))
+
+@pytest.mark.parametrize("dtype, tolerance", [("float16", 1e-2), ("int8", 5e-2)])
+def test_quantized_weights_round_trip(corpus, vectorizer, tmp_path, dtype, tolerance):
+    texts, y = corpus
+    model = LogisticRegression(max_iter=1000).fit(vectorizer.transform(texts), y)
+    exact = CompiledScorer.from_sklearn(vectorizer, model)
+    scorer = CompiledScorer.from_sklearn(vectorizer, model).quantize(dtype)
+    
+    assert scorer.weights.dtype == np.dtype(dtype)
+    assert np.allclose(scorer.predict_proba(texts), exact.predict_proba(texts), atol=tolerance)
+    assert (scorer.predict(texts) == exact.predict(texts)).mean() >= 0.95
+    
+    path = str(tmp_path / "scorer.npz")
+    scorer.save(path)
+    loaded = CompiledScorer.load(path)
+    assert loaded.weights.dtype == np.dtype(dtype)
+    assert np.allclose(loaded.decision_function(texts), scorer.decision_function(texts))
+
+def test_priority_head_shares_featurization(tmp_path, corpus, vectorizer):
+    texts, y = corpus
+    X = vectorizer.transform(texts)
+    priority = np.array([int("password" in text or "error" in text) + (i % 2) for i, text in enumerate(texts)])
+    model = LogisticRegression(max_iter=1000).fit(X, y)
+    priority_model = LogisticRegression(max_iter=1000).fit(X, priority)
+    scorer = CompiledScorer.from_sklearn(vectorizer, model, heads={"priority": priority_model}).quantize("int8")
+
+    probs, heads = scorer.predict_proba_with_heads(texts)
+    assert np.allclose(probs, scorer.predict_proba(texts))
+    assert np.allclose(heads["priority"], priority_model.predict_proba(X))
+
+    # Rows the caller already featurized score the same as the texts
+    features = scorer.transform(texts)
+    from_rows, row_heads = scorer.predict_proba_with_heads(texts, features=features)
+    assert np.allclose(from_rows, probs) and np.allclose(row_heads["priority"], heads["priority"])
+    assert np.allclose(scorer.predict_proba(texts, features[:3]), probs[:3])
+
+    path = tmp_path / "compiled_scorer.npz"
+    scorer.save(path)
+    loaded = CompiledScorer.load(path)
+    assert np.array_equal(loaded.heads["priority"]["classes"], priority_model.classes_)
+    assert np.allclose(loaded.predict_proba_with_heads(texts)[1]["priority"], heads["priority"])
+
+def test_with_weights_keeps_dtype_and_leaves_original(corpus, vectorizer):
+    texts, y = corpus
+    X = vectorizer.transform(texts)
+    model = LogisticRegression(max_iter=1000).fit(X, y)
+    scorer = CompiledScorer.from_sklearn(vectorizer, model).quantize("float16")
+    before = scorer.decision_function(texts)
+
+    updated = scorer.with_weights(model.coef_ * 2, model.intercept_)
+    assert updated.weights.dtype == np.float16
+    assert np.allclose(updated.decision_function(texts), X @ (model.coef_ * 2).T + model.intercept_, atol=1e-2)
+    assert np.array_equal(scorer.decision_function(texts), before)
@@ -0,0 +1,50 @@
+import pytest
+import sys
+import os
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+from src.data.make_dataset import TEMPLATES
+from src.models.compress_model import magnitude_keep_mask, l1_keep_mask, prune_vectorizer
+
+@pytest.fixture
+def fitted():
+    texts, labels = [], []
+    for label, template in enumerate(TEMPLATES.values()):
+        for subject, description in zip(template["subjects"], template["descriptions"]):
+            texts.append(f"{subject} {description}".lower())
+            labels.append(label)
+    vectorizer = TfidfVectorizer(stop_words='english', ngram_range=(1, 2)).fit(texts)
+    X = vectorizer.transform(texts)
+    model = LogisticRegression(max_iter=1000).fit(X, labels)
+    return texts, np.array(labels), vectorizer, X, model
+
+def test_magnitude_mask_keeps_largest_weights(fitted):
+    _, _, _, _, model = fitted
+    keep = magnitude_keep_mask(model, 0.2)
+    importance = np.abs(model.coef_).max(axis=0)
+    
+    assert keep.sum() == round(0.2 * importance.size)
+    assert importance[keep].min() >= importance[~keep].max()
+
+def test_pruned_vectorizer_keeps_terms_and_idf(fitted):
+    texts, y, vectorizer, X, model = fitted
+    keep = magnitude_keep_mask(model, 0.3)
+    pruned = prune_vectorizer(vectorizer, keep, texts)
+    
+    kept_terms = {term for term, idx in vectorizer.vocabulary_.items() if keep[idx]}
+    assert set(pruned.vocabulary_) == kept_terms
+    for term, idx in pruned.vocabulary_.items():
+        assert pruned.idf_[idx] == pytest.approx(vectorizer.idf_[vectorizer.vocabulary_[term]])
+    
+    refit = LogisticRegression(max_iter=1000).fit(pruned.transform(texts), y)
+    assert (refit.predict(pruned.transform(texts)) == y).mean() >= 0.9
+
+def test_l1_mask_is_sparse(fitted):
+    _, y, _, X, _ = fitted
+    keep = l1_keep_mask(X, y, C=10.0)
+    # An L2 fit keeps every term, so a real L1 penalty must drop most of them
+    assert 0 < keep.sum() < keep.size // 2
@@ -0,0 +1,114 @@
+import pytest
+import sys
+import os
+import json
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sklearn.feature_extraction.text import TfidfVectorizer
+from src.data.make_dataset import TEMPLATES
+from src.api.dedup import DuplicateIndex
+
+@pytest.fixture
+def vectorizer():
+    texts = [f"{s} {d}".lower() for t in TEMPLATES.values() for s, d in zip(t["subjects"], t["descriptions"])]
+    return TfidfVectorizer(stop_words='english', ngram_range=(1, 2)).fit(texts)
+
+def add(index, vectorizer, ticket_id, text, result, version="v1", top_k=None):
+    X = vectorizer.transform([text])
+    (entry, bands), = index.lookup(X, version, top_k)
+    index.add(ticket_id, text, X, 0, bands, result, version, top_k)
+    return entry
+
+def test_near_duplicate_found_and_unrelated_ticket_missed(vectorizer):
+    index = DuplicateIndex(threshold=0.8)
+    original = "charged twice i noticed i was charged twice for this month's subscription."
+    assert add(index, vectorizer, "t-1", original, {"predicted_category": "Billing Inquiry"}) is None
+
+    variant = vectorizer.transform([original + " please help! ticket id ref: 4821."])
+    (entry, _), = index.lookup(variant, "v1")
+    assert entry.ticket_id == "t-1" and entry.result["predicted_category"] == "Billing Inquiry"
+
+    unrelated = vectorizer.transform(["add dark mode it would be great to have a dark mode for night viewing."])
+    (entry, _), = index.lookup(unrelated, "v1")
+    assert entry is None
+    assert index.get_exact(original, "v1").ticket_id == "t-1"
+    assert index.stats()["near_matches"] == 1
+
+def test_same_ticket_top_k_and_model_version_do_not_match(vectorizer):
+    index = DuplicateIndex(threshold=0.8)
+    text = "reset password i forgot my password and the reset link is not arriving."
+    add(index, vectorizer, "t-1", text, {"predicted_category": "Account Management"})
+    X = vectorizer.transform([text])
+
+    assert index.lookup(X, "v1", ticket_ids=["t-1"])[0][0] is None
+    assert index.lookup(X, "v1", top_k=3)[0][0] is None
+    assert index.lookup(X, "v1")[0][0] is not None
+    # A new model version starts from an empty index
+    assert index.lookup(X, "v2")[0][0] is None
+    assert index.stats()["size"] == 0
+    assert index.get_exact(text, "v1") is None
+
+def test_index_is_bounded_with_lru_eviction(vectorizer):
+    index = DuplicateIndex(max_size=3, threshold=0.99)
+    texts = [f"{s} {d}".lower() for t in TEMPLATES.values() for s, d in zip(t["subjects"], t["descriptions"])][:5]
+    for i, text in enumerate(texts):
+        add(index, vectorizer, f"t-{i}", text, {"i": i})
+    stats = index.stats()
+    assert stats["size"] == 3 and stats["evictions"] == 2
+    assert index.get_exact(texts[0], "v1") is None
+    assert index.get_exact(texts[4], "v1").ticket_id == "t-4"
+    assert sum(len(bucket) for bucket in index._buckets) <= 3 * index.n_bands
+
+def test_empty_vector_is_never_indexed(vectorizer):
+    index = DuplicateIndex()
+    assert add(index, vectorizer, "t-1", "zzz qqq", {"i": 1}) is None
+    assert index.stats()["size"] == 0
+
+def test_api_returns_duplicate_of(pipeline_models):
+    from src.api.app import app, load_artifacts, duplicate_index
+    load_artifacts()
+    duplicate_index.clear()
+    client = app.test_client()
+    ticket = {"subject": "Charged twice", "description": "I noticed I was charged twice for this month's subscription."}
+
+    first = json.loads(client.post('/predict', json=dict(ticket, ticket_id="orig-1")).data)
+    assert "duplicate_of" not in first
+    repeat = json.loads(client.post('/predict', json=dict(ticket, ticket_id="orig-2")).data)
+    variant = json.loads(client.post('/predict', json=dict(
+        ticket, ticket_id="orig-3", description=ticket["description"] + " Please help! Ticket ID ref: 4821.")).data)
+    assert repeat["duplicate_of"] == "orig-1" and variant["duplicate_of"] == "orig-1"
+    assert variant["ticket_id"] == "orig-3"
+    assert variant["predicted_category"] == first["predicted_category"]
+
+    batch = json.loads(client.post('/predict/batch', json=[dict(ticket, ticket_id="orig-4")]).data)
+    assert batch["results"][0]["duplicate_of"] == "orig-1"
+    stats = json.loads(client.get('/duplicates/stats').data)
+    assert stats["exact_matches"] >= 2 and stats["near_matches"] >= 1
+
+def test_group_links_near_copies_within_a_batch(vectorizer):
+    index = DuplicateIndex()
+    original = "charged twice i noticed i was charged twice for this month's subscription."
+    X = vectorizer.transform([original, "add dark mode for night viewing.", original + " ticket id ref: 4821."])
+    index._ensure("v1", X.shape[1])
+    bands = [index.signature(X.indices[X.indptr[r]:X.indptr[r + 1]], X.data[X.indptr[r]:X.indptr[r + 1]])
+             for r in range(3)]
+    assert index.group(X, [0, 1, 2], bands) == {0: 0, 1: 1, 2: 0}
+
+def test_api_groups_new_duplicates_within_one_batch(pipeline_models):
+    from src.api.app import app, load_artifacts, duplicate_index, prediction_cache
+    load_artifacts()
+    duplicate_index.clear()
+    prediction_cache.clear()
+    client = app.test_client()
+    ticket = {"subject": "Reset password", "description": "I forgot my password and the reset link is not arriving."}
+    batch = [dict(ticket, ticket_id="storm-1"),
+             dict(ticket, ticket_id="storm-2", description=ticket["description"] + " Please help! Ticket ID ref: 1234."),
+             dict(ticket, ticket_id="storm-3")]
+    before = duplicate_index.stats()["size"]
+    results = json.loads(client.post('/predict/batch', json=batch).data)["results"]
+    assert "duplicate_of" not in results[0]
+    assert results[1]["duplicate_of"] == "storm-1" and results[2]["duplicate_of"] == "storm-1"
+    assert len({r["predicted_category"] for r in results}) == 1
+    # Only the leader was scored and indexed
+    assert duplicate_index.stats()["size"] == before + 1
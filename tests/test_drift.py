@@ -0,0 +1,141 @@
+import pytest
+import sys
+import os
+import json
+from types import SimpleNamespace
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.preprocessing import LabelEncoder
+from src.data.make_dataset import TEMPLATES
+from src.features.drift import DriftSketch, build_baseline, psi, save_baseline, load_baseline
+from src.api.drift import DriftMonitor
+
+@pytest.fixture
+def tickets():
+    texts, categories = [], []
+    for category, t in TEMPLATES.items():
+        for s, d in zip(t["subjects"], t["descriptions"]):
+            texts.append(f"{s} {d}".lower())
+            categories.append(category)
+    return texts, categories
+
+@pytest.fixture
+def serving(tickets):
+    texts, categories = tickets
+    vectorizer = TfidfVectorizer(stop_words='english', ngram_range=(1, 2)).fit(texts)
+    le = LabelEncoder().fit(categories)
+    y = le.transform(categories)
+    baseline = build_baseline(vectorizer, vectorizer.transform(texts), y, le.classes_, holdout_texts=texts)
+    return SimpleNamespace(model_version="v1", scorer=None, vectorizer=vectorizer, label_encoder=le,
+                           drift_baseline=baseline, confidence_baseline=[0.0] * 9 + [1.0]), y
+
+def feed(monitor, current, texts, labels, confidence):
+    for i in range(0, len(texts), 4):
+        batch = texts[i:i + 4]
+        monitor.update(batch, current.vectorizer.transform(batch), labels[i:i + 4], [confidence] * len(batch), current)
+
+def test_psi_is_zero_for_same_distribution_and_large_for_shift():
+    assert psi([0.25, 0.25, 0.5], [1, 1, 2]) == pytest.approx(0.0)
+    assert psi([0.5, 0.5, 0.0], [0.0, 0.1, 0.9]) > 1.0
+
+def test_sketch_memory_does_not_grow_with_traffic(serving):
+    current, y = serving
+    sketch = DriftSketch(current.label_encoder.classes_, n_buckets=16)
+    X = current.vectorizer.transform(["reset password link", "charged twice refund"] * 50)
+    sketch.update_features(X)
+    sketch.update_predictions(np.zeros(100, dtype=int), np.full(100, 0.95))
+    summary = sketch.summary()
+    assert sketch.feature_mass.shape == (16,)
+    assert summary["n_docs"] == 100
+    assert summary["mean_nnz"] == pytest.approx(X.nnz / 100)
+    assert sum(summary["feature_distribution"]) == pytest.approx(1.0)
+    assert summary["confidence_distribution"][9] == 1.0
+
+def test_in_distribution_traffic_raises_no_alerts(serving, tickets):
+    current, y = serving
+    texts, _ = tickets
+    monitor = DriftMonitor(window_size=len(texts))
+    feed(monitor, current, texts, y, 0.95)
+    report = monitor.report()
+    assert report["windows"] == 1
+    assert report["alerting"] == []
+    assert report["signals"]["oov_rate"]["value"] == pytest.approx(0.0)
+
+def test_shifted_traffic_alerts_on_cheap_signals(serving, tickets, capsys):
+    current, y = serving
+    texts, _ = tickets
+    shifted = [f"quantum kubernetes terraform helm {text.split()[0]}" for text in texts]
+    monitor = DriftMonitor(window_size=len(texts))
+    feed(monitor, current, shifted, np.zeros(len(texts), dtype=int), 0.35)
+    report = monitor.report()
+    assert {"oov_rate", "category_psi", "confidence_psi"} <= set(report["alerting"])
+    assert report["last_window"]["oov_rate"] > 0.5
+    assert "Drift alert: oov_rate" in capsys.readouterr().out
+
+def test_new_model_version_starts_fresh_windows(serving, tickets):
+    current, y = serving
+    texts, _ = tickets
+    monitor = DriftMonitor(window_size=len(texts))
+    feed(monitor, current, texts, y, 0.95)
+    assert monitor.report()["total"]["n_docs"] == len(texts)
+    current.model_version = "v2"
+    feed(monitor, current, texts[:4], y[:4], 0.95)
+    report = monitor.report()
+    assert report["model_version"] == "v2"
+    assert report["total"]["n_docs"] == 4 and report["signals"] == {}
+
+def test_observe_drops_batches_instead_of_blocking(serving):
+    current, y = serving
+    monitor = DriftMonitor(max_pending=1)
+    monitor._ensure_thread = lambda: None  # nothing drains the queue
+    X = current.vectorizer.transform(["reset password"])
+    result = {"predicted_category": str(current.label_encoder.classes_[y[0]]), "confidence": 0.9}
+    for _ in range(3):
+        monitor.observe(["reset password"], X, [result], current)
+    assert monitor.report()["dropped"] == 2
+
+def test_baseline_round_trip(serving, tmp_path):
+    current, _ = serving
+    save_baseline(current.drift_baseline, str(tmp_path))
+    assert load_baseline(str(tmp_path)) == json.loads(json.dumps(current.drift_baseline))
+    assert load_baseline(str(tmp_path / "missing")) is None
+    # A baseline built for another feature space is refused
+    assert load_baseline(str(tmp_path), current.vectorizer) is not None
+    other = TfidfVectorizer().fit(["reset password link", "charged twice refund"])
+    assert load_baseline(str(tmp_path), other) is None
+
+def test_drift_endpoint_reports_served_traffic(pipeline_models, monkeypatch):
+    import src.api.app as triage
+    triage.load_artifacts()
+    monkeypatch.setattr(triage, "drift_monitor", DriftMonitor(window_size=2))
+    client = triage.app.test_client()
+    descriptions = ["The invoice total is wrong.", "Export to PDF crashes the app.", "Please add a calendar view."]
+    for i, description in enumerate(descriptions):
+        client.post('/predict', json={"ticket_id": f"d-{i}", "subject": "Drift check", "description": description})
+    triage.drift_monitor.flush()
+    data = json.loads(client.get('/drift').data)
+    assert data["model_version"] == triage.state.model_version
+    assert data["windows"] == 1 and data["current_window_docs"] == 1
+    assert data["total"]["n_docs"] == 3
+    assert "triage_drift_dropped_total 0" in client.get('/metrics').get_data(as_text=True)
+
+def test_repeated_tickets_reach_the_prediction_sketches(pipeline_models, monkeypatch):
+    import src.api.app as triage
+    triage.load_artifacts()
+    monkeypatch.setattr(triage, "drift_monitor", DriftMonitor(window_size=100))
+    triage.prediction_cache.clear()
+    triage.duplicate_index.clear()
+    client = triage.app.test_client()
+    ticket = {"subject": "Storm check", "description": "Export to PDF crashes the app every time."}
+    client.post('/predict', json=dict(ticket, ticket_id="storm-0"))
+    client.post('/predict/batch', json=[dict(ticket, ticket_id=f"storm-{i}") for i in range(1, 4)])
+    client.post('/predict', json=dict(ticket, ticket_id="storm-0"))
+    triage.drift_monitor.flush()
+    total = triage.drift_monitor.report()["total"]
+    # One ticket was vectorized; all five served predictions were sketched
+    assert total["n_docs"] == 1 and total["n_predictions"] == 5
+    assert max(total["category_distribution"].values()) == 1.0
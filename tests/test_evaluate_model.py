@@ -0,0 +1,89 @@
+import pytest
+import sys
+import os
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from sklearn.datasets import make_classification
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import accuracy_score, f1_score, precision_recall_fscore_support
+from sklearn.preprocessing import LabelEncoder
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.models.evaluate_model import StreamingMetrics, measure_throughput, iter_holdout_chunks, holdout_files
+from src.models.predict_model import predict_with_confidence
+
+@pytest.fixture
+def fitted():
+    X, y = make_classification(n_samples=900, n_features=20, n_informative=6, n_classes=4, random_state=0)
+    model = LogisticRegression(max_iter=1000).fit(X[:600], y[:600])
+    return model, sparse.csr_matrix(X[600:]), y[600:]
+
+def test_chunked_metrics_match_one_shot_sklearn(fitted):
+    model, X, y = fitted
+    accumulator = StreamingMetrics(4)
+    for start in range(0, X.shape[0], 70):
+        labels, confidences, _, _ = predict_with_confidence(model, X[start:start + 70])
+        accumulator.update(y[start:start + 70], labels, confidences)
+
+    y_pred = model.predict(X)
+    report = accumulator.report(["a", "b", "c", "d"])
+    precision, recall, f1, support = precision_recall_fscore_support(y, y_pred, zero_division=0)
+    assert report["n_rows"] == X.shape[0]
+    assert report["accuracy"] == pytest.approx(accuracy_score(y, y_pred))
+    assert report["f1_score"] == pytest.approx(f1_score(y, y_pred, average="weighted"))
+    assert report["macro_f1_score"] == pytest.approx(f1_score(y, y_pred, average="macro"))
+    assert [report["per_class"][name]["recall"] for name in "abcd"] == pytest.approx(recall)
+    assert [report["per_class"][name]["precision"] for name in "abcd"] == pytest.approx(precision)
+    assert [report["per_class"][name]["support"] for name in "abcd"] == list(support)
+    assert sum(b["count"] for b in report["calibration"]) == X.shape[0]
+
+def test_calibration_error_of_known_bins():
+    accumulator = StreamingMetrics(2, n_bins=10)
+    # Bin 0.9-1.0: confidence 0.95, half right; bin 0.5-0.6: confidence 0.55, all right
+    accumulator.update([0, 1, 0, 1], [0, 0, 1, 1], [0.95, 0.95, 0.55, 1.0])
+    report = accumulator.report(["x", "y"])
+    top = report["calibration"][9]
+    assert top["count"] == 3 and top["accuracy"] == pytest.approx(2 / 3)
+    assert report["calibration"][5]["accuracy"] == 0.0
+    assert report["calibration"][0]["mean_confidence"] is None
+    assert report["expected_calibration_error"] == pytest.approx((abs(2 - 2.9) + abs(0 - 0.55)) / 4)
+
+def test_throughput_reports_each_batch_size_that_fits(fitted):
+    model, X, _ = fitted
+    results = measure_throughput(model, X, batch_sizes=(1, 64, 10000), min_seconds=0.01)
+    assert [row["batch_size"] for row in results] == [1, 64]
+    assert all(row["rows_per_second"] > 0 and row["batch_latency_ms"] > 0 for row in results)
+
+def test_holdout_chunks_vectorize_raw_tickets_and_skip_unknown_labels(tmp_path):
+    frame = pd.DataFrame({
+        "ticket_id": ["t1", "t2", "t3"],
+        "subject": ["Reset password", "Charged twice", "Hello"],
+        "description": ["Reset link missing", "Refund please", "Just saying hi"],
+        "category": ["Account Management", "Billing Inquiry", "Small Talk"]
+    })
+    shards = tmp_path / "shards"
+    shards.mkdir()
+    frame.iloc[:2].to_csv(shards / "tickets-00000.csv", index=False)
+    frame.iloc[2:].to_csv(shards / "tickets-00001.csv", index=False)
+    artifacts = SimpleNamespace(
+        vectorizer=TfidfVectorizer().fit(["reset password link missing", "charged twice refund"]),
+        label_encoder=LabelEncoder().fit(["Account Management", "Billing Inquiry"]),
+        normalizer=None
+    )
+    skipped = {"unknown_labels": 0}
+    chunks = list(iter_holdout_chunks(holdout_files(str(shards)), artifacts, 1, skipped))
+    assert [y.tolist() for _, y in chunks] == [[0], [1]]
+    assert chunks[0][0].shape == (1, len(artifacts.vectorizer.vocabulary_))
+    assert skipped["unknown_labels"] == 1
+
+def test_importing_evaluate_model_does_not_load_pandas():
+    import subprocess
+    code = "import sys, src.models.evaluate_model; print('pandas' in sys.modules)"
+    root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+    output = subprocess.run([sys.executable, "-c", code], cwd=root, capture_output=True, text=True, check=True).stdout
+    assert output.strip() == "False"
@@ -0,0 +1,102 @@
+import sys
+import os
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.features.feature_store import (save_csr, load_csr, save_features, load_features, stage_key,
+                                        downstream_key, is_fresh, record_stage, recorded_key, stage_replaced)
+from src.features.build_features import build_features
+
+def test_csr_round_trip_is_memory_mapped(tmp_path):
+    X = sparse.random(50, 20, density=0.2, format="csr", random_state=0)
+    save_csr(str(tmp_path), "X", X)
+    
+    loaded = load_csr(str(tmp_path), "X")
+    assert loaded.shape == X.shape
+    assert (loaded != X).nnz == 0
+    # The matrix wraps the memory-mapped files rather than in-memory copies
+    for array in (loaded.data, loaded.indices, loaded.indptr):
+        base = array
+        while base is not None and not isinstance(base, np.memmap):
+            base = base.base
+        assert base is not None
+        assert not array.flags.writeable
+
+def test_load_features_falls_back_to_npz(tmp_path):
+    X = sparse.random(5, 4, density=0.5, format="csr", random_state=1)
+    sparse.save_npz(str(tmp_path / "X_train.npz"), X)
+    sparse.save_npz(str(tmp_path / "X_test.npz"), X)
+    np.save(str(tmp_path / "y_train.npy"), np.arange(5))
+    np.save(str(tmp_path / "y_test.npy"), np.arange(5))
+    
+    X_train, X_test, y_train, _ = load_features(str(tmp_path))
+    assert (X_train != X).nnz == 0
+    assert list(y_train) == list(range(5))
+
+def test_stage_keys_track_inputs_params_and_upstream(tmp_path):
+    path = tmp_path / "input.csv"
+    path.write_text("a,b\n1,2\n")
+    key = stage_key(inputs=[str(path)], params={"C": 1})
+    
+    assert stage_key(inputs=[str(path)], params={"C": 1}) == key
+    assert stage_key(inputs=[str(path)], params={"C": 2}) != key
+    path.write_text("a,b\n1,3\n")
+    assert stage_key(inputs=[str(path)], params={"C": 1}) != key
+    
+    # Downstream stages are uncacheable until their upstream stage has a record
+    processed_dir = str(tmp_path)
+    assert downstream_key(params={"C": 1}, processed_dir=processed_dir) is None
+    record_stage("build_features", "abc", processed_dir=processed_dir)
+    train_key = downstream_key(params={"C": 1}, processed_dir=processed_dir)
+    assert train_key is not None
+    
+    output = tmp_path / "model.joblib"
+    output.write_text("model")
+    record_stage("train_models", train_key, [str(output)], processed_dir)
+    assert is_fresh("train_models", train_key, [str(output)], processed_dir)
+    output.unlink()
+    assert not is_fresh("train_models", train_key, [str(output)], processed_dir)
+    
+    record_stage("build_features", "def", processed_dir=processed_dir)
+    assert downstream_key(params={"C": 1}, processed_dir=processed_dir) != train_key
+
+def test_build_features_skips_when_inputs_unchanged(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs(os.path.join("data", "processed"))
+    texts = ["app crashes on launch", "refund my payment", "add dark mode", "login fails", "charged twice", "export to pdf"]
+    categories = ["Bug", "Billing", "Feature", "Bug", "Billing", "Feature"]
+    frame = pd.DataFrame({"text": texts, "category": categories})
+    frame.to_csv(os.path.join("data", "processed", "train.csv"), index=False)
+    frame.to_csv(os.path.join("data", "processed", "test.csv"), index=False)
+    
+    key = build_features()
+    X_train, _, y_train, _ = load_features()
+    assert X_train.shape[0] == len(texts)
+    
+    data_path = os.path.join("data", "processed", "X_train.data.npy")
+    mtime = os.stat(data_path).st_mtime_ns
+    assert build_features() == key
+    assert os.stat(data_path).st_mtime_ns == mtime
+    
+    # Different parameters or changed inputs rebuild
+    assert build_features(feature_mode="hashing", n_features=2 ** 10) != key
+    frame.iloc[::-1].to_csv(os.path.join("data", "processed", "train.csv"), index=False)
+    assert build_features() != key
+
+def test_overwritten_outputs_make_the_stage_stale(tmp_path):
+    processed_dir = str(tmp_path)
+    vectorizer = tmp_path / "tfidf_vectorizer.joblib"
+    vectorizer.write_text("tfidf")
+    record_stage("build_features", "abc", [str(vectorizer)], processed_dir)
+    assert is_fresh("build_features", "abc", [str(vectorizer)], processed_dir)
+    assert not stage_replaced("build_features", processed_dir)
+
+    # A promote copies a different vectorizer over the stage's output
+    vectorizer.write_text("hashing")
+    assert not is_fresh("build_features", "abc", [str(vectorizer)], processed_dir)
+    assert recorded_key("build_features", processed_dir) is None
+    assert downstream_key(processed_dir=processed_dir) is None
+    assert stage_replaced("build_features", processed_dir)
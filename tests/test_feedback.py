@@ -0,0 +1,225 @@
+import pytest
+import sys
+import os
+import json
+import time
+from types import SimpleNamespace
+from datetime import datetime, timezone
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+from sklearn.preprocessing import LabelEncoder
+from src.data.make_dataset import TEMPLATES
+from src.data.normalize import TextNormalizer
+from src.api.feedback import FeedbackLog, FeedbackLearner, online_copy, sgd_step, l2_strength
+
+@pytest.fixture
+def serving():
+    subjects, descriptions, categories = [], [], []
+    for category, t in TEMPLATES.items():
+        subjects += t["subjects"]
+        descriptions += t["descriptions"]
+        categories += [category] * len(t["subjects"])
+    normalizer = TextNormalizer()
+    texts = [normalizer.ticket_text(s, d) for s, d in zip(subjects, descriptions)]
+    vectorizer = TfidfVectorizer(stop_words='english', ngram_range=(1, 2)).fit(texts)
+    le = LabelEncoder().fit(categories)
+    model = LogisticRegression(max_iter=1000).fit(vectorizer.transform(texts), le.transform(categories))
+    bundle = SimpleNamespace(header={"created_at": datetime.now(timezone.utc).isoformat()})
+    return SimpleNamespace(model=model, vectorizer=vectorizer, label_encoder=le, normalizer=normalizer,
+                           bundle=bundle, base_version="v1", model_version="v1")
+
+def predicted(current, model, subject, description):
+    X = current.vectorizer.transform([current.normalizer.ticket_text(subject, description)])
+    return current.label_encoder.inverse_transform(model.predict(X))[0]
+
+def correction(subject, description, category, received_at=None):
+    return {"subject": subject, "description": description, "category": category,
+            "received_at": time.time() if received_at is None else received_at}
+
+def test_log_reads_only_complete_lines(tmp_path):
+    log = FeedbackLog(str(tmp_path / "feedback" / "log.jsonl"))
+    assert log.read_from(0) == ([], 0, None)
+    log.append([{"a": 1}, {"a": 2}])
+    with open(log.path, "a") as f:
+        f.write('{"a": 3')  # a writer mid-record
+    records, offset, file_id = log.read_from(0)
+    assert records == [{"a": 1}, {"a": 2}]
+    with open(log.path, "a") as f:
+        f.write('}\n')
+    assert log.read_from(offset, file_id) == ([{"a": 3}], os.path.getsize(log.path), file_id)
+
+def test_rotate_archives_covered_records_and_readers_start_over(tmp_path):
+    log = FeedbackLog(str(tmp_path / "log.jsonl"))
+    log.append([{"n": 1, "received_at": 10}, {"n": 2, "received_at": 20}, {"n": 3, "received_at": 30}])
+    _, offset, file_id = log.read_from(0)
+
+    assert log.rotate(20) == 2 and log.rotate(20) == 0
+    assert [r["n"] for r in log.read_from(0)[0]] == [3]
+    with open(log.archive_path) as f:
+        assert [json.loads(line)["n"] for line in f] == [1, 2]
+    # An offset into the replaced file is not reused
+    records, _, new_id = log.read_from(offset, file_id)
+    assert new_id != file_id and [r["n"] for r in records] == [3]
+
+def test_sgd_step_lowers_batch_loss_and_keeps_intercept(serving):
+    model = online_copy(serving.model)
+    X = serving.vectorizer.transform(["reset password link", "charged twice refund please"])
+    y = np.array([2, 2])
+    intercept = model.intercept_.copy()
+    before = -np.log(model.predict_proba(X)[:, 2]).mean()
+    sgd_step(model, X, y, learning_rate=0.5)
+    assert -np.log(model.predict_proba(X)[:, 2]).mean() < before
+    assert np.array_equal(model.intercept_, intercept)
+    # The served model was copied, not touched
+    assert not np.shares_memory(model.coef_, serving.model.coef_)
+
+def test_learner_adapts_and_publishes_a_frozen_copy(serving, tmp_path):
+    published = []
+    learner = FeedbackLearner(FeedbackLog(str(tmp_path / "log.jsonl")),
+                              lambda current, model, applied: published.append((model, applied)), batch_size=4)
+    subject, description = "Charged twice", "I need a refund for the double charge."
+    assert predicted(serving, serving.model, subject, description) == "Billing Inquiry"
+
+    learner.submit([correction(subject, description, "Account Management")] * 10 +
+                   [correction(subject, description, "No Such Queue")])
+    assert learner.step(serving) == 10
+    model, applied = published[-1]
+    assert applied == 10
+    assert predicted(serving, model, subject, description) == "Account Management"
+    assert predicted(serving, serving.model, subject, description) == "Billing Inquiry"
+
+    # Nothing new in the log: no step, no publish
+    assert learner.step(serving) == 0 and len(published) == 1
+    stats = learner.stats()
+    assert stats["accepted"] == 11 and stats["applied"] == 10 and stats["skipped"] == 1 and stats["updates"] == 1
+
+def test_workers_reading_at_different_times_publish_the_same_weights(serving, tmp_path):
+    log = FeedbackLog(str(tmp_path / "log.jsonl"))
+    eager, late = [], []
+    eager_learner = FeedbackLearner(log, lambda current, model, applied: eager.append((model, applied)), batch_size=4)
+    late_learner = FeedbackLearner(log, lambda current, model, applied: late.append((model, applied)), batch_size=4)
+    tickets = [("Charged twice", "Refund the double charge", "Account Management"),
+               ("App crashes", "Error on launch", "Technical Issue"),
+               ("Add dark mode", "Please add it", "Feature Request")]
+    for n in (1, 2, 3, 4):
+        log.append([correction(*tickets[i % 3]) for i in range(n)])
+        eager_learner.step(serving)
+    late_learner.step(serving)
+
+    (eager_model, eager_applied), (late_model, late_applied) = eager[-1], late[-1]
+    assert eager_applied == late_applied == 10
+    assert np.array_equal(eager_model.coef_, late_model.coef_)
+    assert eager_learner.stats()["pending"] == 2
+
+def test_worker_replays_the_log_after_another_worker_rotates_it(serving, tmp_path):
+    log = FeedbackLog(str(tmp_path / "log.jsonl"))
+    published = []
+    worker = FeedbackLearner(log, lambda current, model, applied: published.append((model, applied)), batch_size=2)
+    assert worker.step(serving) == 0
+    log.append([correction("Charged twice", "Refund the double charge", "Account Management")] * 3)
+    # e.g. a late write from before the model was trained
+    log.append([correction("Add dark mode", "Please add it", "Feature Request", received_at=0)] * 3)
+    worker.step(serving)
+    assert published[-1][1] == 3 and worker.stats()["skipped"] == 3
+
+    # A worker starting on this model moves what the model already covers out of the log
+    FeedbackLearner(log, lambda *args: None).step(serving)
+    assert len(log.read_from(0)[0]) == 3 and os.path.exists(log.archive_path)
+
+    log.append([correction("Charged twice", "Refund the double charge", "Account Management")])
+    worker.step(serving)
+    replayed = FeedbackLearner(log, lambda current, model, applied: published.append((model, applied)), batch_size=2)
+    replayed.step(serving)
+    (first, first_applied), (second, second_applied) = published[-2:]
+    assert first_applied == second_applied == 4
+    assert np.array_equal(first.coef_, second.coef_)
+
+def test_l2_follows_the_served_models_regularization(serving):
+    assert l2_strength(serving) == 0.0  # the bundle does not record its training rows
+    serving.bundle.header["train_rows"] = 200
+    assert l2_strength(serving) == pytest.approx(1.0 / (serving.model.C * 200))
+
+def test_reloaded_model_replays_only_newer_feedback(serving, tmp_path):
+    published = []
+    learner = FeedbackLearner(FeedbackLog(str(tmp_path / "log.jsonl")),
+                              lambda current, model, applied: published.append(applied))
+    learner.submit([correction("Add dark mode", "Please add it", "Feature Request", received_at=0)])
+    learner.submit([correction("Add dark mode", "Please add it", "Feature Request")] * 2)
+    assert learner.step(serving) == 2
+
+    # A newer model (e.g. the nightly retrain) already saw all of it
+    serving.base_version = "v2"
+    serving.bundle.header["created_at"] = datetime.fromtimestamp(time.time() + 60, timezone.utc).isoformat()
+    assert learner.step(serving) == 0
+    assert learner.stats()["base_version"] == "v2" and learner.stats()["applied"] == 0
+
+def test_feedback_endpoint_logs_corrections_and_swaps_model(pipeline_models, tmp_path, monkeypatch):
+    import src.api.app as triage
+    triage.load_artifacts()
+    monkeypatch.setattr(triage, "state", triage.state)
+    learner = FeedbackLearner(FeedbackLog(str(tmp_path / "log.jsonl")), triage.publish_feedback_model)
+    monkeypatch.setattr(triage, "feedback_learner", learner)
+    client = triage.app.test_client()
+    base_version = triage.state.model_version
+
+    ticket = {"ticket_id": "f-1", "subject": "Refund", "description": "Refund the double charge",
+              "category": "Account Management", "predicted_category": "Billing Inquiry"}
+    response = client.post('/feedback', json=[ticket, {"subject": "x", "category": "Nope"}, {"category": "Bug Report"}])
+    body = json.loads(response.data)
+    assert response.status_code == 202
+    assert body["accepted"] == 1 and [e["index"] for e in body["errors"]] == [1, 2]
+    assert client.post('/feedback', json={"subject": "x", "category": "Nope"}).status_code == 400
+
+    assert learner.step(triage.state) == 1
+    assert triage.state.model_version == f"{base_version}+fb1"
+    assert triage.state.base_version == base_version
+    stats = json.loads(client.get('/feedback/stats').data)
+    assert stats["updates"] == 1 and stats["model_version"] == f"{base_version}+fb1"
+    assert 'triage_feedback_total{outcome="corrected"} 1' in client.get('/metrics').get_data(as_text=True)
+    assert json.loads(client.post('/predict', json=ticket).data)["predicted_category"]
+
+def test_reload_of_same_artifacts_gets_the_adapted_model_back(pipeline_models, tmp_path, monkeypatch):
+    import src.api.app as triage
+    triage.load_artifacts()
+    monkeypatch.setattr(triage, "state", triage.state)
+    learner = FeedbackLearner(FeedbackLog(str(tmp_path / "log.jsonl")), triage.publish_feedback_model)
+    base_version = triage.state.base_version
+    learner.submit([correction("Refund", "Refund the double charge", "Account Management")])
+    assert learner.step(triage.state) == 1
+    adapted = triage.state.model
+    assert learner.step(triage.state) == 0 and learner.stats()["updates"] == 1
+
+    # e.g. POST /admin/reload or a touched bundle: same base version, unadapted classifier
+    reloaded = triage.build_state()
+    triage.prepare_state(reloaded)
+    triage.swap_state(reloaded)
+    assert triage.state.model_version == base_version
+    learner.step(triage.state)
+    assert triage.state.model_version == f"{base_version}+fb1"
+    assert np.array_equal(triage.state.model.coef_, adapted.coef_)
+    assert learner.stats()["updates"] == 2
+
+def test_model_without_log_loss_only_logs_feedback(serving, tmp_path, monkeypatch, capsys):
+    from sklearn.naive_bayes import ComplementNB
+    import src.api.app as triage
+
+    X = serving.vectorizer.transform(["reset password link", "charged twice refund"])
+    serving.model = ComplementNB().fit(X, [0, 1])
+    published = []
+    learner = FeedbackLearner(FeedbackLog(str(tmp_path / "log.jsonl")),
+                              lambda current, model, applied: published.append(applied))
+    learner.submit([correction("Refund", "Refund the double charge", "Account Management")])
+    assert learner.step(serving) == 0 and learner.step(serving) == 0
+    stats = learner.stats()
+    assert "ComplementNB" in stats["disabled"] and stats["error"].startswith("TypeError")
+    assert published == [] and capsys.readouterr().out.count("only logged") == 1
+
+    monkeypatch.setattr(triage, "feedback_learner", learner)
+    body, status = triage.accept_feedback({"subject": "Refund", "category": "Account Management"}, serving)
+    assert status == 202 and body["accepted"] == 1
+    assert body["online"] is False and "only logged" in body["message"]
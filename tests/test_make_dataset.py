@@ -0,0 +1,73 @@
+import pytest
+import sys
+import os
+import json
+import numpy as np
+import pandas as pd
+from datetime import datetime
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.data.make_dataset import (generate_dataset, generate_tickets, add_typo, CATEGORIES, PRIORITIES,
+                                   TEMPLATES, COLUMNS)
+
+REFERENCE_TIME = "2025-01-01T00:00:00"
+
+def read_shards(output_dir):
+    with open(os.path.join(output_dir, "manifest.json")) as f:
+        manifest = json.load(f)
+    return manifest, pd.concat([pd.read_csv(os.path.join(output_dir, shard["path"])) for shard in manifest["shards"]],
+                               ignore_index=True)
+
+def test_generate_tickets_matches_templates():
+    frame = generate_tickets(2000, np.random.default_rng(0), reference_time=REFERENCE_TIME)
+    assert list(frame.columns) == COLUMNS
+    assert set(frame["category"]) == set(CATEGORIES)
+    assert set(frame["priority"]) <= set(PRIORITIES)
+    assert frame["ticket_id"].is_unique
+
+    for row in frame.itertuples():
+        subject = row.subject.removeprefix("URGENT: ")
+        assert subject in TEMPLATES[row.category]["subjects"]
+        description = row.description.split(" Please help! Ticket ID ref:")[0]
+        assert description in TEMPLATES[row.category]["descriptions"]
+
+    # Same shares as generate_ticket: ~10% urgent, ~20% with a ref number
+    assert frame["subject"].str.startswith("URGENT: ").mean() == pytest.approx(0.1, abs=0.03)
+    assert frame["description"].str.contains("Ticket ID ref").mean() == pytest.approx(0.2, abs=0.03)
+    technical = frame[frame["category"] == "Technical Issue"]
+    assert (technical["priority"] == "Critical").mean() > (frame["priority"] == "Low").mean() / 2
+
+def test_add_typo_is_a_single_edit():
+    rng = np.random.default_rng(1)
+    text = "password reset"
+    for _ in range(50):
+        noisy = add_typo(text, rng)
+        assert abs(len(noisy) - len(text)) <= 1
+        assert set(noisy) <= set(text)
+    assert add_typo("a", rng) == "a"
+
+def test_generate_dataset_is_deterministic_across_workers(tmp_path):
+    reference_time = datetime.fromisoformat(REFERENCE_TIME)
+    for name, n_jobs in (("serial", 1), ("parallel", 3)):
+        generate_dataset(1050, str(tmp_path / name), rows_per_shard=400, n_jobs=n_jobs, chunk_size=150,
+                         reference_time=reference_time)
+    serial, serial_frame = read_shards(str(tmp_path / "serial"))
+    _, parallel_frame = read_shards(str(tmp_path / "parallel"))
+
+    assert [shard["rows"] for shard in serial["shards"]] == [400, 400, 250]
+    assert len(serial_frame) == 1050
+    assert serial_frame["ticket_id"].is_unique
+    pd.testing.assert_frame_equal(serial_frame, parallel_frame)
+
+def test_generate_dataset_typo_rate(tmp_path):
+    output_dir = str(tmp_path / "noisy")
+    generate_dataset(600, output_dir, n_jobs=1, typo_rate=0.5, seed=7)
+    _, frame = read_shards(output_dir)
+    known = {d for c in CATEGORIES for d in TEMPLATES[c]["descriptions"]}
+    clean = frame["description"].str.split(" Please help!").str[0].isin(known)
+    assert 0.3 < 1 - clean.mean() < 0.7
+
+def test_generate_dataset_rejects_unknown_format(tmp_path):
+    with pytest.raises(ValueError):
+        generate_dataset(10, str(tmp_path), output_format="json")
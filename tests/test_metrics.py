@@ -0,0 +1,58 @@
+import pytest
+import sys
+import os
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.api.metrics import Histogram, MetricsRegistry, SlowRequestProfiler
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram((0.1, 0.5, 1.0))
+    for value in (0.05, 0.1, 0.3, 0.7, 5.0):
+        histogram.observe(value)
+    
+    assert list(histogram.cumulative()) == [(0.1, 2), (0.5, 3), (1.0, 4), (float("inf"), 5)]
+    assert histogram.count == 5
+    assert histogram.sum == pytest.approx(6.15)
+
+def test_registry_renders_prometheus_text():
+    registry = MetricsRegistry()
+    registry.describe("requests_total", "Requests served.")
+    registry.inc("requests_total", (("endpoint", "/predict"),))
+    registry.inc("requests_total", (("endpoint", "/predict"),), 2)
+    registry.observe("latency_seconds", 0.002, buckets=(0.001, 0.01))
+    with registry.stage("clean"):
+        pass
+    
+    text = registry.render(extra=[("up", "gauge", "", [((), 1)])])
+    assert "# HELP requests_total Requests served." in text
+    assert "# TYPE requests_total counter" in text
+    assert 'requests_total{endpoint="/predict"} 3' in text
+    assert 'latency_seconds_bucket{le="0.001"} 0' in text
+    assert 'latency_seconds_bucket{le="+Inf"} 1' in text
+    assert "latency_seconds_count 1" in text
+    assert 'triage_stage_duration_seconds_count{stage="clean"} 1' in text
+    assert "# TYPE up gauge\nup 1" in text
+
+def test_label_values_are_escaped():
+    registry = MetricsRegistry()
+    registry.inc("predictions_total", (("category", 'say "hi"\n'),))
+    assert 'predictions_total{category="say \\"hi\\"\\n"} 1' in registry.render()
+
+def test_profiler_keeps_only_slow_sampled_requests(tmp_path):
+    disabled = SlowRequestProfiler()
+    assert disabled.start() is None
+    
+    profiler = SlowRequestProfiler(threshold_ms=5, sample_rate=1.0, output_dir=str(tmp_path))
+    fast = profiler.start()
+    assert fast is not None
+    # Only one request is profiled at a time
+    assert profiler.start() is None
+    assert profiler.finish(fast, elapsed_ms=1) is None
+    
+    slow = profiler.start()
+    time.sleep(0.001)
+    path = profiler.finish(slow, elapsed_ms=50, name="predict")
+    assert path is not None and os.path.exists(path)
+    assert profiler.saved == 1 and profiler.sampled == 2
@@ -0,0 +1,58 @@
+import pytest
+import sys
+import os
+import numpy as np
+from scipy import sparse
+from sklearn.datasets import make_classification
+from sklearn.linear_model import LogisticRegression
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.models.optimize_model import warm_start_path_search, run_search_cv, search_space, optimize_model
+
+@pytest.fixture
+def data():
+    X, y = make_classification(n_samples=300, n_features=30, n_informative=10, n_classes=3, random_state=0)
+    return sparse.csr_matrix(X), y
+
+def test_path_search_matches_grid_best_score(data):
+    X, y = data
+    base = LogisticRegression(random_state=42, max_iter=1000)
+    Cs = [0.01, 0.1, 1, 10]
+    
+    _, grid_params, grid_score, _ = run_search_cv(base, {"C": Cs, "solver": ["lbfgs"]}, X, y, cv=3)
+    model, params, score, candidates = warm_start_path_search(base, Cs, X, y, cv=3, patience=len(Cs))
+    
+    assert [c["params"]["C"] for c in candidates] == Cs
+    assert all(c["wall_seconds"] > 0 for c in candidates)
+    assert score == pytest.approx(grid_score, abs=0.01)
+    # The returned model is refit on all rows with the winning C, without warm start
+    assert model.C == params["C"] and not model.warm_start
+
+def test_path_search_stops_early(data):
+    X, y = data
+    base = LogisticRegression(random_state=42, max_iter=1000)
+    
+    # Identical Cs never improve on the first one
+    _, _, _, candidates = warm_start_path_search(base, [1, 1, 1, 1, 1], X, y, cv=3, patience=2)
+    assert len(candidates) == 3
+    
+    # A spent budget still scores one candidate
+    _, params, _, candidates = warm_start_path_search(base, [0.01, 0.1, 1], X, y, cv=3, time_budget=0)
+    assert len(candidates) == 1 and params["C"] == 0.01
+
+def test_halving_search_reports_resources(data):
+    X, y = data
+    base = LogisticRegression(random_state=42, max_iter=1000)
+    _, params, _, candidates = run_search_cv(base, {"C": [0.01, 0.1, 1, 10]}, X, y, cv=3, halving=True)
+    
+    assert params["C"] in (0.01, 0.1, 1, 10)
+    assert {"iteration", "n_samples", "wall_seconds"} <= set(candidates[0])
+    assert max(c["n_samples"] for c in candidates) > min(c["n_samples"] for c in candidates)
+
+def test_fast_modes_skip_liblinear_and_budget_is_path_only():
+    assert "liblinear" in search_space("grid")["solver"]
+    assert search_space("halving")["solver"] == search_space("path")["solver"] == ["lbfgs"]
+    for search in ("grid", "halving"):
+        with pytest.raises(ValueError, match="time-budget"):
+            optimize_model(search=search, time_budget=5)
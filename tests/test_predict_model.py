@@ -0,0 +1,53 @@
+import pytest
+import sys
+import os
+import numpy as np
+
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+from sklearn.svm import LinearSVC
+from src.models.predict_model import predict_with_confidence, softmax
+
+TEXTS = [
+    "app crashes on launch", "button not working", "login fails with correct password",
+    "add dark mode", "export to pdf", "integration with slack",
+    "charged twice", "refund request", "update credit card",
+]
+LABELS = [0, 0, 0, 1, 1, 1, 2, 2, 2]
+
+@pytest.fixture
+def features():
+    vectorizer = TfidfVectorizer()
+    X = vectorizer.fit_transform(TEXTS)
+    return X, np.array(LABELS)
+
+def test_softmax_rows_sum_to_one():
+    probs = softmax(np.array([[1.0, 2.0, 3.0], [1000.0, 1000.0, 1000.0]]))
+    assert np.allclose(probs.sum(axis=1), 1.0)
+    assert np.allclose(probs[1], 1 / 3)
+
+def test_probabilistic_model_matches_sklearn(features):
+    X, y = features
+    model = LogisticRegression().fit(X, y)
+    labels, confidences, _, _ = predict_with_confidence(model, X)
+    assert np.array_equal(labels, model.predict(X))
+    assert np.allclose(confidences, model.predict_proba(X).max(axis=1))
+
+def test_decision_function_model_gets_numeric_confidence(features):
+    X, y = features
+    model = LinearSVC(dual='auto').fit(X, y)
+    labels, confidences, _, _ = predict_with_confidence(model, X)
+    assert np.array_equal(labels, model.predict(X))
+    assert np.all((confidences > 0) & (confidences <= 1))
+
+def test_top_k_sorted_and_led_by_prediction(features):
+    X, y = features
+    model = LogisticRegression().fit(X, y)
+    labels, confidences, top_labels, top_confidences = predict_with_confidence(model, X, top_k=2)
+    assert top_labels.shape == (X.shape[0], 2)
+    assert np.array_equal(top_labels[:, 0], labels)
+    assert np.allclose(top_confidences[:, 0], confidences)
+    assert np.all(top_confidences[:, 0] >= top_confidences[:, 1])
@@ -7,6 +7,16 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from src.api.app import clean_text
 
+def reference_clean_text(text):
+    # The original row-by-row implementation every fast path must match
+    import re
+    if not isinstance(text, str):
+        return ""
+    text = text.lower()
+    text = re.sub(r'[^a-z0-9\s.,!?]', '', text)
+    text = re.sub(r'\s+', ' ', text).strip()
+    return text
+
 def test_clean_text_basic():
     text = "Hello World!"
     assert clean_text(text) == "hello world!"
@@ -24,3 +34,64 @@ def test_clean_text_empty():
 
 def test_clean_text_none():
     assert clean_text(None) == ""
+
+def test_clean_texts_identical_to_clean_text():
+    import random
+    from src.data.normalize import clean_texts
+    from src.data.make_dataset import generate_ticket
+
+    texts = [generate_ticket()["description"] for _ in range(200)]
+    texts += [
+        None, 42, float("nan"), "", "   ", "a\x00b", "TAB\tand\nnewline\r\x0b\x0c\x1c end",
+        "Ünïcödé  café nbsp em-space", "KELVIN K sign", "İstanbul", "x  \t  y",
+        "URGENT: Login fails!! #404 @home (see ref: 1234)."
+    ]
+    rng = random.Random(0)
+    alphabet = "aZ9 .,!?\t\n  é\x00#@-_"
+    texts += ["".join(rng.choice(alphabet) for _ in range(rng.randint(0, 30))) for _ in range(300)]
+
+    expected = [reference_clean_text(text) for text in texts]
+    assert [clean_text(text) for text in texts] == expected
+    assert clean_texts(texts) == expected
+    assert clean_texts(texts, chunk_size=7) == expected
+    # Separator-free chunks exercise the joined fast paths on their own
+    safe = [text for text in texts if not (isinstance(text, str) and "\x00" in text)]
+    assert clean_texts(safe) == [reference_clean_text(text) for text in safe]
+
+def test_clean_text_series_parallel_matches_serial():
+    import pandas as pd
+    from src.data.preprocess import clean_text_series
+
+    series = pd.Series(["Hello @World!", None, "  Multiple   spaces  ", "Ünïcödé"] * 50, index=range(100, 300))
+    expected = series.map(reference_clean_text)
+    serial = clean_text_series(series)
+    parallel = clean_text_series(series, n_jobs=2, chunk_size=30)
+    assert serial.tolist() == expected.tolist()
+    assert parallel.tolist() == expected.tolist()
+    assert parallel.index.equals(series.index)
+
+def test_normalizer_round_trip_and_memo(tmp_path):
+    import joblib
+    from src.data.normalize import TextNormalizer
+
+    path = tmp_path / "text_normalizer.joblib"
+    joblib.dump(TextNormalizer(memo_size=8), path)
+    normalizer = joblib.load(path)
+
+    assert normalizer.ticket_text("Reset  Password!", None) == "reset password! "
+    assert normalizer.ticket_text("Reset  Password!", "Link @missing") == "reset password! link missing"
+    assert normalizer.cache_info().hits == 1
+
+def test_normalizer_version_mismatch_rejected(tmp_path):
+    import joblib
+    import src.data.normalize as normalize
+
+    path = tmp_path / "text_normalizer.joblib"
+    joblib.dump(normalize.TextNormalizer(), path)
+    original = normalize.NORMALIZER_VERSION
+    normalize.NORMALIZER_VERSION = original + 1
+    try:
+        with pytest.raises(ValueError):
+            joblib.load(path)
+    finally:
+        normalize.NORMALIZER_VERSION = original
@@ -0,0 +1,108 @@
+import sys
+import os
+import json
+import threading
+
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.api.reloader import ModelReloader, ArtifactWatcher
+from src.api.app import app, load_artifacts
+import src.api.app as app_module
+
+class FakeState:
+    def __init__(self, model_version):
+        self.model_version = model_version
+
+def test_reload_swaps_after_validation():
+    swapped = []
+    reloader = ModelReloader(lambda: FakeState("v2"), lambda state: None, swapped.append)
+    assert reloader.reload(wait=True)
+    assert [state.model_version for state in swapped] == ["v2"]
+    assert reloader.status()["state"] == "succeeded"
+    assert reloader.status()["version"] == "v2"
+
+def test_failed_validation_keeps_current_state():
+    swapped = []
+
+    def reject(state):
+        raise ValueError("smoke prediction failed")
+
+    reloader = ModelReloader(lambda: FakeState("broken"), reject, swapped.append)
+    reloader.reload(wait=True)
+    assert swapped == []
+    status = reloader.status()
+    assert status["state"] == "failed"
+    assert "smoke prediction failed" in status["error"]
+    assert status["failures"] == 1
+
+def test_watcher_waits_for_changes_to_settle(tmp_path):
+    path = tmp_path / "triage_bundle.joblib"
+    path.write_bytes(b"v1")
+    changes = []
+    watcher = ArtifactWatcher(lambda: [str(path)], lambda: changes.append(1) or True, interval=60)
+
+    assert watcher.poll() is None
+    path.write_bytes(b"version-2")
+    pending = watcher.poll()
+    assert pending is not None and changes == []
+    assert watcher.poll(pending) is None
+    assert changes == [1]
+    assert watcher.poll() is None
+    assert changes == [1]
+
+def test_watcher_retries_a_change_whose_reload_did_not_run(tmp_path):
+    path = tmp_path / "triage_bundle.joblib"
+    path.write_bytes(b"v1")
+    outcomes = [False, True]  # busy with another reload, then succeeds
+    watcher = ArtifactWatcher(lambda: [str(path)], lambda: outcomes.pop(0), interval=60)
+
+    path.write_bytes(b"version-2")
+    pending = watcher.poll(watcher.poll())
+    assert pending is not None and outcomes == [True]
+    assert watcher.poll(pending) is None
+    assert outcomes == []
+    assert watcher.poll() is None
+
+def test_admin_reload_under_load(pipeline_models):
+    load_artifacts()
+    app.config['TESTING'] = True
+    client = app.test_client()
+    payload = {"subject": "Charged twice", "description": "Extra charge on my invoice."}
+    statuses = []
+
+    def hammer():
+        local = app.test_client()
+        for _ in range(30):
+            statuses.append(local.post('/predict', json=payload).status_code)
+
+    threads = [threading.Thread(target=hammer) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    previous = app_module.state
+    response = client.post('/admin/reload?wait=true')
+    for thread in threads:
+        thread.join()
+
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert data["state"] == "succeeded"
+    assert app_module.state is not previous
+    assert data["model_version"] == previous.model_version
+    assert set(statuses) == {200}
+
+def test_admin_reload_requires_token(pipeline_models, monkeypatch):
+    load_artifacts()
+    monkeypatch.setenv("TRIAGE_ADMIN_TOKEN", "secret")
+    client = app.test_client()
+    assert client.post('/admin/reload').status_code == 401
+    response = client.get('/admin/reload', headers={"X-Admin-Token": "secret"})
+    assert response.status_code == 200
+
+def test_admin_reload_is_local_only_without_token(pipeline_models, monkeypatch):
+    load_artifacts()
+    monkeypatch.delenv("TRIAGE_ADMIN_TOKEN", raising=False)
+    client = app.test_client()
+    remote = client.post('/admin/reload', environ_base={"REMOTE_ADDR": "10.0.0.7"})
+    assert remote.status_code == 401
+    assert client.get('/admin/reload').status_code == 200
@@ -0,0 +1,70 @@
+import pytest
+import sys
+import os
+import json
+import joblib
+import pandas as pd
+
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.data.make_dataset import generate_ticket
+from src.models.train_incremental import StratifiedReservoir, train_incremental
+from src.models.compiled_scorer import CompiledScorer
+from src.models.bundle import BUNDLE_NAME, load_bundle
+from src.features.drift import load_baseline
+
+def test_reservoir_holds_out_or_trains_each_row_once():
+    reservoir = StratifiedReservoir(per_class=5, seed=0)
+    trained = []
+    for i in range(100):
+        label = "a" if i % 4 else "b"
+        to_train = reservoir.offer(label, i)
+        if to_train is not None:
+            trained.append(to_train)
+
+    held_out = [item for _, item in reservoir.items()]
+    assert len(reservoir.samples["a"]) == 5
+    assert len(reservoir.samples["b"]) == 5
+    assert sorted(trained + held_out) == list(range(100))
+
+def test_train_incremental_streams_chunks(tmp_path, monkeypatch):
+    tickets = pd.DataFrame([generate_ticket() for _ in range(400)])
+    input_path = tmp_path / "tickets.csv"
+    tickets.to_csv(input_path, index=False)
+    monkeypatch.chdir(tmp_path)
+
+    model, results = train_incremental(input_path=str(input_path), chunk_size=50,
+                                       holdout_per_class=10, n_features=2 ** 12)
+    assert results["rows"] == 400
+    assert results["trained_rows"] + results["holdout_rows"] == 400
+    assert results["f1_score"] > 0.9
+    assert os.path.exists(tmp_path / "models" / "incremental_model.joblib")
+    with open(tmp_path / "models" / "incremental_results.json") as f:
+        assert json.load(f)["learner"] == "sgd"
+
+@pytest.mark.parametrize("learner", ["sgd", "nb"])
+def test_promote_replaces_the_compiled_scorer(tmp_path, monkeypatch, learner):
+    tickets = pd.DataFrame([generate_ticket() for _ in range(200)])
+    input_path = tmp_path / "tickets.csv"
+    tickets.to_csv(input_path, index=False)
+    monkeypatch.chdir(tmp_path)
+    scorer_path = tmp_path / "models" / "compiled_scorer.npz"
+    scorer_path.parent.mkdir()
+    scorer_path.write_bytes(b"stale scorer")
+
+    model, _ = train_incremental(input_path=str(input_path), learner=learner, chunk_size=100,
+                                 holdout_per_class=5, n_features=2 ** 10, promote=True)
+    # The drift baseline and confidence reference now describe the hashed features
+    bundle = load_bundle(str(tmp_path / "models" / BUNDLE_NAME))
+    assert load_baseline(str(tmp_path / "models"), bundle.vectorizer)["feature_mode"] == "hashing"
+    assert sum(bundle.header["confidence_distribution"]) == pytest.approx(1.0)
+    if learner == "nb":
+        # Naive Bayes has no linear probabilities to compile, so the stale scorer is removed
+        assert not scorer_path.exists()
+        return
+    scorer = CompiledScorer.load(str(scorer_path))
+    texts = ["reset password link not arriving", "charged twice for my subscription"]
+    assert scorer.vocabulary is None and scorer.n_features == 2 ** 10
+    vectorizer = joblib.load(tmp_path / "models" / "tfidf_vectorizer.joblib")
+    assert list(scorer.predict(texts)) == list(model.predict(vectorizer.transform(texts)))
@@ -0,0 +1,64 @@
+import pytest
+import sys
+import os
+import time
+import numpy as np
+from scipy import sparse
+from sklearn.base import BaseEstimator, ClassifierMixin
+from sklearn.datasets import make_classification
+from sklearn.linear_model import LogisticRegression
+from sklearn.svm import LinearSVC
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.features.feature_store import save_features
+import src.models.train_models as train_models
+from src.models.train_models import run_bakeoff, select_best
+
+class SlowClassifier(ClassifierMixin, BaseEstimator):
+    def fit(self, X, y):
+        time.sleep(30)
+        return self
+
+@pytest.fixture
+def processed_dir(tmp_path):
+    X, y = make_classification(n_samples=200, n_features=20, n_classes=3, n_informative=6, random_state=0)
+    X = sparse.csr_matrix(X)
+    save_features(X[:150], X[150:], y[:150], y[150:], str(tmp_path))
+    return str(tmp_path)
+
+def test_bakeoff_reports_serving_cost_and_stops_slow_candidates(processed_dir, tmp_path):
+    models = {"Logistic Regression": LogisticRegression(max_iter=1000), "Slow": SlowClassifier()}
+    
+    start = time.perf_counter()
+    results = run_bakeoff(models, processed_dir, str(tmp_path / "candidates"), n_jobs=2, time_budget=3)
+    assert time.perf_counter() - start < 20
+    
+    lr = results["Logistic Regression"]
+    assert lr["status"] == "ok"
+    assert lr["train_seconds"] > 0 and lr["p95_latency_ms"] > 0 and lr["model_bytes"] > 0
+    assert os.path.exists(lr["model_path"])
+    assert results["Slow"]["status"] == "timeout"
+    assert select_best(results) == "Logistic Regression"
+
+def test_latency_is_timed_in_the_parent_after_training(processed_dir, tmp_path, monkeypatch):
+    timed = []
+    # Calls made inside the candidate processes would not reach this list
+    monkeypatch.setattr(train_models, "single_row_latency",
+                        lambda model, X: timed.append(model.__class__.__name__) or (0.1, 0.2))
+    models = {"Logistic Regression": LogisticRegression(max_iter=1000), "Linear SVM": LinearSVC(dual="auto")}
+    results = run_bakeoff(models, processed_dir, str(tmp_path / "candidates"), n_jobs=2)
+
+    assert sorted(timed) == ["LinearSVC", "LogisticRegression"]
+    assert results["Linear SVM"]["latency_ms"] == 0.1 and results["Linear SVM"]["p95_latency_ms"] == 0.2
+
+def test_select_best_prefers_faster_model_within_tolerance():
+    results = {
+        "accurate": {"status": "ok", "f1_score": 0.950, "p95_latency_ms": 10.0},
+        "fast": {"status": "ok", "f1_score": 0.948, "p95_latency_ms": 0.5},
+        "faster_but_worse": {"status": "ok", "f1_score": 0.90, "p95_latency_ms": 0.1},
+        "broken": {"status": "failed"}
+    }
+    assert select_best(results, f1_tolerance=0.005) == "fast"
+    assert select_best(results, f1_tolerance=0.0) == "accurate"
+    assert select_best({"broken": {"status": "timeout"}}) is None